@@ -0,0 +1,206 @@
+#!/bin/python3
+
+# Global
+import os
+import random
+from datetime import date
+from typing import TypedDict
+
+# External
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+# The font is required to cover Vietnamese, override by the environment variable
+FONT_CANDIDATES: list[str] = [
+    os.environ.get("EINVOICE_LENS_BENCH_FONT", ""),
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "C:/Windows/Fonts/arial.ttf",
+]
+FONT_NAME: str = "InvoiceSans"
+
+PRODUCTS: list[tuple[str, str]] = [
+    ("Xe cảnh sát SH", "Chiếc"),
+    ("Xe rác SH", "Chiếc"),
+    ("Xe chở hàng SH", "Chiếc"),
+    ("Bút bi Thiên Long", "Hộp"),
+    ("Giấy in A4 Double A", "Ram"),
+    ("Nước suối Lavie 500ml", "Thùng"),
+    ("Cà phê hạt Trung Nguyên", "Gói"),
+    ("Bánh quy Cosy", "Hộp"),
+    ("Dầu ăn Tường An 1L", "Chai"),
+    ("Gạo ST25", "Bao"),
+]
+
+# Layout: x-boundaries of the line items table (STT, Description, Unit, Quantity, Unit price, Amount)
+COLUMNS: list[float] = [40, 80, 290, 350, 410, 480, 560]
+ROW_HEIGHT: float = 18
+PAGE_WIDTH, PAGE_HEIGHT = A4
+
+
+class SyntheticInvoice(TypedDict):
+    path: str
+    total_pages: int
+    line_items: int
+    total_amount: float
+
+
+def _register_font() -> None:
+    if FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return
+    for candidate in FONT_CANDIDATES:
+        if candidate and os.path.exists(candidate):
+            pdfmetrics.registerFont(TTFont(FONT_NAME, candidate))
+            return
+    raise FileNotFoundError(f"Not found the font covering Vietnamese. Set EINVOICE_LENS_BENCH_FONT. Searched on {FONT_CANDIDATES!r}")
+
+
+def _format_amount(value: int) -> str:
+    "Vietnamese format: 20.752.000"
+    return f"{value:,}".replace(",", ".")
+
+
+def _draw_header(pdf: canvas.Canvas, invoice_number: int, issue_date: date) -> float:
+    "Draw the header of the first page as the bilingual layout. Return the y-position for the table"
+    lines = [
+        "Mã cơ quan thuế: 09DOFI999FDEEE921399FFFAKS29FF9A",
+        "HÓA ĐƠN BÁN HÀNG (SALES INVOICE)",
+        "Bản thể hiện của hóa đơn điện tử (Electronic invoice display)",
+        f"Ngày (date) {issue_date.day:02d} tháng (month) {issue_date.month:02d} năm (year) {issue_date.year}",
+        "Ký hiệu (Serial No): 3C35OKP",
+        f"Số (No.): {invoice_number}",
+        "Đơn vị bán hàng (Seller): HỘ KINH DOANH VĨNH LONG 999",
+        "Mã số thuế (Tax code): 0301118723-001",
+        "Địa chỉ (Address): Phường Chợ Lớn, TP Hồ Chí Minh",
+        "Số tài khoản (A/C No): 0440003331234 Ngân Hàng Vietcombank",
+        "Họ tên người mua hàng (Buyer's fullname): Lê Hoàng Minh Phương",
+        "Tên đơn vị (Company's name): HỘ KINH DOANH CHÍ VỸ 102",
+        "Mã số thuế (Tax code): 7000999999",
+        "Địa chỉ (Address): 999 Lý Thường Kiệt, Phường Buôn Ma Thuột, Tỉnh Đắk Lắk, Việt Nam",
+        "Hình thức thanh toán (Payment method): Tiền mặt/Chuyển khoản",
+    ]
+    y = PAGE_HEIGHT - 40
+    for line in lines:
+        pdf.drawString(40, y, line)
+        y -= 16
+    return y - 8
+
+
+def _draw_row(pdf: canvas.Canvas, y: float, cells: list[str], merged: bool = False, height: float = ROW_HEIGHT) -> float:
+    "Draw one row of the ruled table. The merged row has no inner vertical lines"
+    top, bottom = y, y - height
+    pdf.line(COLUMNS[0], top, COLUMNS[-1], top)
+    pdf.line(COLUMNS[0], bottom, COLUMNS[-1], bottom)
+    boundaries = [COLUMNS[0], COLUMNS[-1]] if merged else COLUMNS
+    for x in boundaries:
+        pdf.line(x, top, x, bottom)
+
+    text_lines = [cell.split("\n") for cell in cells]
+    for index, cell_lines in enumerate(text_lines):
+        for line_index, text in enumerate(cell_lines):
+            pdf.drawString(COLUMNS[index] + 3, top - 12 - line_index * 10, text)
+    return bottom
+
+
+def generate_invoice(path: str, line_items: int = 3, appendix_pages: int = 0, seed: int = 0, invoice_number: int = 123) -> SyntheticInvoice:
+    """Generate a Vietnamese sales invoice PDF with the same bilingual layout of the fixture
+
+    Args
+    ----
+    path (str): The output path
+    line_items (int): The number of line items, the table continues on the next pages
+    appendix_pages (int): The number of pages without ruling lines appended after the totals (e.g. terms)
+    seed (int): The seed of the random line items
+
+    Return
+    ------
+    SyntheticInvoice: The ground truth of the generated document
+    """
+    _register_font()
+    rng = random.Random(seed)
+
+    pdf = canvas.Canvas(path, pagesize=A4)
+    total_pages, total_amount = _draw_invoice(pdf, rng, line_items=line_items, appendix_pages=appendix_pages, invoice_number=invoice_number)
+    pdf.save()
+    return SyntheticInvoice(path=path, total_pages=total_pages, line_items=line_items, total_amount=float(total_amount))
+
+
+def generate_multi_invoice(path: str, invoices: list[int], seed: int = 0, invoice_number: int = 123) -> list[SyntheticInvoice]:
+    """Generate one document of many concatenated invoices, numbered from `invoice_number`
+
+    Args
+    ----
+    path (str): The output path
+    invoices (list[int]): The number of line items of each invoice
+    seed (int): The seed of the random line items
+
+    Return
+    ------
+    list[SyntheticInvoice]: The ground truth of each invoice
+    """
+    _register_font()
+    rng = random.Random(seed)
+
+    pdf = canvas.Canvas(path, pagesize=A4)
+    truths: list[SyntheticInvoice] = []
+    for index, line_items in enumerate(invoices):
+        if index > 0:
+            pdf.showPage()
+        total_pages, total_amount = _draw_invoice(pdf, rng, line_items=line_items, appendix_pages=0, invoice_number=invoice_number + index)
+        truths.append(SyntheticInvoice(path=path, total_pages=total_pages, line_items=line_items, total_amount=float(total_amount)))
+    pdf.save()
+    return truths
+
+
+def _draw_invoice(pdf: canvas.Canvas, rng: random.Random, line_items: int, appendix_pages: int, invoice_number: int) -> tuple[int, int]:
+    "Draw the pages of one invoice from the current page. Return (total pages, total amount)"
+    pdf.setFont(FONT_NAME, 8)
+    pdf.setLineWidth(0.5)
+
+    total_pages = 1
+    y = _draw_header(pdf, invoice_number=invoice_number, issue_date=date(2025, 8, 28))
+    y = _draw_row(pdf, y, ["STT\n(No.)", "Tên hàng hóa, dịch vụ\n(Description)", "Đơn vị tính\n(Unit)", "Số lượng\n(Quantity)", "Đơn giá\n(Unit price)", "Thành tiền\n(Amount)"], height=26)
+    y = _draw_row(pdf, y, ["(1)", "(2)", "(3)", "(4)", "(5)", "(6) = (4) x (5)"])
+
+    total_amount = 0
+    for no in range(1, line_items + 1):
+        if y - ROW_HEIGHT < 60:
+            pdf.showPage()
+            pdf.setFont(FONT_NAME, 8)
+            pdf.setLineWidth(0.5)
+            total_pages += 1
+            y = PAGE_HEIGHT - 40
+
+        description, unit = PRODUCTS[rng.randrange(len(PRODUCTS))]
+        quantity = rng.randint(1, 99)
+        unit_price = rng.randint(1, 500) * 1000
+        amount = quantity * unit_price
+        total_amount += amount
+        y = _draw_row(pdf, y, [str(no), description, unit, str(quantity), _format_amount(unit_price), _format_amount(amount)])
+
+    if y - 2 * ROW_HEIGHT < 60:
+        pdf.showPage()
+        pdf.setFont(FONT_NAME, 8)
+        pdf.setLineWidth(0.5)
+        total_pages += 1
+        y = PAGE_HEIGHT - 40
+
+    y = _draw_row(pdf, y, [f"Tổng tiền thanh toán(Total amount): {_format_amount(total_amount)}"], merged=True)
+    y = _draw_row(pdf, y, ["Số tiền viết bằng chữ(In words): Không xác định"], merged=True)
+    pdf.drawString(40, y - 20, "Tra cứu hóa đơn điện tử tại trang web: http://tracuu.hoadon.com Mã số tra cứu: 1OOO4F4999Z")
+    pdf.drawString(40, y - 36, "Đơn vị cung cấp dịch vụ hóa đơn điện tử: công ty cổ phần thương mại Visnam, MST: 0401486901")
+
+    # Appendix
+    for index in range(appendix_pages):
+        pdf.showPage()
+        pdf.setFont(FONT_NAME, 8)
+        total_pages += 1
+        y = PAGE_HEIGHT - 40
+        for line_index in range(50):
+            pdf.drawString(40, y, f"Điều khoản {index + 1}.{line_index + 1}: Các bên thống nhất thực hiện theo quy định của pháp luật hiện hành.")
+            y -= 14
+
+    return total_pages, total_amount
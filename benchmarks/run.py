@@ -0,0 +1,168 @@
+#!/bin/python3
+
+# Global
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import textwrap
+import multiprocessing
+from datetime import datetime, UTC as timezoneUTC
+from typing import Any
+
+# Append
+sys.path.append(os.path.abspath(os.curdir))
+
+# Internal
+from benchmarks.generator import generate_invoice
+
+# Scenario: (line items, appendix pages)
+SCENARIOS: dict[str, tuple[int, int]] = {
+    "small": (3, 0),
+    "medium": (120, 2),
+    "large": (1000, 5),
+}
+MODES: tuple[str, ...] = ("single", "batch", "stream")
+
+
+def _measure(mode: str, paths: list[str], total_pages: int, workers: int, queue: multiprocessing.Queue) -> None:
+    "Run inside a fresh process, so that the peak RSS is measured on the mode only"
+
+    # Import inside the process, the import time is not measured
+    import resource
+    import einvoice_lens
+
+    start = time.perf_counter()
+    if mode == "single":
+        for path in paths:
+            einvoice_lens.parse_commerical_invoice(path)
+    elif mode == "batch":
+        for record in einvoice_lens.parse_commerical_invoices(paths, workers=workers):
+            assert record["status"] == "SUCCESS", record["error"]
+    elif mode == "stream":
+        for path in paths:
+            with einvoice_lens.stream_commerical_invoice(path) as stream:
+                for _ in stream:
+                    pass
+    seconds = time.perf_counter() - start
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put({
+        "documents": len(paths),
+        "seconds": round(seconds, 4),
+        "documents_per_second": round(len(paths) / seconds, 3),
+        "per_page_ms": round(seconds / total_pages * 1000, 3),
+        # Note: The pool workers of batch mode are not counted
+        "peak_rss_mb": round(max_rss / 10**6 if sys.platform == "darwin" else max_rss * 1024 / 10**6, 1),
+    })
+
+
+def run(scenarios: list[str], documents: int, workers: int, directory: str) -> dict[str, dict[str, Any]]:
+
+    context = multiprocessing.get_context("spawn")
+    results: dict[str, dict[str, Any]] = {}
+    for scenario in scenarios:
+
+        # Generate
+        line_items, appendix_pages = SCENARIOS[scenario]
+        invoices = [
+            generate_invoice(os.path.join(directory, f"{scenario}-{index}.pdf"), line_items=line_items, appendix_pages=appendix_pages, seed=index)
+            for index in range(documents)
+        ]
+        paths = [invoice["path"] for invoice in invoices]
+        total_pages = sum([invoice["total_pages"] for invoice in invoices])
+
+        for mode in MODES:
+            queue = context.Queue()
+            process = context.Process(target=_measure, args=(mode, paths, total_pages, workers, queue))
+            process.start()
+            result = queue.get()
+            process.join()
+            results[f"{scenario}/{mode}"] = {"pages_per_document": invoices[0]["total_pages"], **result}
+            print(f"{scenario + '/' + mode:<16} {result['documents_per_second']:>10.3f} docs/s {result['per_page_ms']:>10.3f} ms/page {result['peak_rss_mb']:>8.1f} MB")
+
+    return results
+
+
+def compare(results: dict[str, dict[str, Any]], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    "Return the regressions: throughput drop or peak RSS growth over the tolerance"
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline["results"]:
+            continue
+        base = baseline["results"][key]
+        throughput_ratio = result["documents_per_second"] / base["documents_per_second"]
+        memory_ratio = result["peak_rss_mb"] / base["peak_rss_mb"]
+        print(f"{key:<16} throughput x{throughput_ratio:.2f} peak_rss x{memory_ratio:.2f}")
+        if throughput_ratio < 1 - tolerance:
+            regressions.append(f"{key}: throughput x{throughput_ratio:.2f}")
+        if memory_ratio > 1 + tolerance:
+            regressions.append(f"{key}: peak_rss x{memory_ratio:.2f}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description=textwrap.dedent("""
+        [Einvoice Lens] Benchmark on synthetic sales invoices (offline)
+
+        Usage
+        -----
+
+        Compare with the baseline
+        >>> python -m benchmarks.run --baseline benchmarks/baseline.json
+
+        Update the baseline (on release)
+        >>> python -m benchmarks.run --output benchmarks/baseline.json
+        """),
+    )
+    parser.add_argument("--scenario", help="Scenario of document size. Repeatable", choices=list(SCENARIOS), action="append", default=None)
+    parser.add_argument("--documents", help="Number of documents per scenario", type=int, default=8)
+    parser.add_argument("--workers", help="Number of workers of batch mode", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--output", help="Write the results into JSON file", type=str, default=None)
+    parser.add_argument("--baseline", help="Compare with the baseline JSON file", type=str, default=None)
+    parser.add_argument("--tolerance", help="Allowed ratio of regression", type=float, default=0.2)
+    parameters = parser.parse_args(argv)
+
+    # Run
+    with tempfile.TemporaryDirectory(prefix="einvoice-lens-bench-") as directory:
+        results = run(parameters.scenario or list(SCENARIOS), documents=parameters.documents, workers=parameters.workers, directory=directory)
+
+    # Output
+    if parameters.output is not None:
+        from einvoice_lens import __version__
+        with open(parameters.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "environment": {
+                    "version": __version__,
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "cpu_count": os.cpu_count(),
+                    "documents": parameters.documents,
+                    "workers": parameters.workers,
+                    "created_at": datetime.now(tz=timezoneUTC).isoformat(timespec="seconds"),
+                },
+                "results": results,
+            }, f, indent=2)
+            f.write("\n")
+
+    # Compare
+    if parameters.baseline is not None:
+        with open(parameters.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, tolerance=parameters.tolerance)
+        if len(regressions) > 0:
+            print("Regressions:\n" + "\n".join(regressions))
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
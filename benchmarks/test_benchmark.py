@@ -0,0 +1,85 @@
+#!/bin/python3
+
+# Global
+import sys
+import os
+
+# Append
+sys.path.append(os.path.abspath(os.curdir))
+
+# External
+import pytest
+import pdfplumber
+import strx
+
+# Internal
+import einvoice_lens
+from einvoice_lens.engine import _pipeline_text_transform
+from benchmarks.generator import generate_invoice, SyntheticInvoice
+
+# Run by: pytest benchmarks --benchmark-only
+pytest.importorskip("pytest_benchmark")
+
+
+@pytest.fixture(scope="module", params=[(3, 0), (120, 2)], ids=["small", "medium"])
+def invoice(request, tmp_path_factory) -> SyntheticInvoice:
+    line_items, appendix_pages = request.param
+    path = os.path.join(tmp_path_factory.mktemp("invoices"), f"invoice-{line_items}.pdf")
+    return generate_invoice(path, line_items=line_items, appendix_pages=appendix_pages)
+
+
+def test_benchmark_parse_single(benchmark, invoice):
+
+    output = benchmark(einvoice_lens.parse_commerical_invoice, invoice["path"])
+
+    # Validate: the generated document is the ground truth
+    assert len(output["dataset"]) == invoice["line_items"]
+    assert sum([x["amount"] for x in output["dataset"]]) == invoice["total_amount"]
+
+
+def test_benchmark_parse_stream(benchmark, invoice):
+
+    def _consume(path: str) -> int:
+        with einvoice_lens.stream_commerical_invoice(path) as stream:
+            return sum([1 for _ in stream])
+
+    assert benchmark(_consume, invoice["path"]) == invoice["line_items"]
+
+
+def test_benchmark_parse_batch(benchmark, invoice):
+
+    def _consume(paths: list[str]) -> int:
+        return sum([1 for record in einvoice_lens.parse_commerical_invoices(paths, workers=2) if record["status"] == "SUCCESS"])
+
+    assert benchmark.pedantic(_consume, args=([invoice["path"]] * 4,), rounds=3) == 4
+
+
+@pytest.fixture(scope="module")
+def page_texts(tmp_path_factory) -> list[str]:
+    "The first page text of the invoices of one vendor, the labels and the seller block repeat verbatim"
+    directory = tmp_path_factory.mktemp("texts")
+    texts: list[str] = []
+    for seed in range(8):
+        invoice = generate_invoice(os.path.join(directory, f"invoice-{seed}.pdf"), line_items=20, seed=seed)
+        with pdfplumber.open(invoice["path"]) as pdf:
+            texts.append(pdf.pages[0].extract_text())
+    return texts
+
+
+@pytest.mark.benchmark(group="text_transform")
+def test_benchmark_text_transform_per_call(benchmark, page_texts):
+
+    # The cost before the cache: the whole text normalized on every call
+    def _transform(texts: list[str]) -> list[str]:
+        return [strx.str_normalize(string=text.encode("utf-8").decode("utf-8"), form="NFKC", strip=True).replace("\xad", "") for text in texts]
+
+    assert benchmark(_transform, page_texts) == [_pipeline_text_transform(string=text) for text in page_texts]
+
+
+@pytest.mark.benchmark(group="text_transform")
+def test_benchmark_text_transform_memoized(benchmark, page_texts):
+
+    def _transform(texts: list[str]) -> list[str]:
+        return [_pipeline_text_transform(string=text) for text in texts]
+
+    assert len(benchmark(_transform, page_texts)) == len(page_texts)
@@ -1,11 +1,128 @@
 #!/bin/python3
 
-from .engine import (
-    parse_commerical_invoice,
-)
+# Global
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .engine import (
+        parse_commerical_invoice,
+        stream_commerical_invoice,
+        CommericalInvoiceStream,
+    )
+    from .batch import (
+        parse_commerical_invoices,
+        collect_line_items,
+        write_line_items_parquet,
+    )
+    from .cache import (
+        ResultCache,
+        OCRCache,
+    )
+    from .rules import (
+        FieldRule,
+        RuleSet,
+        register_field_rule,
+    )
+    from .telemetry import (
+        Instrumentation,
+        CallbackInstrumentation,
+    )
+    from .aio import (
+        AsyncInvoiceParser,
+    )
+    from .templates import (
+        TemplateRegistry,
+    )
+    from .backends import (
+        PDFBackend,
+    )
+    from .limits import (
+        ParseLimits,
+    )
+    from .compact import (
+        CompactInvoiceResult,
+    )
+    from .split import (
+        detect_invoice_segments,
+        parse_multi_commerical_invoice,
+    )
+    from .ocr import (
+        OCREngine,
+        OCRSettings,
+    )
+    from .sink import (
+        ParquetDatasetSink,
+        scan_invoice_dataset,
+    )
+
+# The submodules are imported on first access, so that `import einvoice_lens` stays cheap
+# (e.g. the CLI `serve` mode and the shell scripts which only need the version)
+_LAZY_ATTRIBUTES: dict[str, str] = {
+    "parse_commerical_invoice": ".engine",
+    "stream_commerical_invoice": ".engine",
+    "CommericalInvoiceStream": ".engine",
+    "parse_commerical_invoices": ".batch",
+    "collect_line_items": ".batch",
+    "write_line_items_parquet": ".batch",
+    "ResultCache": ".cache",
+    "OCRCache": ".cache",
+    "FieldRule": ".rules",
+    "RuleSet": ".rules",
+    "register_field_rule": ".rules",
+    "Instrumentation": ".telemetry",
+    "CallbackInstrumentation": ".telemetry",
+    "AsyncInvoiceParser": ".aio",
+    "TemplateRegistry": ".templates",
+    "PDFBackend": ".backends",
+    "ParseLimits": ".limits",
+    "CompactInvoiceResult": ".compact",
+    "detect_invoice_segments": ".split",
+    "parse_multi_commerical_invoice": ".split",
+    "OCREngine": ".ocr",
+    "OCRSettings": ".ocr",
+    "ParquetDatasetSink": ".sink",
+    "scan_invoice_dataset": ".sink",
+}
 
 __all__ = [
     "parse_commerical_invoice",
+    "stream_commerical_invoice",
+    "CommericalInvoiceStream",
+    "parse_commerical_invoices",
+    "collect_line_items",
+    "write_line_items_parquet",
+    "ResultCache",
+    "OCRCache",
+    "FieldRule",
+    "RuleSet",
+    "register_field_rule",
+    "Instrumentation",
+    "CallbackInstrumentation",
+    "AsyncInvoiceParser",
+    "TemplateRegistry",
+    "PDFBackend",
+    "ParseLimits",
+    "CompactInvoiceResult",
+    "detect_invoice_segments",
+    "parse_multi_commerical_invoice",
+    "OCREngine",
+    "OCRSettings",
+    "ParquetDatasetSink",
+    "scan_invoice_dataset",
 ]
 
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *__all__])
+
+
 __version__ = "0.2.3"
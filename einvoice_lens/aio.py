@@ -0,0 +1,178 @@
+#!/bin/python3
+
+# Global
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterable, Literal
+
+# Internal
+from einvoice_lens.engine import CommericalInvoiceResult, DocumentSource, parse_commerical_invoice
+
+
+class ParserOverloadedError(RuntimeError):
+    "Raised when the number of documents waiting for a worker exceeds `max_pending`"
+
+
+def _warm_up() -> None:
+    "Import the parsing modules once per worker, before the first document"
+    import polars  # noqa: F401
+    import einvoice_lens.engine  # noqa: F401
+
+
+async def _read_async_source(source: Any) -> bytes:
+    "Gather the async byte stream (async iterable of chunks, or object with async `read()`) into bytes"
+    if hasattr(source, "read") and asyncio.iscoroutinefunction(source.read):
+        return bytes(await source.read())
+
+    buffer = bytearray()
+    async for chunk in source:
+        buffer.extend(chunk)
+    return bytes(buffer)
+
+
+class AsyncInvoiceParser:
+    """Parse commerical invoices from asyncio without blocking the event loop
+
+    The CPU-bound extraction is offloaded into a managed executor. At most `max_concurrency` documents
+    are running; the others wait on the parser (backpressure), and once `max_pending` documents are waiting
+    the next call fails fast with `ParserOverloadedError` so that the service can shed the load.
+
+    Args
+    ----
+    max_concurrency (int | None): The number of documents parsed at the same time. Default to `os.cpu_count()`
+    executor (str): The kind of executor, `process` (default, scale with cores) or `thread`
+    max_pending (int | None): The maximum of documents waiting for a worker. Default to no limit
+    **options: The default keyword arguments forwarded into `parse_commerical_invoice`
+
+    Usage
+    -----
+    >>> from einvoice_lens.aio import AsyncInvoiceParser
+    >>> async with AsyncInvoiceParser(max_concurrency=4) as parser:
+    ...     result = await parser.parse(upload_bytes, timeout=30)
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int | None = None,
+        executor: Literal["process", "thread"] = "process",
+        max_pending: int | None = None,
+        **options,
+    ):
+        self.max_concurrency = max_concurrency or os.cpu_count() or 1
+        if self.max_concurrency < 1:
+            raise ValueError(f"Required max_concurrency >= 1. Got max_concurrency={max_concurrency!r}")
+        if executor not in ("process", "thread"):
+            raise ValueError(f"Invalid executor. Required one of process, thread. Got {executor!r}")
+
+        self.executor_kind = executor
+        self.max_pending = max_pending
+        self.options = options
+        self._executor: Executor | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._pending: int = 0
+
+    def _ensure_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "process":
+                # Note: Use `spawn` as forking a process after polars initialized its thread pool can deadlock
+                self._executor = ProcessPoolExecutor(max_workers=self.max_concurrency, mp_context=multiprocessing.get_context("spawn"), initializer=_warm_up)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="einvoice-lens")
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._executor
+
+    async def parse(self, source: DocumentSource | AsyncIterable[bytes], timeout: float | None = None, **options) -> CommericalInvoiceResult:
+        """Parse one document
+
+        Args
+        ----
+        source (DocumentSource | AsyncIterable[bytes]): The path, the in-memory document, or the async byte stream
+            (e.g. the body of an upload), which is parsed without touching the disk
+        timeout (float | None): The timeout in seconds, including the waiting for a worker
+        **options: The keyword arguments forwarded into `parse_commerical_invoice`, override the defaults
+
+        Return
+        ------
+        CommericalInvoiceResult: The result of commerical invoice parsing
+
+        Note
+        ----
+        On timeout or cancellation, the document not started yet is withdrawn. The document already running
+        in a process worker can't be interrupted, its slot is released only when the worker finishes,
+        so that the concurrency limit still holds.
+        """
+        executor = self._ensure_executor()
+
+        if self.max_pending is not None and self._pending >= self.max_pending and self._semaphore.locked():
+            raise ParserOverloadedError(f"Reached max_pending={self.max_pending} documents waiting for a worker")
+
+        async def _run() -> CommericalInvoiceResult:
+            nonlocal source
+            if not isinstance(source, (str, os.PathLike, bytes, bytearray, memoryview)) and (
+                hasattr(source, "__aiter__") or (hasattr(source, "read") and asyncio.iscoroutinefunction(source.read))
+            ):
+                source = await _read_async_source(source)
+
+            # Wait for a worker
+            self._pending += 1
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self._pending -= 1
+
+            # The slot is released when the worker finishes, not when the caller stops waiting
+            loop = asyncio.get_running_loop()
+            try:
+                future = executor.submit(parse_commerical_invoice, source, **{**self.options, **options})
+            except BaseException:
+                self._semaphore.release()
+                raise
+
+            def _release(_) -> None:
+                try:
+                    loop.call_soon_threadsafe(self._semaphore.release)
+                except RuntimeError:  # Loop is closed
+                    pass
+
+            future.add_done_callback(_release)
+            return await asyncio.wrap_future(future)
+
+        return await asyncio.wait_for(_run(), timeout=timeout)
+
+    async def warm_up(self) -> None:
+        "Start every worker and import the parsing modules upfront, so that the first documents don't pay for it"
+        executor = self._ensure_executor()
+        await asyncio.gather(*[asyncio.wrap_future(executor.submit(_warm_up)) for _ in range(self.max_concurrency)])
+
+    async def close(self, wait: bool = True) -> None:
+        "Shutdown the executor. The documents not started yet are cancelled"
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(None, lambda: executor.shutdown(wait=wait, cancel_futures=True))
+
+    async def __aenter__(self) -> "AsyncInvoiceParser":
+        self._ensure_executor()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+
+async def parse_commerical_invoice_async(
+    source: DocumentSource | AsyncIterable[bytes],
+    timeout: float | None = None,
+    **options,
+) -> CommericalInvoiceResult:
+    """Parse one document on a thread without blocking the event loop
+
+    For a service, prefer the shared `AsyncInvoiceParser` which bound the concurrency and reuse the workers.
+
+    Usage
+    -----
+    >>> from einvoice_lens.aio import parse_commerical_invoice_async
+    >>> result = await parse_commerical_invoice_async("path/to/input.pdf")
+    """
+    async with AsyncInvoiceParser(max_concurrency=1, executor="thread") as parser:
+        return await parser.parse(source, timeout=timeout, **options)
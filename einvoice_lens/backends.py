@@ -0,0 +1,460 @@
+#!/bin/python3
+
+# Global
+import abc
+import io
+import ctypes
+import math
+import mmap
+import unicodedata
+from typing import Any, BinaryIO, ClassVar
+
+# External
+import pdfplumber
+from pdfplumber import utils
+
+
+class PDFBackend(abc.ABC):
+    """The PDF library reading the page objects, pdfplumber (pure-Python pdfminer) by default
+
+    The backend only provides the objects of the pages, on the pdfplumber model: the `char` dicts
+    (text, x0, x1, top, bottom, upright, ...) and the ruling objects `line`, `rect`, `curve`.
+    The text lines of the profile and the ruled tables of the line items are derived from them by the
+    same code for every backend, so that the backends only differ on the speed of parsing.
+
+    The document returned by `open` has `pages` and `close()`. Each page has `page_number`, `width`,
+    `height`, `bbox`, `objects`, `chars`, `edges`, `extract_text()` and `close()`, as `pdfplumber.page.Page`.
+
+    Usage
+    -----
+    >>> from einvoice_lens import parse_commerical_invoice
+    >>> result = parse_commerical_invoice(path, backend="pymupdf")
+    """
+
+    # The name reported in `runtime_metadata.backend`
+    name: ClassVar[str]
+
+    @abc.abstractmethod
+    def open(self, stream: BinaryIO | mmap.mmap) -> Any:
+        "Open the document from the stream of the source"
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}()"
+
+
+class PdfplumberBackend(PDFBackend):
+    "The reference backend"
+
+    name: ClassVar[str] = "pdfplumber"
+
+    def open(self, stream: BinaryIO | mmap.mmap) -> pdfplumber.PDF:
+        return pdfplumber.open(stream, unicode_norm="NFKC")
+
+
+def _char_object(
+    text: str,
+    fontname: str,
+    size: float,
+    upright: bool,
+    x0: float,
+    x1: float,
+    bottom: float,
+    page_number: int,
+    page_height: float,
+) -> dict[str, Any]:
+    "The `char` dict of pdfplumber, the glyph box is on the font size from the descent as pdfminer"
+    top = bottom - size
+    return {
+        "object_type": "char",
+        "page_number": page_number,
+        "text": unicodedata.normalize("NFKC", text),
+        "fontname": fontname,
+        "size": size,
+        "upright": upright,
+        "x0": x0, "x1": x1, "top": top, "bottom": bottom, "doctop": top,
+        "y0": page_height - bottom, "y1": page_height - top,
+        "width": x1 - x0, "height": size,
+    }
+
+
+def _path_object(points: list[tuple[float, float]], height: float) -> dict[str, Any]:
+    "Classify the subpath as pdfminer: one segment is a line, a closed axis-aligned loop of 4 segments is a rect, else a curve"
+    xs, ys = [x for x, _ in points], [y for _, y in points]
+    obj = {
+        "x0": min(xs), "x1": max(xs), "top": min(ys), "bottom": max(ys), "doctop": min(ys),
+        "y0": height - max(ys), "y1": height - min(ys), "width": max(xs) - min(xs), "height": max(ys) - min(ys),
+    }
+
+    if len(points) == 2:
+        return {**obj, "object_type": "line", "pts": points}
+
+    if len(points) == 5 and points[0] == points[4]:
+        (x0, y0), (x1, y1), (x2, y2), (x3, y3), _ = points
+        if (x0 == x1 and y1 == y2 and x2 == x3 and y3 == y0) or (y0 == y1 and x1 == x2 and y2 == y3 and x3 == x0):
+            return {**obj, "object_type": "rect", "pts": points}
+
+    return {**obj, "object_type": "curve", "pts": points}
+
+
+class _ConvertedPage(abc.ABC):
+    "The page objects read by another library, converted into the pdfplumber model"
+
+    def __init__(self, document: "_ConvertedDocument", index: int, width: float, height: float):
+        self._document = document
+        self._index = index
+        self.page_number: int = index + 1
+        self.width: float = width
+        self.height: float = height
+        self.bbox: tuple[float, float, float, float] = (0.0, 0.0, self.width, self.height)
+        self._objects: dict[str, list[dict[str, Any]]] | None = None
+
+    @abc.abstractmethod
+    def _read_chars(self, page: Any) -> list[dict[str, Any]]:
+        "The glyphs in the order of the content stream, as pdfminer"
+
+    @abc.abstractmethod
+    def _read_paths(self, page: Any) -> list[list[tuple[float, float]]]:
+        "The painted subpaths, as the end points of their segments in the top-left origin"
+
+    def _release(self, page: Any) -> None:
+        "Release the native page once its objects are read"
+
+    def _native_page(self) -> Any:
+        return self._document.native[self._index]
+
+    @property
+    def objects(self) -> dict[str, list[dict[str, Any]]]:
+        if self._objects is None:
+            page = self._native_page()
+            try:
+                objects: dict[str, list[dict[str, Any]]] = {"char": self._read_chars(page)}
+                for points in self._read_paths(page):
+                    obj = _path_object(points, self.height)
+                    objects.setdefault(obj["object_type"], []).append(obj)
+            finally:
+                self._release(page)
+            self._objects = objects
+        return self._objects
+
+    @property
+    def chars(self) -> list[dict[str, Any]]:
+        return self.objects.get("char", [])
+
+    @property
+    def edges(self) -> list[dict[str, Any]]:
+        "Same order of `pdfplumber.page.Page.edges`"
+        objects = self.objects
+        return (
+            [edge for curve in objects.get("curve", []) for edge in utils.curve_to_edges(curve)]
+            + [edge for rect in objects.get("rect", []) for edge in utils.rect_to_edges(rect)]
+            + [utils.line_to_edge(line) for line in objects.get("line", [])]
+        )
+
+    def extract_text(self) -> str:
+        "Same as `pdfplumber.page.Page.extract_text()`"
+        return utils.chars_to_textmap(self.chars, layout_bbox=self.bbox, layout_width=self.width, layout_height=self.height).as_string
+
+    def close(self) -> None:
+        self._objects = None
+
+
+class _ConvertedDocument:
+
+    def __init__(self, native: Any, pages: list[_ConvertedPage], buffer: memoryview | None = None):
+        self.native = native
+        self.pages = pages
+        # The view on the memory-mapped document, released so that the caller closes the map
+        self.buffer = buffer
+
+    def close(self) -> None:
+        self.native.close()
+        if self.buffer is not None:
+            self.buffer.release()
+            self.buffer = None
+
+
+def _buffer_of(stream: BinaryIO | mmap.mmap) -> bytes | memoryview:
+    "The content of the stream without copy: the view of the memory-mapped file, the bytes shared by `io.BytesIO`"
+    if isinstance(stream, mmap.mmap):
+        return memoryview(stream)
+    if isinstance(stream, io.BytesIO):
+        # Note: The unchanged BytesIO returns the bytes it was created on, `getbuffer()` would copy them
+        return stream.getvalue()
+    stream.seek(0)
+    return stream.read()
+
+
+class _BufferReader(io.RawIOBase):
+    "The stream reading the chunks of the memory-mapped file on demand, as PDFium loads the document on the custom file access"
+
+    def __init__(self, buffer: mmap.mmap):
+        self._buffer = buffer
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._buffer)}[whence]
+        self._position = base + offset
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def readinto(self, target: Any) -> int:
+        chunk = self._buffer[self._position:self._position + len(target)]
+        target[:len(chunk)] = chunk
+        self._position += len(chunk)
+        return len(chunk)
+
+
+class _PyMuPDFPage(_ConvertedPage):
+
+    def _read_chars(self, page: Any) -> list[dict[str, Any]]:
+        # Note: The text trace keeps every glyph in the order of the content stream. The `rawdict` view drops
+        # the zero-size glyphs (e.g. the spaces of the `/ActualText` spans), which split the words for pdfminer
+        chars: list[dict[str, Any]] = []
+        for span in sorted(page.get_texttrace(), key=lambda x: x["seqno"]):
+            size = float(span["size"])
+            upright = span["dir"][0] > 0 and span["dir"][1] == 0
+            for unicode, _, origin, bbox in span["chars"]:
+                chars.append(_char_object(
+                    chr(unicode) if unicode >= 0 else "\ufffd", fontname=span["font"], size=size, upright=upright,
+                    x0=bbox[0], x1=bbox[2], bottom=origin[1] - span["descender"] * size,
+                    page_number=self.page_number, page_height=self.height,
+                ))
+        return chars
+
+    def _read_paths(self, page: Any) -> list[list[tuple[float, float]]]:
+        # Split the drawings into the subpaths of end points, as the path painting of pdfminer
+        paths: list[list[tuple[float, float]]] = []
+        for drawing in page.get_drawings():
+            subpaths: list[list[tuple[float, float]]] = []
+            for item in drawing["items"]:
+                if item[0] == "re":
+                    rect = item[1]
+                    subpaths.append([(rect.x0, rect.y1), (rect.x1, rect.y1), (rect.x1, rect.y0), (rect.x0, rect.y0), (rect.x0, rect.y1)])
+                    subpaths.append([])
+                    continue
+                if item[0] == "qu":
+                    quad = item[1]
+                    subpaths.append([(p.x, p.y) for p in (quad.ll, quad.lr, quad.ur, quad.ul, quad.ll)])
+                    subpaths.append([])
+                    continue
+
+                # Segment ("l" or "c"): the control points of the curve are not kept
+                start, end = (item[1].x, item[1].y), (item[-1].x, item[-1].y)
+                if len(subpaths) == 0 or len(subpaths[-1]) == 0 or subpaths[-1][-1] != start:
+                    subpaths.append([start])
+                subpaths[-1].append(end)
+
+            for points in subpaths:
+                if len(points) < 2:
+                    continue
+                if drawing.get("closePath") and points[-1] != points[0]:
+                    points = points + [points[0]]
+                paths.append(points)
+        return paths
+
+
+class PyMuPDFBackend(PDFBackend):
+    """The backend on MuPDF (C library), several times faster than pdfminer on parsing the page objects
+
+    Required the `pymupdf` package. Install by: pip install einvoice-lens[pymupdf]
+    """
+
+    name: ClassVar[str] = "pymupdf"
+
+    def open(self, stream: BinaryIO | mmap.mmap) -> _ConvertedDocument:
+        try:
+            import pymupdf
+        except ModuleNotFoundError:
+            raise ModuleNotFoundError("Required `pymupdf` for backend='pymupdf'. Install by: pip install einvoice-lens[pymupdf]")
+
+        buffer = _buffer_of(stream)
+        native = pymupdf.open(stream=buffer, filetype="pdf")
+
+        # The annotations (e.g. ink signature) are drawn by MuPDF but not part of the page content for pdfminer
+        # Note: The document is opened from memory, the file is not changed
+        for page in native:
+            if page.first_annot is not None:
+                native.xref_set_key(page.xref, "Annots", "null")
+
+        document = _ConvertedDocument(native, pages=[], buffer=buffer if isinstance(buffer, memoryview) else None)
+        for index, page in enumerate(native):
+            document.pages.append(_PyMuPDFPage(document, index, width=float(page.rect.width), height=float(page.rect.height)))
+        return document
+
+
+class _PdfiumPage(_ConvertedPage):
+
+    def _read_chars(self, page: Any) -> list[dict[str, Any]]:
+        import pypdfium2.raw as pdfium_c
+
+        # Note: The text page of PDFium is analysed text: the runs of spaces are collapsed and the zero-size glyphs
+        # are dropped. The zero-size text objects (e.g. the spaces of the `/ActualText` spans) are put back
+        # in the order of the content, they split the words for pdfminer
+        textpage = page.get_textpage()
+        chars: list[tuple[int, dict[str, Any]]] = []
+        fonts: dict[int, tuple[str, float]] = {}
+
+        def font_of(obj: Any) -> tuple[str, float]:
+            "The name and the descent ratio of the font"
+            font = pdfium_c.FPDFTextObj_GetFont(obj)
+            key = ctypes.cast(font, ctypes.c_void_p).value or 0
+            if key not in fonts:
+                buffer = ctypes.create_string_buffer(256)
+                pdfium_c.FPDFFont_GetBaseFontName(font, buffer, len(buffer))
+                descent = ctypes.c_float()
+                pdfium_c.FPDFFont_GetDescent(font, ctypes.c_float(1000.0), descent)
+                fonts[key] = (buffer.value.decode("utf-8", errors="replace"), descent.value / 1000)
+            return fonts[key]
+
+        try:
+            order: dict[int, int] = {}
+            for position in range(pdfium_c.FPDFPage_CountObjects(page.raw)):
+                obj = pdfium_c.FPDFPage_GetObject(page.raw, position)
+                order[ctypes.cast(obj, ctypes.c_void_p).value or 0] = position
+                if pdfium_c.FPDFPageObj_GetType(obj) != pdfium_c.FPDF_PAGEOBJ_TEXT:
+                    continue
+                matrix, font_size = pdfium_c.FS_MATRIX(), ctypes.c_float()
+                pdfium_c.FPDFPageObj_GetMatrix(obj, matrix)
+                pdfium_c.FPDFTextObj_GetFontSize(obj, font_size)
+                if matrix.a * matrix.d - matrix.b * matrix.c != 0:
+                    continue
+                length = pdfium_c.FPDFTextObj_GetText(obj, textpage.raw, None, 0)
+                buffer = ctypes.create_string_buffer(length * 2)
+                pdfium_c.FPDFTextObj_GetText(obj, textpage.raw, ctypes.cast(buffer, ctypes.POINTER(ctypes.c_ushort)), length)
+                fontname, descent_ratio = font_of(obj)
+                size = font_size.value * math.hypot(matrix.c, matrix.d)
+                for text in buffer.raw.decode("utf-16-le", errors="replace").rstrip("\x00") or " ":
+                    chars.append((position, _char_object(
+                        text, fontname=fontname, size=size, upright=False, x0=matrix.e, x1=matrix.e,
+                        bottom=self.height - matrix.f - descent_ratio * size,
+                        page_number=self.page_number, page_height=self.height,
+                    )))
+
+            x, y = ctypes.c_double(), ctypes.c_double()
+            box, matrix = pdfium_c.FS_RECTF(), pdfium_c.FS_MATRIX()
+            position = 0
+            for index in range(textpage.count_chars()):
+                # The spaces and line breaks generated by the text analysis are not in the content
+                if pdfium_c.FPDFText_IsGenerated(textpage, index) != 0:
+                    continue
+
+                obj = pdfium_c.FPDFText_GetTextObject(textpage, index)
+                # The objects of the form XObjects follow the previous object of the page
+                position = order.get(ctypes.cast(obj, ctypes.c_void_p).value or 0, position)
+                fontname, descent_ratio = font_of(obj)
+                pdfium_c.FPDFText_GetCharOrigin(textpage, index, x, y)
+                pdfium_c.FPDFText_GetLooseCharBox(textpage, index, box)
+                pdfium_c.FPDFText_GetMatrix(textpage, index, matrix)
+                size = pdfium_c.FPDFText_GetFontSize(textpage, index) * math.hypot(matrix.c, matrix.d)
+                chars.append((position, _char_object(
+                    chr(pdfium_c.FPDFText_GetUnicode(textpage, index)), fontname=fontname, size=size,
+                    upright=matrix.a * matrix.d > 0 and matrix.b == 0 and matrix.c == 0,
+                    x0=x.value, x1=max(x.value, box.right), bottom=self.height - y.value - descent_ratio * size,
+                    page_number=self.page_number, page_height=self.height,
+                )))
+        finally:
+            textpage.close()
+
+        # Stable sort, the chars of one object keep the order of the text page
+        return [char for _, char in sorted(chars, key=lambda x: x[0])]
+
+    def _read_paths(self, page: Any) -> list[list[tuple[float, float]]]:
+        import pypdfium2.raw as pdfium_c
+
+        paths: list[list[tuple[float, float]]] = []
+        x, y = ctypes.c_float(), ctypes.c_float()
+
+        def transform(outer: tuple[float, ...], obj: Any) -> tuple[float, ...]:
+            matrix = pdfium_c.FS_MATRIX()
+            pdfium_c.FPDFPageObj_GetMatrix(obj, matrix)
+            a, b, c, d, e, f = outer
+            return (
+                matrix.a * a + matrix.b * c, matrix.a * b + matrix.b * d,
+                matrix.c * a + matrix.d * c, matrix.c * b + matrix.d * d,
+                matrix.e * a + matrix.f * c + e, matrix.e * b + matrix.f * d + f,
+            )
+
+        def walk(objects: list[Any], outer: tuple[float, ...]) -> None:
+            for obj in objects:
+                kind = pdfium_c.FPDFPageObj_GetType(obj)
+                if kind == pdfium_c.FPDF_PAGEOBJ_FORM:
+                    walk([pdfium_c.FPDFFormObj_GetObject(obj, i) for i in range(pdfium_c.FPDFFormObj_CountObjects(obj))], transform(outer, obj))
+                    continue
+                if kind != pdfium_c.FPDF_PAGEOBJ_PATH:
+                    continue
+
+                a, b, c, d, e, f = transform(outer, obj)
+                subpaths: list[list[tuple[float, float]]] = []
+                pending = 0
+                for i in range(pdfium_c.FPDFPath_CountSegments(obj)):
+                    segment = pdfium_c.FPDFPath_GetPathSegment(obj, i)
+                    pdfium_c.FPDFPathSegment_GetPoint(segment, x, y)
+                    point = (a * x.value + c * y.value + e, self.height - (b * x.value + d * y.value + f))
+                    segment_type = pdfium_c.FPDFPathSegment_GetType(segment)
+                    if segment_type == pdfium_c.FPDF_SEGMENT_MOVETO or len(subpaths) == 0:
+                        subpaths.append([point])
+                    elif segment_type == pdfium_c.FPDF_SEGMENT_BEZIERTO:
+                        # The bezier is three segments, the control points are not kept
+                        pending = (pending + 1) % 3
+                        if pending == 0:
+                            subpaths[-1].append(point)
+                    else:
+                        subpaths[-1].append(point)
+                    if pdfium_c.FPDFPathSegment_GetClose(segment) and subpaths[-1][-1] != subpaths[-1][0]:
+                        subpaths[-1].append(subpaths[-1][0])
+                paths.extend([points for points in subpaths if len(points) >= 2])
+
+        walk([pdfium_c.FPDFPage_GetObject(page.raw, i) for i in range(pdfium_c.FPDFPage_CountObjects(page.raw))], (1.0, 0.0, 0.0, 1.0, 0.0, 0.0))
+        return paths
+
+    def _release(self, page: Any) -> None:
+        page.close()
+
+
+class PdfiumBackend(PDFBackend):
+    """The backend on PDFium (C++ library of Chromium), fast on parsing the page objects
+
+    Required the `pypdfium2` package. Install by: pip install einvoice-lens[pypdfium2]
+    """
+
+    name: ClassVar[str] = "pypdfium2"
+
+    def open(self, stream: BinaryIO | mmap.mmap) -> _ConvertedDocument:
+        try:
+            import pypdfium2
+        except ModuleNotFoundError:
+            raise ModuleNotFoundError("Required `pypdfium2` for backend='pypdfium2'. Install by: pip install einvoice-lens[pypdfium2]")
+
+        # The memory-mapped file is read by chunks, the bytes are loaded as they are
+        native = pypdfium2.PdfDocument(_BufferReader(stream) if isinstance(stream, mmap.mmap) else _buffer_of(stream))
+        document = _ConvertedDocument(native, pages=[])
+        for index in range(len(native)):
+            width, height = native.get_page_size(index)
+            document.pages.append(_PdfiumPage(document, index, width=float(width), height=float(height)))
+        return document
+
+
+BACKENDS: dict[str, type[PDFBackend]] = {
+    "pdfplumber": PdfplumberBackend,
+    "pymupdf": PyMuPDFBackend,
+    "pypdfium2": PdfiumBackend,
+}
+
+
+def get_backend(backend: "str | PDFBackend | None" = None) -> PDFBackend:
+    "Resolve the backend by name, default to pdfplumber"
+    if backend is None:
+        return PdfplumberBackend()
+    if isinstance(backend, PDFBackend):
+        return backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Invalid backend. Required one of {', '.join(BACKENDS)}. Got {backend!r}")
+    return BACKENDS[backend]()
@@ -0,0 +1,307 @@
+#!/bin/python3
+
+# Global
+import os
+import pathlib
+import multiprocessing
+from typing import TypedDict, Literal, Iterable, Iterator
+from typing import TYPE_CHECKING, Any
+from concurrent.futures import ProcessPoolExecutor, Future, FIRST_COMPLETED, wait
+
+# Internal
+from einvoice_lens.compact import CompactInvoiceResult
+from einvoice_lens.engine import CommericalInvoiceResult, DocumentSource, _line_item_dtypes, parse_commerical_invoice
+
+if TYPE_CHECKING:
+    import polars as pl
+    from einvoice_lens.sink import ParquetDatasetSink
+
+
+class BatchError(TypedDict):
+    type: str
+    message: str
+
+
+class BatchRecord(TypedDict):
+    index: int
+    source_path: str | None
+    # PARTIAL: the document reached one of the `limits`, the result holds the pages parsed so far
+    status: Literal["SUCCESS", "PARTIAL", "FAILED"]
+    # `CompactInvoiceResult` with the `compact` option
+    result: CommericalInvoiceResult | CompactInvoiceResult | None
+    error: BatchError | None
+
+
+def _source_path_of(path: DocumentSource) -> str | None:
+    return pathlib.Path(path).as_posix() if isinstance(path, (str, os.PathLike)) else None
+
+
+def _failed_record(index: int, source_path: str | None, exc: BaseException) -> BatchRecord:
+    return BatchRecord(
+        index=index,
+        source_path=source_path,
+        status="FAILED",
+        result=None,
+        error={"type": type(exc).__name__, "message": str(exc)},
+    )
+
+
+def _picklable_source(path: DocumentSource) -> str | os.PathLike | bytes:
+    "The in-memory document sent into the worker: memoryview and stream can't be pickled, they are read into bytes"
+    if isinstance(path, (str, os.PathLike, bytes)):
+        return path
+    if isinstance(path, (bytearray, memoryview)):
+        return bytes(path)
+    return path.read()
+
+
+def _parse_one(index: int, path: DocumentSource, options: dict, compact: bool = False) -> BatchRecord:
+    "Run inside the worker. Any failure of the document is captured as the error record"
+    source_path = _source_path_of(path)
+    try:
+        result = parse_commerical_invoice(path, **options)
+        if compact:
+            result = CompactInvoiceResult.from_dict(result)
+    except Exception as exc:
+        return _failed_record(index, source_path, exc)
+    limit_exceeded = result.runtime_metadata.limit_exceeded if compact else result["runtime_metadata"]["limit_exceeded"]
+    if limit_exceeded is not None:
+        return BatchRecord(
+            index=index,
+            source_path=source_path,
+            status="PARTIAL",
+            result=result,
+            error={"type": "LimitExceededError", "message": limit_exceeded["message"]},
+        )
+    return BatchRecord(
+        index=index,
+        source_path=source_path,
+        status="SUCCESS",
+        result=result,
+        error=None,
+    )
+
+
+def parse_commerical_invoices(
+    paths: Iterable[DocumentSource],
+    workers: int | None = None,
+    ordered: bool = True,
+    max_pending: int | None = None,
+    compact: bool = False,
+    sink: "ParquetDatasetSink | None" = None,
+    executor: ProcessPoolExecutor | None = None,
+    **options,
+) -> Iterator[BatchRecord]:
+    """Parse many commerical invoices by spreading documents across a process pool
+
+    Args
+    ----
+    paths (Iterable[str]): The paths into PDF files. It's consumed lazily so that a generator is accepted
+    workers (int | None): The number of worker processes. Default to `os.cpu_count()`.
+        With `workers=1` the documents are parsed in the current process
+    ordered (bool): Yield records on input order when True, otherwise on completion order
+    max_pending (int | None): The maximum of documents submitted but not yielded yet. Default to `workers * 4`
+    compact (bool): Return the results as `CompactInvoiceResult` (slotted records, converted inside the worker)
+        for holding many results in memory. The dict shape is returned by `result.to_dict()`. Default to False
+    sink (ParquetDatasetSink | None): Append the profile and the line items of each record into the partitioned
+        Parquet datasets, on the current process as the records are yielded. The sink is closed by the caller
+    executor (ProcessPoolExecutor | None): The pool kept by the caller across the batches (e.g. the scans of
+        `DirectoryWatcher`), so that the workers are spawned once. Default to a pool per call
+    **options: The keyword arguments forwarded into `parse_commerical_invoice`
+
+    Return
+    ------
+    Iterator[BatchRecord]: The record per document. Failed document is returned with status="FAILED"
+        and the error detail instead of aborting the whole batch. The document reaching the `limits` option
+        (`ParseLimits`) is returned with status="PARTIAL", so that a pathological file doesn't hold a worker
+
+    Usage
+    -----
+    >>> from einvoice_lens import parse_commerical_invoices
+    >>> for record in parse_commerical_invoices(["a.pdf", "b.pdf"], workers=4):
+    ...     print(record["status"], record["source_path"])
+    """
+
+    workers = workers or os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError(f"Required workers >= 1. Got workers={workers!r}")
+
+    max_pending = max_pending or workers * 4
+    if max_pending < workers:
+        raise ValueError(f"Required max_pending >= workers. Got max_pending={max_pending!r}, workers={workers!r}")
+
+    # The records are written by one process, the workers only parse
+    if sink is not None:
+        for record in parse_commerical_invoices(paths, workers=workers, ordered=ordered, max_pending=max_pending, compact=compact, executor=executor, **options):
+            sink.write(record)
+            yield record
+        return
+
+    # The pool of the caller
+    if executor is not None:
+        yield from _parse_on_pool(executor, paths, options, compact=compact, ordered=ordered, max_pending=max_pending)
+        return
+
+    # Sequential on current process, avoid the cost of spawning the pool
+    if workers == 1:
+        for index, path in enumerate(paths, start=0):
+            yield _parse_one(index, path, options, compact=compact)
+        return
+
+    # Note: Use `spawn` as forking a process after polars initialized its thread pool can deadlock
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        yield from _parse_on_pool(executor, paths, options, compact=compact, ordered=ordered, max_pending=max_pending)
+
+
+def _parse_on_pool(
+    executor: ProcessPoolExecutor,
+    paths: Iterable[DocumentSource],
+    options: dict,
+    compact: bool,
+    ordered: bool,
+    max_pending: int,
+) -> Iterator[BatchRecord]:
+    """Keep a bounded window of submitted documents so that a large input (tens of thousands of paths)
+    doesn't hold all futures and results in memory at the same time
+    """
+    pending: dict[Future, tuple[int, str | None]] = {}
+    completed: dict[int, BatchRecord] = {}
+    on_yield_index: int = 0
+    exhausted: bool = False
+    iter_paths = enumerate(paths, start=0)
+
+    while not exhausted or len(pending) > 0:
+
+        # Submit until reach the window (the records waiting for order are counted too)
+        while not exhausted and len(pending) + len(completed) < max_pending:
+            try:
+                index, path = next(iter_paths)
+            except StopIteration:
+                exhausted = True
+                break
+            source_path = _source_path_of(path)
+            try:
+                pending[executor.submit(_parse_one, index, _picklable_source(path), options, compact)] = (index, source_path)
+            except Exception as exc:
+                # The stream failed to read, or the pool is broken by a crashed worker
+                record = _failed_record(index, source_path, exc)
+                if not ordered:
+                    yield record
+                    continue
+                completed[index] = record
+
+        # Collect
+        done = wait(pending, return_when=FIRST_COMPLETED)[0] if len(pending) > 0 else set()
+        for future in done:
+            index, source_path = pending.pop(future)
+            try:
+                record = future.result()
+            except Exception as exc:
+                # The worker died (`BrokenProcessPool`) or the document failed to transfer
+                record = _failed_record(index, source_path, exc)
+            if not ordered:
+                yield record
+                continue
+            completed[record["index"]] = record
+
+        while on_yield_index in completed:
+            yield completed.pop(on_yield_index)
+            on_yield_index += 1
+
+
+def _line_item_key_dtypes() -> "dict[str, pl.DataType]":
+    import polars as pl
+    return {
+        "checksum_crc32c": pl.String,
+        "serial_no": pl.String,
+        "invoice_number": pl.String,
+    }
+
+
+def __getattr__(name: str) -> Any:
+    if name == "LINE_ITEM_KEY_DTYPES":
+        return _line_item_key_dtypes()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _line_items_frame(result: CommericalInvoiceResult | CompactInvoiceResult) -> "pl.DataFrame":
+    "The typed line items of the result, prefixed by the invoice-level keys"
+    import polars as pl
+
+    if isinstance(result, CompactInvoiceResult):
+        result = result.to_dict()
+
+    line_item_dtypes = _line_item_dtypes()
+    dataset = result["dataset"]
+    if isinstance(dataset, list):
+        dataset = pl.DataFrame(dataset, schema=line_item_dtypes)
+    elif not isinstance(dataset, pl.DataFrame):
+        dataset = pl.from_arrow(dataset)
+
+    attribute = result["profile"]["attribute"]
+    return (
+        dataset
+        .cast(line_item_dtypes)
+        .select([
+            pl.lit(result["runtime_metadata"]["checksum_crc32c"], dtype=pl.String).alias("checksum_crc32c"),
+            pl.lit(attribute.get("serial_no"), dtype=pl.String).alias("serial_no"),
+            pl.lit(attribute.get("invoice_number"), dtype=pl.String).alias("invoice_number"),
+            pl.all(),
+        ])
+    )
+
+
+def collect_line_items(results: Iterable[BatchRecord | CommericalInvoiceResult]) -> "pl.DataFrame":
+    """Concatenate the line items of many invoices into one columnar frame with the invoice-level keys
+
+    Args
+    ----
+    results (Iterable[BatchRecord | CommericalInvoiceResult]): The batch records (failed and partial ones are skipped)
+        or the results, compact or not. The dataset is accepted on any format: list of dicts, `pl.DataFrame`, `pyarrow.Table`
+
+    Return
+    ------
+    pl.DataFrame: The line items with columns: checksum_crc32c, serial_no, invoice_number, no, product_description, ...
+
+    Usage
+    -----
+    >>> from einvoice_lens import parse_commerical_invoices, collect_line_items
+    >>> records = parse_commerical_invoices(paths, workers=4, dataset_format="polars")
+    >>> collect_line_items(records).write_parquet("line_items.parquet")
+    """
+
+    import polars as pl
+
+    frames: list[pl.DataFrame] = []
+    for result in results:
+
+        # Batch record
+        if isinstance(result, dict) and "status" in result:
+            if result["status"] != "SUCCESS":
+                continue
+            result = result["result"]
+
+        frames.append(_line_items_frame(result))
+
+    if len(frames) == 0:
+        return pl.DataFrame(schema={**_line_item_key_dtypes(), **_line_item_dtypes()})
+
+    return pl.concat(frames, how="vertical", rechunk=True)
+
+
+def write_line_items_parquet(results: Iterable[BatchRecord | CommericalInvoiceResult], path: str, **kwargs) -> "pl.DataFrame":
+    """Concatenate the line items of many invoices then write into one Parquet file
+
+    Args
+    ----
+    results (Iterable[BatchRecord | CommericalInvoiceResult]): The batch records or the results
+    path (str): The path of Parquet file
+    **kwargs: The keyword arguments forwarded into `pl.DataFrame.write_parquet`
+
+    Return
+    ------
+    pl.DataFrame: The written line items
+    """
+    dataset = collect_line_items(results)
+    dataset.write_parquet(path, **kwargs)
+    return dataset
@@ -0,0 +1,261 @@
+#!/bin/python3
+
+# Global
+import json
+import time
+import sqlite3
+import pathlib
+import threading
+from datetime import date, datetime
+from typing import Any
+
+# Internal
+from einvoice_lens.serialize import dumps_json
+
+
+def _decode_result(payload: str) -> dict[str, Any]:
+    "Restore the date/datetime fields that were serialized into ISO format"
+    result = json.loads(payload)
+
+    pipeline = result["runtime_metadata"]["pipeline"]
+    for key in ("start", "end"):
+        if pipeline.get(key) is not None:
+            pipeline[key] = datetime.fromisoformat(pipeline[key])
+
+    attribute = result["profile"]["attribute"]
+    if attribute.get("issue_date") is not None:
+        attribute["issue_date"] = date.fromisoformat(attribute["issue_date"])
+
+    return result
+
+
+class _SQLiteStore:
+    """The SQLite file shared by the processes and the threads: one connection per thread
+
+    The connection belongs to the thread opening it, so that the stores used by a thread executor
+    (e.g. `serve --executor thread`) open their own connection on the first use of each thread
+    """
+
+    def __init__(self, path: str | None):
+        self.path = pathlib.Path(path).as_posix() if path is not None else None
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict[str, Any]:
+        # The connections can't be pickled into the pool worker, they are re-opened on first use
+        state = self.__dict__.copy()
+        for key in ("_local", "_connections", "_lock"):
+            state.pop(key)
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _initialize(self, connection: sqlite3.Connection) -> None:
+        "Create the tables on the new connection"
+        raise NotImplementedError
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            pathlib.Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            # Only used by this thread, `check_same_thread=False` lets `close` run from any thread
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._initialize(connection)
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def close(self) -> None:
+        "Close the connections of every thread"
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+
+class ResultCache(_SQLiteStore):
+    """On-disk result cache, content-addressed by the CRC32C checksum of the document
+
+    The entry is keyed on (checksum, engine version, options) so that upgrading the package never serves
+    a result produced by an older engine, nor by other parsing options (e.g. a custom rule set).
+    Stored on a single SQLite file so that it's safe to share between the worker processes of a batch.
+
+    Args
+    ----
+    path (str): The path into SQLite file. The parent directory is created if not exist
+    max_entries (int | None): Evict least recently used entries over this number
+    max_size_mb (float | None): Evict least recently used entries over this total payload size
+    max_age_seconds (float | None): Entries created before this age are expired
+
+    Usage
+    -----
+    >>> from einvoice_lens import parse_commerical_invoice, ResultCache
+    >>> cache = ResultCache("cache/einvoice-lens.sqlite", max_age_seconds=7 * 86400)
+    >>> result = parse_commerical_invoice("path/to/input.pdf", cache=cache)
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int | None = None,
+        max_size_mb: float | None = None,
+        max_age_seconds: float | None = None,
+    ):
+        super().__init__(path)
+        self.max_entries = max_entries
+        self.max_size_mb = max_size_mb
+        self.max_age_seconds = max_age_seconds
+
+    def _initialize(self, connection: sqlite3.Connection) -> None:
+        # The entries of the older layout are not keyed on the options, they can't be trusted
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(results)")]
+        if len(columns) > 0 and "options" not in columns:
+            connection.execute("DROP TABLE results")
+
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                checksum TEXT NOT NULL,
+                engine_version TEXT NOT NULL,
+                options TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (checksum, engine_version, options)
+            )
+        """)
+
+    @staticmethod
+    def engine_version() -> str:
+        from einvoice_lens import __version__
+        return __version__
+
+    def get(self, checksum: str, options: str = "") -> dict[str, Any] | None:
+        "Get the cached result of the checksum parsed with the options fingerprint, None when missed or expired"
+        row = self.connection.execute(
+            "SELECT payload, created_at FROM results WHERE checksum = ? AND engine_version = ? AND options = ?",
+            (checksum, self.engine_version(), options),
+        ).fetchone()
+        if row is None:
+            return None
+
+        payload, created_at = row
+        if self.max_age_seconds is not None and time.time() - created_at > self.max_age_seconds:
+            self.invalidate(checksum)
+            return None
+
+        self.connection.execute(
+            "UPDATE results SET accessed_at = ? WHERE checksum = ? AND engine_version = ? AND options = ?",
+            (time.time(), checksum, self.engine_version(), options),
+        )
+        return _decode_result(payload)
+
+    def set(self, checksum: str, result: dict[str, Any], options: str = "") -> None:
+        "Store the result of the checksum parsed with the options fingerprint then apply the eviction"
+        payload = dumps_json(result)
+        now = time.time()
+        self.connection.execute(
+            "INSERT OR REPLACE INTO results (checksum, engine_version, options, payload, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (checksum, self.engine_version(), options, payload, len(payload.encode("utf-8")), now, now),
+        )
+        self.evict()
+
+    def invalidate(self, checksum: str | None = None) -> int:
+        "Remove the entries of the checksum (all engine versions and options), or every entry when checksum is None"
+        if checksum is None:
+            cursor = self.connection.execute("DELETE FROM results")
+        else:
+            cursor = self.connection.execute("DELETE FROM results WHERE checksum = ?", (checksum,))
+        return cursor.rowcount
+
+    def evict(self) -> int:
+        "Apply the age, entry count and size limits. Return the number of removed entries"
+        removed = 0
+
+        if self.max_age_seconds is not None:
+            cursor = self.connection.execute("DELETE FROM results WHERE created_at < ?", (time.time() - self.max_age_seconds,))
+            removed += cursor.rowcount
+
+        if self.max_entries is not None:
+            cursor = self.connection.execute(
+                "DELETE FROM results WHERE rowid NOT IN (SELECT rowid FROM results ORDER BY accessed_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            removed += cursor.rowcount
+
+        if self.max_size_mb is not None:
+            max_size = self.max_size_mb * 10**6
+            # Keep the most recently accessed entries which fit into the size
+            cursor = self.connection.execute("""
+                DELETE FROM results WHERE rowid IN (
+                    SELECT rowid FROM (
+                        SELECT rowid, SUM(size) OVER (ORDER BY accessed_at DESC, rowid DESC) AS cumulative_size
+                        FROM results
+                    ) WHERE cumulative_size > ?
+                )
+            """, (max_size,))
+            removed += cursor.rowcount
+
+        return removed
+
+
+class OCRCache(_SQLiteStore):
+    """On-disk cache of the recognized scanned pages, keyed on (checksum, page, dpi, engine)
+
+    The rasterization and the recognition are the slowest stages by far, so that the page is recognized once
+    whatever the parsing options of the result (e.g. a custom rule set re-reading the same scan).
+    Stored on a single SQLite file as `ResultCache`, safe to share between the worker processes of a batch.
+
+    Args
+    ----
+    path (str): The path into SQLite file. The parent directory is created if not exist
+
+    Usage
+    -----
+    >>> from einvoice_lens import parse_commerical_invoice, OCRSettings, OCRCache
+    >>> result = parse_commerical_invoice("path/to/scanned.pdf", ocr=OCRSettings(cache=OCRCache("cache/ocr.sqlite")))
+    """
+
+    def _initialize(self, connection: sqlite3.Connection) -> None:
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                checksum TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                dpi INTEGER NOT NULL,
+                engine TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (checksum, page, dpi, engine)
+            )
+        """)
+
+    def get(self, checksum: str, page: int, dpi: int, engine: str) -> dict[str, Any] | None:
+        "Get the recognized words and ruling lines of the page, None when missed"
+        row = self.connection.execute(
+            "SELECT payload FROM pages WHERE checksum = ? AND page = ? AND dpi = ? AND engine = ?",
+            (checksum, page, dpi, engine),
+        ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def set(self, checksum: str, page: int, dpi: int, engine: str, recognized: dict[str, Any]) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO pages (checksum, page, dpi, engine, payload, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (checksum, page, dpi, engine, dumps_json(recognized), time.time()),
+        )
+
+    def invalidate(self, checksum: str | None = None) -> int:
+        "Remove the pages of the checksum, or every page when checksum is None"
+        if checksum is None:
+            cursor = self.connection.execute("DELETE FROM pages")
+        else:
+            cursor = self.connection.execute("DELETE FROM pages WHERE checksum = ?", (checksum,))
+        return cursor.rowcount
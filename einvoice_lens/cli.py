@@ -1,17 +1,66 @@
 #!/bin/python3
 
 # Global
+import os
+import sys
+import glob
 import pprint
 import argparse
 import textwrap
+from typing import Iterable, Iterator, TextIO
 
 # Internal
-from einvoice_lens.engine import parse_commerical_invoice
+from einvoice_lens.batch import parse_commerical_invoices
+from einvoice_lens.serialize import dumps_json
+from einvoice_lens.cache import OCRCache, ResultCache
+from einvoice_lens.templates import TemplateRegistry
+from einvoice_lens.backends import BACKENDS
+from einvoice_lens.limits import ParseLimits
+from einvoice_lens.ocr import OCR_ENGINES, OCRSettings
+from einvoice_lens.sink import ParquetDatasetSink
 
 
-if __name__ == "__main__":
+def _expand_path(path: str) -> Iterator[str]:
+    "Expand one input into PDF files. Input is one of: file, directory (recursive) or glob pattern"
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for file in sorted(files):
+                if file.lower().endswith(".pdf"):
+                    yield os.path.join(root, file)
+    elif glob.has_magic(path):
+        yield from sorted(glob.iglob(path, recursive=True))
+    else:
+        yield path
 
-    # Handlers
+
+def _read_paths_from(stream: TextIO) -> Iterator[str]:
+    "Read newline-separated paths, skip the blank lines"
+    for line in stream:
+        line = line.strip()
+        if line != "":
+            yield line
+
+
+def iter_input_paths(paths: Iterable[str], paths_from: str | None = None) -> Iterator[str]:
+    "Resolve inputs from --path and --paths-from lazily so that a large archive is not listed upfront"
+    for path in paths:
+        yield from _expand_path(path)
+
+    if paths_from is None:
+        return
+
+    if paths_from == "-":
+        for path in _read_paths_from(sys.stdin):
+            yield from _expand_path(path)
+        return
+
+    with open(paths_from, "r", encoding="utf-8") as f:
+        for path in _read_paths_from(f):
+            yield from _expand_path(path)
+
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         prog="python -m einvoice_lens.cli",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -24,14 +73,140 @@ if __name__ == "__main__":
         Base case
         >>> python -m einvoice_lens.cli --path <document-path>
 
+        Directory or glob, stream one JSON line per document
+        >>> python -m einvoice_lens.cli --path <directory> --path "archive/**/*.pdf" --workers 4
+
+        Paths from stdin
+        >>> find archive -name "*.pdf" | python -m einvoice_lens.cli --paths-from -
+
+        Persistent worker (JSON-RPC on stdin/stdout or Unix socket)
+        >>> python -m einvoice_lens.cli serve --help
+
+        Watch a directory, parse the new or changed files only
+        >>> python -m einvoice_lens.cli watch --help
+
         Help
         >>> python -m einvoice_lens.cli --help
         """),
         epilog="Copyright (c) of Thuyet Bao"
     )
-    parser.add_argument("--path", help="Path to the PDF file", type=str, required=True)
-    parameters = parser.parse_args()
+    parser.add_argument("--path", help="Path to the PDF file, directory or glob pattern. Repeatable", type=str, action="append", default=[])
+    parser.add_argument("--paths-from", help="File of newline-separated paths, use '-' for stdin", type=str, default=None)
+    parser.add_argument("--workers", help="Number of worker processes. Default to the number of CPUs", type=int, default=None)
+    parser.add_argument("--format", help="Output format. Default to jsonl", choices=["jsonl", "pprint"], default="jsonl")
+    parser.add_argument("--stop-at-total-amount", help="Stop scanning pages for line items once the totals block is found", action="store_true")
+    parser.add_argument("--cache", help="Path to the SQLite result cache. Default to no cache", type=str, default=None)
+    parser.add_argument("--cache-refresh", help="Re-parse documents and overwrite the cached results", action="store_true")
+    parser.add_argument("--cache-clear", help="Invalidate every entry of the cache before running", action="store_true")
+    parser.add_argument("--cache-max-age", help="Expire cached results older than this number of seconds", type=float, default=None)
+    parser.add_argument("--cache-max-size", help="Evict least recently used cached results over this size in MB", type=float, default=None)
+    parser.add_argument("--templates", help="Path to the SQLite layout templates of the vendors, learned and applied on the fly", type=str, default=None)
+    parser.add_argument("--unordered", help="Emit results on completion order instead of input order", action="store_true")
+    parser.add_argument("--backend", help="PDF library reading the page objects. Default to pdfplumber", choices=list(BACKENDS), default=None)
+    parser.add_argument("--signature", help="Read the digital signature of the documents", action="store_true")
+    parser.add_argument("--verify-signature", help="Read the digital signature and check its byte range and digest", action="store_true")
+    parser.add_argument("--ocr", help="Recognize the scanned pages (without text layer) by the local OCR engine", choices=list(OCR_ENGINES), default=None)
+    parser.add_argument("--ocr-dpi", help="Resolution of the rasterized scanned pages. Default to 300", type=int, default=300)
+    parser.add_argument("--ocr-cache", help="Path to the SQLite cache of the recognized pages. Default to no cache", type=str, default=None)
+    parser.add_argument("--sink", help="Directory of the partitioned Parquet datasets (profiles, line items). The output lines then hold the status only", type=str, default=None)
+    parser.add_argument("--sink-row-group-size", help="Rows of one partition buffered before writing its file. Default to 100000", type=int, default=100_000)
+    parser.add_argument("--max-file-size", help="Reject documents over this size in MB", type=float, default=None)
+    parser.add_argument("--max-pages", help="Parse the line items of the first pages only", type=int, default=None)
+    parser.add_argument("--page-timeout", help="Stop a document once a page takes over this number of seconds", type=float, default=None)
+    parser.add_argument("--document-timeout", help="Stop a document once it takes over this number of seconds", type=float, default=None)
+    parser.add_argument("--max-memory", help="Stop a document once the memory of the worker grows over this size in MB", type=float, default=None)
+    return parser
+
+
+def build_limits(parameters: argparse.Namespace) -> ParseLimits | None:
+    "The limits of the document from the CLI options, None when unlimited"
+    limits = ParseLimits(
+        max_file_size_mb=parameters.max_file_size,
+        max_pages=parameters.max_pages,
+        page_timeout_seconds=parameters.page_timeout,
+        document_timeout_seconds=parameters.document_timeout,
+        max_memory_mb=parameters.max_memory,
+    )
+    return limits if any(value is not None for value in limits) else None
+
+
+def build_ocr(parameters: argparse.Namespace) -> OCRSettings | None:
+    "The OCR fallback from the CLI options, the pages are recognized inside the batch workers"
+    if parameters.ocr is None:
+        return None
+    cache = OCRCache(parameters.ocr_cache) if parameters.ocr_cache is not None else None
+    return OCRSettings(engine=parameters.ocr, dpi=parameters.ocr_dpi, workers=1, cache=cache)
+
+
+def main(argv: list[str] | None = None) -> int:
+
+    # Persistent worker
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) > 0 and argv[0] == "serve":
+        from einvoice_lens.server import main as serve_main
+        return serve_main(argv[1:])
+
+    # Incremental directory watch
+    if len(argv) > 0 and argv[0] == "watch":
+        from einvoice_lens.watch import main as watch_main
+        return watch_main(argv[1:])
+
+    # Handlers
+    parser = build_parser()
+    parameters = parser.parse_args(argv)
+
+    if len(parameters.path) == 0 and parameters.paths_from is None:
+        parser.error("Required at least one of --path or --paths-from")
+
+    # Options
+    options = {
+        "stop_at_total_amount": parameters.stop_at_total_amount,
+        "backend": parameters.backend,
+        "limits": build_limits(parameters),
+        "signature": parameters.signature,
+        "verify_signature": parameters.verify_signature,
+        "ocr": build_ocr(parameters),
+    }
+
+    # Cache
+    if parameters.cache is not None:
+        cache = ResultCache(parameters.cache, max_size_mb=parameters.cache_max_size, max_age_seconds=parameters.cache_max_age)
+        if parameters.cache_clear:
+            cache.invalidate()
+        cache.close()
+        options.update(cache=cache, cache_refresh=parameters.cache_refresh)
+
+    # Layout templates
+    if parameters.templates is not None:
+        options.update(templates=TemplateRegistry(parameters.templates))
 
     # Parse
-    result = parse_commerical_invoice(parameters.path)
-    pprint.pp(result, depth=4)
+    # Each result is written as soon as it's finished, nothing is held after written
+    paths = iter_input_paths(parameters.path, paths_from=parameters.paths_from)
+    sink = ParquetDatasetSink(parameters.sink, row_group_size=parameters.sink_row_group_size) if parameters.sink is not None else None
+    records = parse_commerical_invoices(paths, workers=parameters.workers, ordered=not parameters.unordered, sink=sink, **options)
+
+    exit_code = 0
+    try:
+        for record in records:
+            if record["status"] != "SUCCESS":
+                exit_code = 1
+
+            # The results are in the datasets
+            if sink is not None:
+                record = {**record, "result": None}
+
+            if parameters.format == "pprint":
+                pprint.pp(record["result"] if record["status"] == "SUCCESS" and sink is None else record, depth=4)
+            else:
+                sys.stdout.write(dumps_json(record) + "\n")
+                sys.stdout.flush()
+    finally:
+        if sink is not None:
+            sink.close()
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+#!/bin/python3
+
+# Global
+import dataclasses
+from datetime import date, datetime
+from typing import Any, Mapping
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import polars as pl
+    import pyarrow
+    from einvoice_lens.engine import CommericalInvoiceResult
+
+
+class _CompactRecord:
+    "The dict shape of the slotted record, the nested records are converted too"
+
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls, mapping: Mapping[str, Any]) -> Any:
+        "The fields missing on the mapping (e.g. not found by the rules) are None"
+        return cls(**{field.name: mapping.get(field.name) for field in dataclasses.fields(cls)})
+
+    def to_dict(self) -> dict[str, Any]:
+        return {field.name: _dict_value(getattr(self, field.name)) for field in dataclasses.fields(self)}
+
+
+def _dict_value(value: Any) -> Any:
+    "The nested record (or the tuple of records) into its dict shape"
+    if isinstance(value, _CompactRecord):
+        return value.to_dict()
+    if isinstance(value, tuple):
+        return [_dict_value(item) for item in value]
+    return value
+
+
+@dataclasses.dataclass(slots=True)
+class CompactLineItem(_CompactRecord):
+    no: int | None
+    product_description: str | None
+    unit: str | None
+    quantity: int | None
+    unit_price: float | None
+    amount: float | None
+
+
+@dataclasses.dataclass(slots=True)
+class CompactDocumentAttribute(_CompactRecord):
+    document_type: str | None = None
+    display_format: str | None = None
+    issue_date: date | None = None
+    tax_agent_code: str | None = None
+    serial_no: str | None = None
+    invoice_number: str | None = None
+    digital_signature: Any = None
+
+
+@dataclasses.dataclass(slots=True)
+class CompactSellerInformation(_CompactRecord):
+    name: str | None = None
+    tax_code: str | None = None
+    address: str | None = None
+    tel: str | None = None
+    email: str | None = None
+    fax: str | None = None
+    account_number: str | None = None
+
+
+@dataclasses.dataclass(slots=True)
+class CompactBuyerInformation(_CompactRecord):
+    name: str | None = None
+    company: str | None = None
+    tax_code: str | None = None
+    address: str | None = None
+    tel: str | None = None
+    email: str | None = None
+    fax: str | None = None
+    account_number: str | None = None
+
+
+@dataclasses.dataclass(slots=True)
+class CompactInvoicePartnerInformation(_CompactRecord):
+    name: str | None = None
+    endpoint_search_invoice: str | None = None
+    search_keyword_id: str | None = None
+    tax_code: str | None = None
+    contact: str | None = None
+    logo: str | None = None
+
+
+@dataclasses.dataclass(slots=True)
+class CompactInvoiceProfile(_CompactRecord):
+    attribute: CompactDocumentAttribute
+    seller: CompactSellerInformation
+    buyer: CompactBuyerInformation
+    invoice_partner: CompactInvoicePartnerInformation
+
+    @classmethod
+    def from_dict(cls, mapping: Mapping[str, Any]) -> "CompactInvoiceProfile":
+        return cls(
+            attribute=CompactDocumentAttribute.from_dict(mapping["attribute"]),
+            seller=CompactSellerInformation.from_dict(mapping["seller"]),
+            buyer=CompactBuyerInformation.from_dict(mapping["buyer"]),
+            invoice_partner=CompactInvoicePartnerInformation.from_dict(mapping["invoice_partner"]),
+        )
+
+
+@dataclasses.dataclass(slots=True)
+class CompactPageMetadata(_CompactRecord):
+    page: int
+    extract_tables_seconds: float
+    normalization_seconds: float
+    total_records: int
+    line_items: int
+
+
+@dataclasses.dataclass(slots=True)
+class CompactLayoutMetadata(_CompactRecord):
+    pages_parsed: int
+    shared_pages: int
+    reused_views: int
+
+
+@dataclasses.dataclass(slots=True)
+class CompactTextNormalizationMetadata(_CompactRecord):
+    hits: int
+    misses: int
+    hit_rate: float | None
+    cache_size: int
+
+
+@dataclasses.dataclass(slots=True)
+class CompactPipelineMetadata(_CompactRecord):
+    start: datetime
+    end: datetime | None
+    processing_in_seconds: float
+    # The stages vary by the options (ocr, signature, cache, ...), kept as the dict
+    stages: dict[str, float]
+    pages: tuple[CompactPageMetadata, ...]
+    line_items: int
+    memory_growth_mb: float | None = None
+    process_peak_memory_mb: float | None = None
+    layout: CompactLayoutMetadata | None = None
+    text_normalization: CompactTextNormalizationMetadata | None = None
+
+    @classmethod
+    def from_dict(cls, mapping: Mapping[str, Any]) -> "CompactPipelineMetadata":
+        layout, text_normalization = mapping.get("layout"), mapping.get("text_normalization")
+        return cls(
+            start=mapping["start"],
+            end=mapping.get("end"),
+            processing_in_seconds=mapping["processing_in_seconds"],
+            stages=mapping["stages"],
+            pages=tuple([CompactPageMetadata.from_dict(page) for page in mapping.get("pages", [])]),
+            line_items=mapping["line_items"],
+            memory_growth_mb=mapping.get("memory_growth_mb"),
+            process_peak_memory_mb=mapping.get("process_peak_memory_mb"),
+            layout=CompactLayoutMetadata.from_dict(layout) if layout is not None else None,
+            text_normalization=CompactTextNormalizationMetadata.from_dict(text_normalization) if text_normalization is not None else None,
+        )
+
+
+@dataclasses.dataclass(slots=True)
+class CompactDatasetValidation(_CompactRecord):
+    total_amount: float | None
+    total_amount_in_words: str | None
+    line_items: int
+    sum_amount: float
+    total_amount_matched: bool | None
+    mismatched_rows: list[int]
+    no_gaps: list[list[int]]
+    confidence: str
+
+
+@dataclasses.dataclass(slots=True)
+class CompactRuntimeMetadata(_CompactRecord):
+    """The runtime metadata on slotted records, the pipeline (with one record per page) and the validation
+
+    The metadata of the options (layout template, limit, segment, OCR) are None on most of the results,
+    they are kept as the dicts.
+    """
+    source_path: str | None
+    checksum_crc32c: str | None
+    total_pages: int
+    file_size_mb: float
+    pipeline: CompactPipelineMetadata
+    cache_hit: bool
+    backend: str | None = None
+    layout_template: dict[str, Any] | None = None
+    limit_exceeded: dict[str, Any] | None = None
+    validation: CompactDatasetValidation | None = None
+    segment: dict[str, Any] | None = None
+    ocr: dict[str, Any] | None = None
+
+    @classmethod
+    def from_dict(cls, mapping: Mapping[str, Any]) -> "CompactRuntimeMetadata":
+        validation = mapping.get("validation")
+        return cls(**{
+            **{field.name: mapping.get(field.name) for field in dataclasses.fields(cls)},
+            "pipeline": CompactPipelineMetadata.from_dict(mapping["pipeline"]),
+            "validation": CompactDatasetValidation.from_dict(validation) if validation is not None else None,
+        })
+
+
+@dataclasses.dataclass(slots=True)
+class CompactInvoiceResult(_CompactRecord):
+    """The result of `parse_commerical_invoice` on slotted records, for holding many results in memory
+
+    The line items of a list of dicts are held as a tuple of `CompactLineItem` (no per-item dict nor keys, about
+    40% smaller with the values), the polars frame and the arrow table are kept as they are. The runtime metadata
+    is `CompactRuntimeMetadata`, the per-page metadata of the pipeline are slotted records as well.
+    The records are serialized as they are by `einvoice_lens.serialize` (JSON, msgpack).
+
+    Usage
+    -----
+    >>> from einvoice_lens.compact import CompactInvoiceResult
+    >>> compact = CompactInvoiceResult.from_dict(parse_commerical_invoice("path/to/input.pdf"))
+    >>> compact.profile.seller.tax_code, compact.dataset[0].amount, compact.runtime_metadata.validation.confidence
+    >>> result = compact.to_dict()  # The `CommericalInvoiceResult` shape
+    """
+    runtime_metadata: CompactRuntimeMetadata
+    profile: CompactInvoiceProfile
+    dataset: "tuple[CompactLineItem, ...] | pl.DataFrame | pyarrow.Table"
+
+    @classmethod
+    def from_dict(cls, mapping: "CommericalInvoiceResult") -> "CompactInvoiceResult":
+        dataset = mapping["dataset"]
+        if isinstance(dataset, list):
+            dataset = tuple([CompactLineItem(**item) for item in dataset])
+        return cls(runtime_metadata=CompactRuntimeMetadata.from_dict(mapping["runtime_metadata"]), profile=CompactInvoiceProfile.from_dict(mapping["profile"]), dataset=dataset)
+
+    def to_dict(self) -> "CommericalInvoiceResult":
+        "The compatibility view, the profile has every field of the TypedDicts"
+        dataset = self.dataset
+        if isinstance(dataset, tuple):
+            dataset = [item.to_dict() for item in dataset]
+        return {"runtime_metadata": self.runtime_metadata.to_dict(), "profile": self.profile.to_dict(), "dataset": dataset}
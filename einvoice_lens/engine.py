@@ -1,19 +1,46 @@
 #!/bin/python3
 
 # Global
+import io
 import os
-from typing import TypedDict, Literal
+import re
+import mmap
+import functools
+from typing import TypedDict, Literal, BinaryIO, Any, Iterator
 import pathlib
+import time
 from datetime import date, datetime, UTC as timezoneUTC
-import re
-import unicodedata
+from typing import TYPE_CHECKING
 
 # External
 import pdfplumber
-import polars as pl
 import google_crc32c
 import strx
 
+# Internal
+from einvoice_lens.backends import PDFBackend, get_backend
+from einvoice_lens.layout import DocumentLayout, LayoutMetadata, PageLayout
+from einvoice_lens.limits import LimitExceeded, LimitExceededError, ParseLimits, ResourceBudget
+from einvoice_lens.ocr import OCRMetadata, OCRSettings, PageRecognizer, get_ocr_engine
+from einvoice_lens.rules import RuleSet, DEFAULT_RULE_SET
+from einvoice_lens.signature import DigitalSignature, extract_digital_signature
+from einvoice_lens.telemetry import Instrumentation, PageMetadata, StageRecorder
+from einvoice_lens.validation import DatasetValidation, validate_dataset
+from einvoice_lens.templates import (
+    LayoutTemplate,
+    LayoutTemplateMetadata,
+    TemplateRegistry,
+    extract_table_rows,
+    layout_fingerprint,
+    learn_template,
+)
+
+if TYPE_CHECKING:
+    import polars as pl
+    import pyarrow
+    from einvoice_lens.cache import ResultCache
+    from einvoice_lens.split import SegmentMetadata
+
 
 def calculate_checksum_crc32c_on(path):
     crc = google_crc32c.Checksum()
@@ -23,17 +50,92 @@ def calculate_checksum_crc32c_on(path):
     return crc.digest().hex()
 
 
-class DigitalSignature(TypedDict):
-    # "digital_signature": {
-    #   "certificate_serial": "1234567890ABCDEF",
-    #   "issuer": "VNPT-CA",
-    #   "signed_at": "2025-09-28T14:32:00+07:00",
-    #   "signature_value": "MIIBIjANBgkqhkiG9w0BAQEFAAOCAQ8A..."
-    # }
-    certificate_serial: str
-    issuer: str | None
-    signed_at: str
-    signature_value: str
+def calculate_checksum_crc32c_of(buffer: bytes | bytearray | memoryview | mmap.mmap, chunk_size: int = 2**20) -> str:
+    "Calculate the checksum on the in-memory buffer. The extension only accept `bytes` so that other buffers are sliced by chunk"
+    if isinstance(buffer, bytes):
+        return google_crc32c.Checksum(buffer).digest().hex()
+
+    crc = google_crc32c.Checksum()
+    view = memoryview(buffer)
+    for offset in range(0, len(view), chunk_size):
+        crc.update(bytes(view[offset:offset + chunk_size]))
+    view.release()
+    return crc.digest().hex()
+
+
+DocumentSource = str | os.PathLike | bytes | bytearray | memoryview | BinaryIO
+
+
+class _SourceBuffer:
+    """Read the document once and share the buffer between the checksum and the PDF parser
+
+    The path is memory-mapped, so that the bytes are loaded from disk once into the page cache.
+    The in-memory input (bytes, bytearray, memoryview, binary stream) is used directly without temp file.
+    """
+
+    def __init__(self, source: DocumentSource, checksum: str | None = None):
+        self.source_path: str | None = None
+        # The checksum already computed on the same document (e.g. by the parent of the segment workers)
+        self._checksum = checksum
+        self.buffer: bytes | memoryview | mmap.mmap
+        self._file: BinaryIO | None = None
+
+        if isinstance(source, (str, os.PathLike)):
+            path = os.fspath(source)
+            try:
+                self._file = open(path, "rb")
+            except FileNotFoundError:
+                raise ValueError(f"Not exist the document on path={path!r}")
+
+            if not path.endswith(".pdf"):
+                self._file.close()
+                raise ValueError(f"Invaid extension of pdf. Got {path.split('.')[-1]} file type")
+
+            self.source_path = pathlib.Path(path).as_posix()
+            self.size = os.fstat(self._file.fileno()).st_size
+            if self.size == 0:
+                self._file.close()
+                raise ValueError(f"Empty document on path={path!r}")
+            self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        elif isinstance(source, bytes):
+            self.buffer = source
+        elif isinstance(source, (bytearray, memoryview)):
+            self.buffer = memoryview(source).cast("B")
+        elif hasattr(source, "read"):
+            name = getattr(source, "name", None)
+            self.source_path = pathlib.Path(name).as_posix() if isinstance(name, str) else None
+            self.buffer = source.read()
+        else:
+            raise ValueError(f"Unsupported document source. Got {type(source).__name__}")
+
+        if self._file is None:
+            self.size = len(self.buffer)
+            if bytes(self.buffer[:1024]).find(b"%PDF-") == -1:
+                raise ValueError("Invaid content of pdf. Not found the '%PDF-' header")
+
+    def checksum(self) -> str:
+        if self._checksum is None:
+            self._checksum = calculate_checksum_crc32c_of(self.buffer)
+        return self._checksum
+
+    def stream(self) -> BinaryIO | mmap.mmap:
+        "The seekable stream for the parser. mmap is file-like itself, bytes is wrapped without copy"
+        if isinstance(self.buffer, mmap.mmap):
+            return self.buffer
+        return io.BytesIO(self.buffer)
+
+    def close(self) -> None:
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self) -> "_SourceBuffer":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
 
 
 class DocumentAttribute(TypedDict):
@@ -43,7 +145,8 @@ class DocumentAttribute(TypedDict):
     tax_agent_code: str | None
     serial_no: str | None
     invoice_number: str | None
-    digital_signature: str | None
+    # Only read with the `signature` option, None when the document isn't signed
+    digital_signature: DigitalSignature | None
 
 
 class SellerInformation(TypedDict):
@@ -87,411 +190,919 @@ class PipelineMetadata(TypedDict):
     start: datetime
     end: datetime
     processing_in_seconds: float
+    # Timing (seconds, monotonic) per stage: checksum, open, page_layout, first_page_text, profile_rules, extract_tables, normalization, dataset, ...
+    stages: dict[str, float]
+    pages: list[PageMetadata]
+    line_items: int
+    # The growth of the resident memory of the process while parsing the document, sampled at the end of each stage
+    memory_growth_mb: float | None
+    # The peak resident memory over the lifetime of the process, shared by the documents of a long-lived worker
+    process_peak_memory_mb: float | None
+    # The layout objects shared between the stages, None on cache hit
+    layout: LayoutMetadata | None
+    # The lookups of the text normalization cache while parsing the document, None on cache hit
+    text_normalization: "TextNormalizationMetadata | None"
+
+
+class TextNormalizationMetadata(TypedDict):
+    hits: int
+    misses: int
+    hit_rate: float | None
+    # The lines held by the cache of the process, shared by the documents of a long-lived worker
+    cache_size: int
 
 
 class RuntimeMetadata(TypedDict):
-    source_path: str
+    source_path: str | None
     checksum_crc32c: str | None
     total_pages: int
     file_size_mb: float
     pipeline: PipelineMetadata
+    cache_hit: bool
+    # The PDF backend which read the page objects
+    backend: str
+    # None when the documents are parsed without `templates`
+    layout_template: LayoutTemplateMetadata | None
+    # The limit reached by the document, the result is partial (e.g. the line items of the first pages). None when complete
+    limit_exceeded: LimitExceeded | None
+    # The line items checked against the totals block with the confidence flag, None when the document isn't parsed or is streamed
+    validation: DatasetValidation | None
+    # The pages of the invoice in a multi-invoice document (`parse_multi_commerical_invoice`), None for the whole document
+    segment: "SegmentMetadata | None"
+    # The pages without text layer recognized by the OCR fallback, None when parsed without `ocr`
+    ocr: OCRMetadata | None
     # container: dict[str, Any] # Not meaningful
 
 
 class CommericalInvoiceResult(TypedDict):
     runtime_metadata: RuntimeMetadata
     profile: CommericalInvoiceProfile
-    dataset: list[dict[Literal["no", "production_description", "unit", "quantity", "unit_price", "amount"], str | int | float]]
+    # The format depends on `dataset_format`: list of dicts (default), `pl.DataFrame` or `pyarrow.Table`
+    dataset: "list[dict[Literal['no', 'production_description', 'unit', 'quantity', 'unit_price', 'amount'], str | int | float]] | pl.DataFrame | pyarrow.Table"
+
+
+# The records of the ruled tables are classified by kind, on the whole page at once
+# - empty: ['', '', '', '', '', '']
+# - main_header: ['STT (No.)', 'Tên hàng hóa, dịch vụ (Description)', 'Đơn vị tính (Unit)', 'Số lượng (Quantity)', 'Đơn giá (Unit price)', 'Thành tiền (Amount)']
+# - sub_header: ['(1)', '(2)', '(3)', '(4)', '(5)', '(6) = (4) x (5)']
+# - total_amount_figure: ['Tổng tiền thanh toán(Total amount): 20.752.000', None, None, None, None, None]
+# - total_amount_in_words: ['Số tiền viết bằng chữ(In words):Hai mươi triệu bảy trăm năm mươi hai nghìn đồng', None, None, None, None, None]
+# - line_item: the other records
+
+# The translation of `strx.str_normalize`, applied on the table cells by polars
+_PUNCTUATION_TRANSLATION: dict[str, str] = {
+    "\u2018": "'",
+    "\u2019": "'",
+    "\u2013": "-",
+    "\u2014": "-",
+    "\u2009": " ",
+    "\u201c": '"',
+    "\u201d": '"',
+}
+
+
+def _normalize_text_expr(expr: "pl.Expr") -> "pl.Expr":
+    "The expression of `_pipeline_text_transform` on the table cells, the new line is replaced by space"
+    return (
+        expr
+        .str.normalize("NFKC")
+        .str.replace_many(list(_PUNCTUATION_TRANSLATION.keys()), list(_PUNCTUATION_TRANSLATION.values()))
+        .str.replace_all(r",{2,}", ",")
+        .str.replace_all(r":{2,}", ":")
+        .str.replace_all(r"\s{2,}", " ")
+        .str.strip_chars()
+        .str.replace_all("\xad", "", literal=True)
+        .str.replace_all("\n", " ", literal=True)
+    )
 
 
-def _is_main_header(element: list[str]) -> bool:
-    "Handle ['STT\n(No.)', 'Tên hàng hóa, dịch vụ\n(Description)', 'Đơn vị tính\n(Unit)', 'Số lượng\n(Quantity)', 'Đơn giá\n(Unit price)', 'Thành tiền\n(Amount)']"
-    if element[0].lower().startswith("stt") or "No." in element[0]:
-        return True
-    return False
+def _record_kind_expr(raw: "pl.Expr", record: "pl.Expr") -> "pl.Expr":
+    "Classify the records, the empty check is on the raw cells, the others on the normalized cells"
+    import polars as pl
 
+    first = record.list.get(0, null_on_oob=True)
+    second = record.list.get(1, null_on_oob=True)
+    return (
+        pl.when(raw.list.eval(pl.element().eq_missing("")).list.all()).then(pl.lit("empty"))
+        .when(first.str.to_lowercase().str.starts_with("stt") | first.str.contains("No.", literal=True)).then(pl.lit("main_header"))
+        .when((first == "(1)") & (second == "(2)")).then(pl.lit("sub_header"))
+        .when(first.str.starts_with("Tổng tiền thanh toán") | first.str.contains("Total amount", literal=True)).then(pl.lit("total_amount_figure"))
+        .when(first.str.starts_with("Số tiền viết bằng chữ") | first.str.contains("In words", literal=True)).then(pl.lit("total_amount_in_words"))
+        .otherwise(pl.lit("line_item"))
+    )
 
-def _is_sub_header(element: list[str]) -> bool:
-    "Handle ['(1)', '(2)', '(3)', '(4)', '(5)', '(6) = (4) x (5)']"
-    if element[0] == "(1)":
-        if element[1] == "(2)":
-            return True
-    return False
 
+def _parse_number_expr(expr: "pl.Expr", dtype: "pl.DataType") -> "pl.Expr":
+    "Parse the Vietnamese number format: dot as thousands separator, comma as decimal mark. E.g. 20.752.000, 1.234,5"
+    return (
+        expr
+        .str.strip_chars()
+        .str.replace_all(".", "", literal=True)
+        .str.replace(",", ".", literal=True)
+        .cast(dtype, strict=True)
+    )
 
-def _is_list_contain_empty(element: list[str]) -> bool:
-    "Handle ['', '', '', '', '', '']"
-    if all([x == "" for x in element]):
-        return True
-    return False
 
+# The lines normalized once per process: the bilingual labels, the table header and the seller block
+# repeat verbatim over the pages and the invoices of the vendor. The same line is returned as the same object
+TEXT_NORMALIZATION_CACHE_SIZE: int = 32768
 
-def _is_group_total_amount_number(element: list[str]) -> bool:
-    "Handle ['Tổng tiền thanh toán(Total amount): 20.752.000', None, None, None, None, None]"
-    if element[0].startswith("Tổng tiền thanh toán") or "Total amount" in element[0]:
-        return True
-    return False
+_WHITESPACE_RUN_PATTERN = re.compile(r"\s{2,}")
 
 
-def _is_group_total_amount_in_words(element: list[str]) -> bool:
-    "Handle ['Số tiền viết bằng chữ(In words):Hai mươi triệu bảy trăm năm mươi hai nghìn đồng', None, None, None, None, None]"
-    if element[0].startswith("Số tiền viết bằng chữ") or "In words" in element[0]:
-        return True
-    return False
+@functools.lru_cache(maxsize=TEXT_NORMALIZATION_CACHE_SIZE)
+def _normalize_line(line: str) -> str:
+    return strx.str_normalize(string=line.encode("utf-8").decode("utf-8"), form="NFKC", strip=False)
 
 
-def parse_commerical_invoice(path: str) -> CommericalInvoiceResult:
-    """Parse commerical invoice from PDF file into structured output
+def _pipeline_text_transform(*, string: str) -> str:
+    """Normalize the text line by line through the cache, same output as `strx.str_normalize` on the whole text
 
-    Args
-    ----
-    path (str): The path into PDF file
+    The whitespace runs across the lines (e.g. the blank lines) and the ends are collapsed on the joined text.
+    """
+    content = "\n".join([_normalize_line(line) for line in string.split("\n")])
+    return _WHITESPACE_RUN_PATTERN.sub(" ", content).strip().replace("\xad", "")
+
+
+def _text_normalization_metadata(start: "functools._CacheInfo") -> TextNormalizationMetadata:
+    "The lookups since `start`, the other documents parsed concurrently by the threads of the process are counted too"
+    info = _normalize_line.cache_info()
+    hits, misses = info.hits - start.hits, info.misses - start.misses
+    return TextNormalizationMetadata(
+        hits=hits,
+        misses=misses,
+        hit_rate=round(hits / (hits + misses), 4) if hits + misses > 0 else None,
+        cache_size=info.currsize,
+    )
 
-    Return
-    ------
-    CommericalInvoiceResult: The result of commerical invoice parsing
 
-    Usage
-    -----
-    >>> from einvoice_lens import parse_commerical_invoice
-    >>> path = "path/to/input.pdf"
-    >>> result = parse_commerical_invoice(path)
-    """
+LINE_ITEM_SCHEMA: list[str] = ["no", "product_description", "unit", "quantity", "unit_price", "amount"]
 
-    if not pathlib.Path(path).exists():
-        raise ValueError(f"Not exist the document on path={path!r}")
 
-    if not path.endswith(".pdf"):
-        raise ValueError(f"Invaid extension of pdf. Got {path.split('.')[1]} file type")
+def _line_item_dtypes() -> "dict[str, pl.DataType]":
+    # Note: polars is imported on building the line items only, not on importing the package
+    import polars as pl
+    return {
+        "no": pl.Int64,
+        "product_description": pl.String,
+        "unit": pl.String,
+        "quantity": pl.Int64,
+        "unit_price": pl.Float64,
+        "amount": pl.Float64,
+    }
 
-    # Local use
-    def _pipeline_text_transform(*, string: str) -> str:
-        return strx.str_normalize(string=string.encode("utf-8").decode("utf-8"), form="NFKC", strip=True).replace("\xad", "")
 
-    # Checkpoint
-    _start = datetime.now(tz=timezoneUTC)
+def __getattr__(name: str) -> Any:
+    if name == "LINE_ITEM_DTYPES":
+        return _line_item_dtypes()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-    # Calculate
-    file_checksum = calculate_checksum_crc32c_on(path)
-    file_stat = os.stat(path)
 
-    # Get
-    document = pdfplumber.open(path, unicode_norm="NFKC")
+DatasetFormat = Literal["dicts", "polars", "arrow"]
+
+
+def _new_profile() -> CommericalInvoiceProfile:
+    "The profile before the rules, returned as it is when the first page isn't parsed"
+    return CommericalInvoiceProfile(
+        attribute=DocumentAttribute(document_type="UNKNOWN", tax_agent_code=None, digital_signature=None),
+        seller=SellerInformation(),
+        buyer=BuyerInformation(name=None, company=None, tax_code=None, tel=None),
+        invoice_partner=InvoicePartnerInformation(endpoint_search_invoice=None, tax_code=None),
+    )
 
-    # Extract: Document Attribute
-    attribute = DocumentAttribute(document_type="UNKNOWN", tax_agent_code=None, digital_signature=None)
-    seller = SellerInformation()
-    buyer = BuyerInformation(name=None, company=None, tax_code=None, tel=None)
-    invoice_partner = InvoicePartnerInformation(endpoint_search_invoice=None, tax_code=None)
 
-    # Hold content from profile off document
-    profile_content = {}
+def _extract_profile(
+    layouts: DocumentLayout,
+    rule_set: RuleSet | None = None,
+    recorder: StageRecorder | None = None,
+    profile: CommericalInvoiceProfile | None = None,
+) -> CommericalInvoiceProfile:
+    "Fill the profile in place, so that the fields are kept when the page is interrupted"
+
+    recorder = recorder or layouts.recorder
+
+    # Extract: Document Attribute
+    profile = profile if profile is not None else _new_profile()
+    attribute, seller, buyer, invoice_partner = profile["attribute"], profile["seller"], profile["buyer"], profile["invoice_partner"]
 
     # Component
     # (Information) The attribute of the document mostly in the first page only
     #   and it's repeatable for format (same with others page)
     # So that we can regex on the first page line by line
-    first_page_content = _pipeline_text_transform(string=document.pages[0].extract_text())
+    # The layout objects of the first page are parsed once (`page_layout` stage), then shared with the line items table
+    first_page = layouts.page(0)
+    first_page.parse()
+    with recorder.stage("first_page_text"):
+        first_page_content = _pipeline_text_transform(string=first_page.text())
 
     # Format is somehow can't not defined by rule
     if "electronic invoice display" in first_page_content.lower():
         attribute["display_format"] = "ELECTRONIC_INVOICE_DISPLAY"
 
     # Loop
-    first_page_bucket_line_content = first_page_content.split("\n")
-    on_scrool_over_type: str = "" # One of seller, buyer for search role play
-    for on_ind, on_text in enumerate(first_page_bucket_line_content, start=0):
+    # The content is normalized as a whole, so that each line only need to be stripped
+    first_page_bucket_line_content = [line.strip() for line in first_page_content.split("\n")]
+    with recorder.stage("profile_rules"):
+        (rule_set or DEFAULT_RULE_SET).extract(first_page_bucket_line_content, profile=profile)
 
-        # Normalized
-        nor_on_text = _pipeline_text_transform(string=on_text)
-        nor_on_next_text = None
+    return profile
 
-        try:
-            nor_on_next_text = _pipeline_text_transform(string=first_page_bucket_line_content[on_ind + 1])
-        except IndexError:
-            pass
-
-        # Define
-        if any([unicodedata.normalize("NFKC", _otext) in nor_on_text.lower() for _otext in ("sales invoice", "hóa đơn bán hàng", "đơn bán hàng")]):
-            attribute["document_type"] = "SALES_INVOICE"
-
-        # Detect issue date. Example: Ngày (date) 25 tháng (month) 09 năm (year) 2025
-        issue_date = None
-        if all([
-            any([
-                unicodedata.normalize("NFKC", "date") in nor_on_text,
-                unicodedata.normalize("NFKC", "day") in nor_on_text
-            ]),
-            unicodedata.normalize("NFKC", "month") in nor_on_text,
-            unicodedata.normalize("NFKC", "year") in nor_on_text
-        ]):
 
-            # Extract
-            e_day = re.search(r"(?<=date\))\s?\d{1,}+", nor_on_text, re.A) or re.search(r"(?<=day\))\s?\d{1,}+", nor_on_text, re.A)
-            e_month = re.search(r"(?<=month\))\s?\d{1,}+", nor_on_text, re.A)
-            e_year = re.search(r"(?<=year\))\s?\d{1,}+", nor_on_text, re.A)
-            at_day = int(e_day.group(0)) if e_day is not None else None
-            at_month = int(e_month.group(0)) if e_month is not None else None
-            at_year = int(e_year.group(0)) if e_year is not None else None
-
-            # Note: The value of (year) can be broken into of flow steps.
-            # So if e_day, e_month is not None but e_year is None, required search for next '2xxx' in the next lines
-            if all([e_day is not None, e_month is not None, e_year is None]):
-                for n_ind in range(on_ind+1, len(first_page_bucket_line_content)):
-                    search_result_on_year = re.search(r"^2\d{3}$", first_page_bucket_line_content[n_ind].strip(), re.A)
-                    if search_result_on_year is not None:
-                        at_year = int(search_result_on_year.group(0))
-                        break
-
-            if all([at_day is not None, at_month is not None, at_year is not None]):
-                issue_date = date(year=at_year, month=at_month, day=at_day)
-
-            # Append
-            attribute["issue_date"] = issue_date
-
-        # Parse mapping value
-        if ":" in nor_on_text:
-            key, val = nor_on_text.split(":", maxsplit=1)
-            val = unicodedata.normalize("NFKD", val.strip())
-
-            if "Serial No" in key:
-                attribute["serial_no"] = val
-
-            elif "No." in key:
-                attribute["invoice_number"] = val
-
-            elif "No." in key:
-                attribute["document_type"] = val
-
-            elif any([_imap in key.lower() for _imap in ("mã của cơ quan thuế", "mã cơ quan thuế")]):
-                attribute["tax_agent_code"] = val
-
-            # Handlers
-            profile_content[key] = val
-
-        # Handle the invoice partner
-        if nor_on_text.lower().startswith(unicodedata.normalize("NFKC", "Tra cứu hóa đơn").lower()):
-
-            # Find on next index too
-            search_invoice_partner_block = " ".join([nor_on_text, nor_on_next_text or ""])
-
-            # Then chain by vietnamese before go to search zone
-            search_invoice_partner_block = (
-                search_invoice_partner_block.lower()
-                .replace("mã tra cứu", "search_keyword_id")
-                .replace("mã số thuế", "tax_code")
-                .replace("mst", "tax_code")
-            )
+class _TableCollector:
+    """Classify the records of the ruled tables page by page
 
-            # Find
-            search_keyword_id_result = re.search(
-                r"(?<=search_keyword_id\:)\s?(?P<keyword_id>\w+)",
-                search_invoice_partner_block,
-                re.I
-            )
-            if search_keyword_id_result is not None:
-                invoice_partner["search_keyword_id"] = search_keyword_id_result.group("keyword_id").upper()
-
-            # Find
-            endpoint_result = re.search(
-                r"\bhttps?://(?:[\w\-]+\.)+[\w\-]+\b",
-                search_invoice_partner_block,
-                re.I
-            )
-            if endpoint_result is not None:
-                invoice_partner["endpoint_search_invoice"] = endpoint_result.group().strip()
-
-            # Find
-            tax_code_result = re.search(
-                r"(?<=tax_code\:)\s?(?P<tax_code>\b\w+)",
-                search_invoice_partner_block,
-                re.I
-            )
-            if tax_code_result is not None:
-                invoice_partner["tax_code"] = tax_code_result.group("tax_code").strip()
+    The headers, the totals block and the records not matching the header length are held on the collector,
+    the line item records are returned per page so that the caller decide to accumulate or stream them.
+    """
 
-        # Define scroll point
-        # Detect block of buyer | seller (related to same attribute like name, address, account_number, ...)
-        # then search words related until change scrolling point
-        if "seller" in nor_on_text.lower():
-            on_scrool_over_type = "seller"
-        elif "buyer" in nor_on_text.lower():
-            on_scrool_over_type = "buyer"
+    def __init__(
+        self,
+        stop_at_total_amount: bool = False,
+        recorder: StageRecorder | None = None,
+        fingerprint: str | None = None,
+        template: LayoutTemplate | None = None,
+    ):
+        self.stop_at_total_amount = stop_at_total_amount
+        self.recorder = recorder or StageRecorder()
+        self.main_header: list[str] = []
+        self.sub_header: list[str] = []
+        self.total_amount_figure: list[str] = []
+        self.total_amount_in_words: list[str] = []
+        self.errors: list[list[str | None]] = []
+        self.on_table_length: int = None
+
+        # Layout template of the vendor
+        self.fingerprint = fingerprint
+        self.template = template
+        self.template_stale: bool = False
+        self.learned_template: LayoutTemplate | None = None
+        self.fallback_pages: int = 0
+
+    @property
+    def is_finished(self) -> bool:
+        "Stop on the page after the totals block. The next pages are appendix, terms, ..."
+        return self.stop_at_total_amount and len(self.total_amount_figure) > 0 and len(self.total_amount_in_words) > 0
+
+    @property
+    def template_metadata(self) -> LayoutTemplateMetadata:
+        if self.template_stale:
+            status = "stale"
+        elif self.template is not None:
+            status = "applied"
+        elif self.learned_template is not None:
+            status = "learned"
+        else:
+            status = "unknown"
+        return LayoutTemplateMetadata(fingerprint=self.fingerprint, status=status, fallback_pages=self.fallback_pages)
+
+    def _mark_stale(self) -> None:
+        "The page holding the header doesn't match: the vendor layout changed, detect from now on"
+        self.template = None
+        self.template_stale = True
+
+    def _find_tables(self, layout: PageLayout) -> tuple[list[pdfplumber.table.Table], bool]:
+        "Return (tables, built on the template)"
+        if self.template is not None:
+            tables = layout.find_tables_on_template(self.template)
+            if tables is not None:
+                return tables, True
+            self.fallback_pages += 1
+            if len(self.main_header) == 0:
+                self._mark_stale()
+        return layout.find_tables(), False
+
+    def _extract_records(self, layout: PageLayout) -> tuple[list[pdfplumber.table.Table], bool, list[list[str | None]], list[tuple[int, int]]]:
+        "Return (tables, built on the template, records, (table index, row index) of each record)"
+        with self.recorder.stage("extract_tables", page=layout.index):
+            tables, on_template = self._find_tables(layout)
+            records: list[list[str | None]] = []
+            positions: list[tuple[int, int]] = []
+            for table_index, table in enumerate(tables):
+                rows = extract_table_rows(table)
+                records.extend(rows)
+                positions.extend([(table_index, row_index) for row_index in range(len(rows))])
+        return tables, on_template, records, positions
+
+    def collect(self, layout: PageLayout) -> "pl.DataFrame":
+        "Return the line item records of the page, as the string columns of `LINE_ITEM_SCHEMA`"
+        import polars as pl
+
+        # The `lines` strategy only build the table from ruling edges (line, rect, curve)
+        # So that the page without any of them has no table, skip before the table detection
+        if not layout.has_ruling_objects:
+            return _empty_records()
 
-        if on_scrool_over_type == "seller":
+        # Extract all
+        # The package extraction process lead to the duplication of records, which are dropped by `no` on the dataset
+        _start_extract_tables = time.perf_counter()
+        tables, on_template, records, positions = self._extract_records(layout)
+        _start_normalization = time.perf_counter()
+
+        # Normalization and classification
+        # All the cells of the page are processed in batch, the cost per record is constant
+        frame = _classify_records(records)
+
+        # The template is required to hold the header of the line items
+        if on_template and len(self.main_header) == 0 and frame.filter(pl.col("kind") == "main_header").height == 0:
+            self.fallback_pages += 1
+            self._mark_stale()
+            tables, on_template, records, positions = self._extract_records(layout)
+            frame = _classify_records(records)
+
+        # For the search for (a) main header, (b) subheader and (c) the totals block
+        # This only exist 1 so if they are exists, ignore the next ones. They are a few records, resolved in order
+        main_header_index: int | None = None
+        markers = frame.filter(pl.col("kind").is_in(["main_header", "sub_header", "total_amount_figure", "total_amount_in_words"]))
+        for index, record, kind in markers.select("index", "record", "kind").iter_rows():
+            target: list[str] = getattr(self, kind)
+            if len(target) > 0:
+                continue
+            if kind == "main_header":
+                main_header_index = index
+                self.on_table_length = len(record)
+            target.extend(record)
+
+        # Learn the layout of the vendor from the detected table holding the header
+        if main_header_index is not None and not on_template and self.fingerprint is not None:
+            table_index, row_index = positions[main_header_index]
+            self.learned_template = learn_template(self.fingerprint, tables[table_index], tables[table_index].rows[row_index].bbox)
+
+        # The records not matching the header length are errors, included the ones before the header
+        candidates = frame.filter(pl.col("kind") == "line_item")
+        is_valid = pl.col("record").list.len() == self.on_table_length if self.on_table_length is not None else pl.lit(False)
+        if main_header_index is not None:
+            is_valid = is_valid & (pl.col("index") > main_header_index)
+        self.errors.extend(candidates.filter(~is_valid).get_column("record").to_list())
+
+        table_elements = candidates.filter(is_valid).select([
+            pl.col("record").list.get(position, null_on_oob=True).alias(name)
+            for position, name in enumerate(LINE_ITEM_SCHEMA)
+        ])
 
-            _, s_val = None, None
-            if len(nor_on_text.split(":")) > 1:
-                _, s_val = nor_on_text.split(":", maxsplit=1)
-                s_val = unicodedata.normalize("NFC", s_val.strip())
+        # Timing
+        _end_normalization = time.perf_counter()
+        self.recorder.stages["normalization"] = self.recorder.stages.get("normalization", 0.0) + _end_normalization - _start_normalization
+        self.recorder.add_page(PageMetadata(
+            page=layout.index,
+            extract_tables_seconds=_start_normalization - _start_extract_tables,
+            normalization_seconds=_end_normalization - _start_normalization,
+            total_records=len(records),
+            line_items=table_elements.height,
+        ))
+
+        return table_elements
+
+
+def _new_collector(
+    layouts: DocumentLayout,
+    profile: CommericalInvoiceProfile,
+    stop_at_total_amount: bool,
+    recorder: StageRecorder,
+    templates: TemplateRegistry | None = None,
+) -> "_TableCollector":
+    "The collector on the template of the vendor when known"
+    fingerprint, template = None, None
+    if templates is not None and len(layouts) > 0:
+        with recorder.stage("template_lookup"):
+            fingerprint = layout_fingerprint(profile, layouts.page(0).page)
+            template = templates.get(fingerprint) if fingerprint is not None else None
+    return _TableCollector(stop_at_total_amount=stop_at_total_amount, recorder=recorder, fingerprint=fingerprint, template=template)
+
+
+def _classify_records(records: list[list[str | None]]) -> "pl.DataFrame":
+    "Return the frame of (index, normalized record, kind)"
+    import polars as pl
+    return (
+        pl.DataFrame({"raw": records}, schema={"raw": pl.List(pl.String)})
+        .with_row_index("index")
+        .with_columns(pl.col("raw").list.eval(_normalize_text_expr(pl.element())).alias("record"))
+        .with_columns(_record_kind_expr(pl.col("raw"), pl.col("record")).alias("kind"))
+        .drop("raw")
+    )
 
-            if "seller" in nor_on_text.lower():
-                seller["name"] = s_val
 
-            elif "tax code" in nor_on_text.lower():
-                seller["tax_code"] = s_val
+def _update_templates(templates: TemplateRegistry | None, collector: _TableCollector) -> LayoutTemplateMetadata | None:
+    "Persist the template learned on the document, drop the stale one"
+    if templates is None:
+        return None
+    if collector.fingerprint is not None:
+        if collector.template_stale and collector.learned_template is None:
+            templates.invalidate(collector.fingerprint)
+        if collector.learned_template is not None:
+            templates.set(collector.learned_template)
+    return collector.template_metadata
 
-            elif "address" in nor_on_text.lower():
-                seller["address"] = s_val
 
-            elif "tel" in nor_on_text.lower(): # TODO: Multiple in 1 line
-                seller["tel"] = s_val
+def _empty_records() -> "pl.DataFrame":
+    import polars as pl
+    return pl.DataFrame(schema={name: pl.String for name in LINE_ITEM_SCHEMA})
 
-            elif "email" in nor_on_text.lower(): # TODO: Multiple in 1 line
-                seller["email"] = s_val
 
-            elif "fax" in nor_on_text.lower(): # TODO: Multiple in 1 line
-                seller["fax"] = s_val
+def _build_dataset(table_elements: "pl.DataFrame") -> "pl.DataFrame":
+    "Type the line item records, dropped the duplicated records (hash-based on `no`)"
+    import polars as pl
 
-            elif "a/c no" in nor_on_text.lower():
-                seller["account_number"] = s_val
+    # Transform
+    dataset = (
+        table_elements
+        .with_columns([
+            pl.col("no").str.strip_chars().cast(pl.Int64, strict=True).name.keep(),
+            pl.col("product_description").str.replace_all("\n", " ", literal=True).name.keep(),
+            pl.col("unit").str.to_titlecase().name.keep(),
+            _parse_number_expr(pl.col("quantity"), pl.Int64).name.keep(),
+            _parse_number_expr(pl.col(["unit_price", "amount"]), pl.Float64).name.keep(),
+        ])
+        .unique(subset="no")
+        .sort(by="no", descending=False)
+    )
 
-        if on_scrool_over_type == "buyer":
+    return dataset
+
+
+def _format_dataset(dataset: "pl.DataFrame | list[dict[str, Any]]", dataset_format: DatasetFormat) -> "list[dict[str, Any]] | pl.DataFrame | pyarrow.Table":
+    "Convert the typed line items into the output format"
+    import polars as pl
+
+    if dataset_format == "dicts":
+        return dataset if isinstance(dataset, list) else dataset.to_dicts()
+
+    # Restore from the cached list of dicts
+    if isinstance(dataset, list):
+        dataset = pl.DataFrame(dataset, schema=_line_item_dtypes(), orient="row")
+
+    if dataset_format == "polars":
+        return dataset
+
+    try:
+        return dataset.to_arrow()
+    except ModuleNotFoundError:
+        raise ModuleNotFoundError("Required `pyarrow` for dataset_format='arrow'. Install by: pip install einvoice-lens[arrow]")
+
+
+def _pipeline_metadata(
+    recorder: StageRecorder,
+    start: datetime,
+    end: datetime | None,
+    line_items: int,
+    layout: LayoutMetadata | None = None,
+    text_normalization: TextNormalizationMetadata | None = None,
+) -> PipelineMetadata:
+    return PipelineMetadata(
+        start=start,
+        end=end,
+        processing_in_seconds=recorder.elapsed_seconds,
+        stages={name: round(seconds, 6) for name, seconds in recorder.stages.items()},
+        pages=recorder.pages,
+        line_items=line_items,
+        memory_growth_mb=recorder.memory_growth_mb,
+        process_peak_memory_mb=recorder.process_peak_memory_mb,
+        layout=layout,
+        text_normalization=text_normalization,
+    )
 
-            _, b_val = None, None
-            if len(nor_on_text.split(":")) > 1:
-                _, b_val = nor_on_text.split(":", maxsplit=1)
-                b_val = unicodedata.normalize("NFC", b_val.strip())
 
-            if "buyer" in nor_on_text.lower():
-                buyer["name"] = b_val
+def parse_commerical_invoice(
+    path: DocumentSource,
+    cache: "ResultCache | None" = None,
+    cache_refresh: bool = False,
+    stop_at_total_amount: bool = False,
+    rule_set: RuleSet | None = None,
+    dataset_format: DatasetFormat = "dicts",
+    instrumentation: Instrumentation | None = None,
+    templates: TemplateRegistry | None = None,
+    backend: str | PDFBackend | None = None,
+    limits: ParseLimits | None = None,
+    signature: bool = False,
+    verify_signature: bool = False,
+    ocr: OCRSettings | None = None,
+) -> CommericalInvoiceResult:
+    """Parse commerical invoice from PDF file into structured output
 
-            if "company's name" in nor_on_text.lower():
-                buyer["company"] = b_val
+    Args
+    ----
+    path (DocumentSource): The path into PDF file, or the in-memory document as
+        bytes, bytearray, memoryview or binary stream (e.g. object storage body, email attachment)
+    cache (ResultCache | None): The result cache keyed on checksum. Default to None (bypass)
+    cache_refresh (bool): Re-parse the document and overwrite the cached result
+    stop_at_total_amount (bool): Stop scanning the next pages for line items once the totals block
+        ("Tổng tiền thanh toán", "Số tiền viết bằng chữ") has been found. Default to False
+    rule_set (RuleSet | None): The compiled rules of the first page fields. Default to the rules of
+        `einvoice_lens.rules.DEFAULT_RULE_SET` (including the ones added by `register_field_rule`)
+    dataset_format (str): The output of line items, one of: dicts (list of dict), polars (`pl.DataFrame`),
+        arrow (`pyarrow.Table`, zero-copy from the polars frame). Default to dicts
+    instrumentation (Instrumentation | None): The hook called on each stage of the pipeline (e.g. export
+        into metrics or OpenTelemetry spans). The timings are always reported in `runtime_metadata.pipeline`
+    templates (TemplateRegistry | None): The layout templates of the vendors. The table cells of a known vendor
+        are built on its recorded columns instead of the full detection. Default to None (always detect)
+    backend (str | PDFBackend | None): The PDF library reading the page objects, one of: pdfplumber (reference),
+        pymupdf (MuPDF, required `pymupdf`), pypdfium2 (PDFium, required `pypdfium2`). The native libraries are
+        several times faster with the same output. Default to pdfplumber
+    limits (ParseLimits | None): The limits of file size, pages, time and memory of the document. On reaching one,
+        the parsing stops and the result is partial with the reason in `runtime_metadata.limit_exceeded`
+        (e.g. the profile and the line items of the pages parsed so far). Default to None (unlimited)
+    signature (bool): Read the digital signature (certificate serial, issuer, signing time, value) into
+        `profile.attribute.digital_signature`. It's read from `/ByteRange` on the bytes of the document, only on demand
+    verify_signature (bool): Read the signature and check its byte range covers the whole document and the digest
+        of the signed bytes, on the bytes already read for the checksum
+    ocr (OCRSettings | None): Recognize the pages without any char (scanned pages) by the local OCR engine, then
+        read them by the same line rules and table logic. The pages with text layer are never recognized.
+        Default to None (the scanned pages are empty)
 
-            elif "tax code" in nor_on_text.lower():
-                buyer["tax_code"] = b_val
+    Return
+    ------
+    CommericalInvoiceResult: The result of commerical invoice parsing
 
-            elif "address" in nor_on_text.lower():
-                buyer["address"] = b_val
+    Usage
+    -----
+    >>> from einvoice_lens import parse_commerical_invoice
+    >>> path = "path/to/input.pdf"
+    >>> result = parse_commerical_invoice(path)
+    """
 
-            elif "tel" in nor_on_text.lower(): # TODO: Multiple in 1 line
-                buyer["tel"] = b_val
+    if dataset_format not in ("dicts", "polars", "arrow"):
+        raise ValueError(f"Invalid dataset_format. Required one of dicts, polars, arrow. Got {dataset_format!r}")
+
+    with _SourceBuffer(path) as source:
+        return _parse_commerical_invoice_on(
+            source,
+            cache=cache,
+            cache_refresh=cache_refresh,
+            stop_at_total_amount=stop_at_total_amount,
+            rule_set=rule_set,
+            dataset_format=dataset_format,
+            instrumentation=instrumentation,
+            templates=templates,
+            backend=backend,
+            limits=limits,
+            signature=signature,
+            verify_signature=verify_signature,
+            ocr=ocr,
+        )
 
-            elif "email" in nor_on_text.lower(): # TODO: Multiple in 1 line
-                buyer["email"] = b_val
 
-            elif "fax" in nor_on_text.lower(): # TODO: Multiple in 1 line
-                buyer["fax"] = b_val
+def _cache_options(
+    rule_set: RuleSet | None,
+    stop_at_total_amount: bool,
+    signature: bool = False,
+    verify_signature: bool = False,
+    page_range: range | None = None,
+    ocr: OCRSettings | None = None,
+    backend: PDFBackend | None = None,
+) -> str:
+    "The fingerprint of the options changing the result, part of the cache key"
+    options = f"rules={(rule_set or DEFAULT_RULE_SET).fingerprint};stop_at_total_amount={int(stop_at_total_amount)}"
+    # The backends read the same document into slightly different objects (e.g. the font names)
+    if backend is not None:
+        options += f";backend={backend.name}"
+    if signature or verify_signature:
+        options += f";signature={'verify' if verify_signature else 1}"
+    if page_range is not None:
+        options += f";pages={page_range.start}-{page_range.stop}"
+    if ocr is not None:
+        options += f";ocr={get_ocr_engine(ocr.engine).fingerprint()}@{ocr.dpi}"
+    return options
+
+
+def _parse_commerical_invoice_on(
+    source: _SourceBuffer,
+    cache: "ResultCache | None" = None,
+    cache_refresh: bool = False,
+    stop_at_total_amount: bool = False,
+    rule_set: RuleSet | None = None,
+    dataset_format: DatasetFormat = "dicts",
+    instrumentation: Instrumentation | None = None,
+    templates: TemplateRegistry | None = None,
+    backend: str | PDFBackend | None = None,
+    limits: ParseLimits | None = None,
+    signature: bool = False,
+    verify_signature: bool = False,
+    ocr: OCRSettings | None = None,
+    page_range: range | None = None,
+) -> CommericalInvoiceResult:
+    "Parse the document, or the pages of `page_range` as one invoice of a multi-invoice document"
 
-            elif "a/c no" in nor_on_text.lower():
-                buyer["account_number"] = b_val
+    # Checkpoint
+    _start = datetime.now(tz=timezoneUTC)
+    recorder = StageRecorder(instrumentation)
+    backend = get_backend(backend)
+    budget = ResourceBudget(limits)
+    normalization_start = _normalize_line.cache_info()
 
-    # TODO: Current can't not process to find the digital signature. It's likely like bounding box
-    # By search like: document.pages[0].objects["image"][0]["stream"].get_rawdata()
-    # attribute.digital_signature = None
+    # Reject the oversized document before reading it
+    try:
+        budget.check_file_size(source.size)
+    except LimitExceededError as exc:
+        return _limit_exceeded_result(source, recorder, backend, start=_start, error=exc, dataset_format=dataset_format)
 
-    # Extract
-    main_header: list[str] = []
-    sub_header: list[str] = []
-    total_amount_figure: list[str] = []
-    total_amount_in_words: list[str] = []
-    table_elements = []
-    errors = []
-    on_table_length: int = None
-    for _, element in enumerate(document.pages, start=0):
+    # Calculate
+    with recorder.stage("checksum"):
+        file_checksum = source.checksum()
+
+    # Cache
+    # The same document is re-submitted from several gateways so that only the hash pass is paid
+    cache_options = _cache_options(rule_set, stop_at_total_amount, signature=signature, verify_signature=verify_signature, page_range=page_range, ocr=ocr, backend=backend)
+    if cache is not None and not cache_refresh:
+        with recorder.stage("cache_lookup"):
+            cached_result = cache.get(file_checksum, options=cache_options)
+        if cached_result is not None:
+            _end = datetime.now(tz=timezoneUTC)
+            cached_result["runtime_metadata"].update({
+                "source_path": source.source_path,
+                "pipeline": _pipeline_metadata(recorder, start=_start, end=_end, line_items=len(cached_result["dataset"])),
+                "cache_hit": True,
+                "layout_template": None,
+                "limit_exceeded": None,
+            })
+            cached_result["runtime_metadata"].setdefault("segment", None)
+            cached_result["runtime_metadata"].setdefault("ocr", None)
+            cached_result["runtime_metadata"].setdefault("validation", None)
+            cached_result["dataset"] = _format_dataset(cached_result["dataset"], dataset_format)
+            return cached_result
 
-        # Extract all
-        # The package extraction process lead to the duplication of records
-        # So that we using validate in the bucket output to verify out of the component
-        e_tables = element.extract_tables(
-            table_settings={
-                "vertical_strategy": "lines",
-                "horizontal_strategy": "lines"
-            },
-        )
+    # Get
+    with recorder.stage("open"):
+        document = backend.open(source.stream())
+    recognizer: PageRecognizer | None = None
+    # Release the document whatever the failure of the extraction, as `CommericalInvoiceStream`
+    try:
+        layouts = DocumentLayout(document, recorder, pages=page_range)
+        total_pages = len(document.pages)
+        profile = _new_profile()
+        collector: _TableCollector | None = None
+        page_elements: list[pl.DataFrame] = []
+        limit_exceeded: LimitExceeded | None = None
+
+        # The pages parsed before reaching a limit are kept as the partial result
+        try:
 
-        # Loop
-        for table in e_tables:
-            for record in table:
-
-                if _is_list_contain_empty(element=record):
-                    continue
-
-                # Normalization
-                noralization_record = [
-                    _pipeline_text_transform(string=text).replace("\n", " ")
-                    if text is not None else None
-                    for text in record
-                ]
-
-                # Check duplication
-                if noralization_record in table_elements:
-                    pass
-
-                # For the search for (a) main header and (b) subheader
-                # This only exist 1 so if they are exists, ignore the validate the next element
-                if _is_main_header(element=noralization_record):
-                    if len(main_header) == 0:
-                        on_table_length = len(noralization_record)
-                        main_header.extend(noralization_record)
-                    continue
-
-                if _is_sub_header(element=noralization_record):
-                    if len(sub_header) == 0:
-                        sub_header.extend(noralization_record)
-                    continue
-
-                if _is_group_total_amount_number(element=noralization_record):
-                    if len(total_amount_figure) == 0:
-                        total_amount_figure.extend(noralization_record)
-                    continue
-
-                if _is_group_total_amount_in_words(element=noralization_record):
-                    if len(total_amount_in_words) == 0:
-                        total_amount_in_words.extend(noralization_record)
-                    continue
-
-                if len(noralization_record) != on_table_length:
-                    errors.append(noralization_record)
-                    continue
-
-                # Set
-                table_elements.append(noralization_record)
-
-    # Parse
-    dataset = pl.DataFrame(
-        table_elements,
-        schema=["no", "product_description", "unit", "quantity", "unit_price", "amount"],
-        orient="row",
-        strict=False
-    )
+            # Recognize
+            # The scanned pages are found up front, then recognized as they are reached inside the budget of the page
+            if ocr is not None:
+                recognizer = PageRecognizer(
+                    layouts, document=source.source_path or bytes(source.buffer), checksum=file_checksum, settings=ocr,
+                    count=budget.pages(len(layouts)), recorder=recorder,
+                )
 
-    # Transform
-    dataset = (
-        dataset
-        .with_columns([
-            pl.col("no").cast(pl.Int64, strict=True).name.keep(),
-            pl.col("product_description").str.replace_all("\n", " ").name.keep(),
-            pl.col("unit").cast(pl.String).str.to_titlecase().name.keep(),
-            pl.col("quantity").cast(pl.Int64, strict=True).name.keep(),
-            pl.col(["unit_price", "amount"]).str.replace_all(".", "", literal=True).cast(pl.Float64).name.keep(),
-        ])
-        .unique(subset="no")
-        .sort(by="no", descending=False)
-    )
+            # Extract
+            with budget.page(0):
+                if recognizer is not None:
+                    recognizer.apply(0)
+                _extract_profile(layouts, rule_set=rule_set, recorder=recorder, profile=profile)
+                if signature or verify_signature:
+                    with recorder.stage("signature"):
+                        profile["attribute"]["digital_signature"] = extract_digital_signature(source.buffer, verify=verify_signature)
+
+            # Extract
+            collector = _new_collector(layouts, profile, stop_at_total_amount=stop_at_total_amount, recorder=recorder, templates=templates)
+            parsed_pages = budget.pages(len(layouts))
+            for index in range(parsed_pages):
+                if collector.is_finished:
+                    break
+                with budget.page(index):
+                    if recognizer is not None:
+                        recognizer.apply(index)
+                    elements = collector.collect(layouts.page(index))
+                page_elements.append(elements)
+
+                # Release the cached layout objects of the processed page
+                layouts.release(index)
+
+            if parsed_pages < len(layouts) and not collector.is_finished:
+                raise LimitExceededError("max_pages", f"Parsed the first {parsed_pages} of {len(layouts)} pages on max_pages={parsed_pages}", page=parsed_pages)
+        except LimitExceededError as exc:
+            limit_exceeded = exc.to_dict()
+
+        layout_template = _update_templates(templates, collector) if collector is not None else None
+
+        # Parse
+        import polars as pl
+        table_elements = pl.concat(page_elements, how="vertical") if len(page_elements) > 0 else _empty_records()
+        with recorder.stage("dataset", line_items=table_elements.height):
+            dataset = _build_dataset(table_elements)
+        with recorder.stage("validation"):
+            validation = validate_dataset(
+                dataset,
+                total_amount_figure=collector.total_amount_figure if collector is not None else [],
+                total_amount_in_words=collector.total_amount_in_words if collector is not None else [],
+            )
+    finally:
+        if recognizer is not None:
+            recognizer.close()
+        document.close()
 
     # Checkpoint
     _end = datetime.now(tz=timezoneUTC)
 
-    return CommericalInvoiceResult(
+    result = CommericalInvoiceResult(
         runtime_metadata={
-            "source_path": pathlib.Path(path).as_posix(),
+            "source_path": source.source_path,
             "checksum_crc32c": file_checksum,
-            "total_pages": len(document.pages),
-            "file_size_mb": round(file_stat.st_size / 10**6, 2),
-            "pipeline": {
-                "start": _start,
-                "end": _end,
-                "processing_in_seconds": (_end - _start).total_seconds(),
-            },
+            "total_pages": total_pages,
+            "file_size_mb": round(source.size / 10**6, 2),
+            "pipeline": _pipeline_metadata(
+                recorder, start=_start, end=_end, line_items=dataset.height, layout=layouts.metadata,
+                text_normalization=_text_normalization_metadata(normalization_start),
+            ),
+            "cache_hit": False,
+            "backend": backend.name,
+            "layout_template": layout_template,
+            "limit_exceeded": limit_exceeded,
+            "validation": validation,
+            "segment": None,
+            "ocr": recognizer.metadata if recognizer is not None else None,
             # "container": document.to_dict(),
         },
-        profile={
-            "attribute": attribute,
-            "seller": seller,
-            "buyer": buyer,
-            "invoice_partner": invoice_partner,
+        profile=profile,
+        dataset=dataset.to_dicts(),
+    )
+
+    # The cache always hold the list of dicts, of the complete results only
+    if cache is not None and limit_exceeded is None:
+        with recorder.stage("cache_store"):
+            cache.set(file_checksum, result, options=cache_options)
+
+    if dataset_format != "dicts":
+        result["dataset"] = _format_dataset(dataset, dataset_format)
+
+    return result
+
+
+def _limit_exceeded_result(
+    source: _SourceBuffer,
+    recorder: StageRecorder,
+    backend: PDFBackend,
+    start: datetime,
+    error: LimitExceededError,
+    dataset_format: DatasetFormat,
+) -> CommericalInvoiceResult:
+    "The result of the document rejected before opening it"
+    return CommericalInvoiceResult(
+        runtime_metadata={
+            "source_path": source.source_path,
+            "checksum_crc32c": None,
+            "total_pages": 0,
+            "file_size_mb": round(source.size / 10**6, 2),
+            "pipeline": _pipeline_metadata(recorder, start=start, end=datetime.now(tz=timezoneUTC), line_items=0),
+            "cache_hit": False,
+            "backend": backend.name,
+            "layout_template": None,
+            "limit_exceeded": error.to_dict(),
+            "validation": None,
+            "segment": None,
+            "ocr": None,
         },
-        dataset=dataset.to_dicts()
+        profile=_new_profile(),
+        dataset=_format_dataset([], dataset_format),
+    )
+
+
+class CommericalInvoiceStream:
+    """Stream the line items of commerical invoice page by page in bounded memory
+
+    The profile is extracted on opening (first page only). The line items are typed per page with
+    the same transformation of `parse_commerical_invoice` and yielded as soon as the page is processed,
+    then the cached layout objects of the page are released. The duplicated `no` is yielded once.
+
+    Usage
+    -----
+    >>> from einvoice_lens import stream_commerical_invoice
+    >>> with stream_commerical_invoice("path/to/input.pdf") as stream:
+    ...     profile = stream.profile
+    ...     for item in stream:
+    ...         print(item["no"], item["amount"])
+    ...     runtime_metadata = stream.runtime_metadata
+    """
+
+    def __init__(
+        self,
+        path: DocumentSource,
+        stop_at_total_amount: bool = False,
+        rule_set: RuleSet | None = None,
+        instrumentation: Instrumentation | None = None,
+        templates: TemplateRegistry | None = None,
+        backend: str | PDFBackend | None = None,
+        signature: bool = False,
+        verify_signature: bool = False,
+    ):
+        self._start = datetime.now(tz=timezoneUTC)
+        self._recorder = StageRecorder(instrumentation)
+        self._backend = get_backend(backend)
+        self._normalization_start = _normalize_line.cache_info()
+        self._source = _SourceBuffer(path)
+        try:
+            with self._recorder.stage("checksum"):
+                self._checksum = self._source.checksum()
+            with self._recorder.stage("open"):
+                self._document = self._backend.open(self._source.stream())
+            self._layouts = DocumentLayout(self._document, self._recorder)
+            self.profile: CommericalInvoiceProfile = _extract_profile(self._layouts, rule_set=rule_set, recorder=self._recorder)
+            if signature or verify_signature:
+                with self._recorder.stage("signature"):
+                    self.profile["attribute"]["digital_signature"] = extract_digital_signature(self._source.buffer, verify=verify_signature)
+            self._collector = _new_collector(self._layouts, self.profile, stop_at_total_amount=stop_at_total_amount, recorder=self._recorder, templates=templates)
+        except Exception:
+            self.close()
+            raise
+        self._templates = templates
+        self._layout_template: LayoutTemplateMetadata | None = None
+        self._total_pages: int = len(self._document.pages)
+        self._end: datetime | None = None
+        self.total_items: int = 0
+
+    @property
+    def runtime_metadata(self) -> RuntimeMetadata:
+        "The end of pipeline is only filled after the line items are exhausted"
+        return RuntimeMetadata(
+            source_path=self._source.source_path,
+            checksum_crc32c=self._checksum,
+            total_pages=self._total_pages,
+            file_size_mb=round(self._source.size / 10**6, 2),
+            pipeline=_pipeline_metadata(
+                self._recorder, start=self._start, end=self._end, line_items=self.total_items, layout=self._layouts.metadata,
+                text_normalization=_text_normalization_metadata(self._normalization_start),
+            ),
+            cache_hit=False,
+            backend=self._backend.name,
+            layout_template=self._layout_template,
+            limit_exceeded=None,
+            validation=None,
+            segment=None,
+            ocr=None,
+        )
+
+    def iter_pages(self) -> Iterator[tuple[int, "pl.DataFrame"]]:
+        "Yield (page index, typed line items of the page)"
+        import polars as pl
+        seen_no: set[int] = set()
+        for index in range(len(self._layouts)):
+            if self._collector.is_finished:
+                break
+
+            page_elements = self._collector.collect(self._layouts.page(index))
+            self._layouts.release(index)
+            if page_elements.height == 0:
+                continue
+
+            with self._recorder.stage("dataset", page=index):
+                dataset = _build_dataset(page_elements).filter(~pl.col("no").is_in(list(seen_no)))
+            seen_no.update(dataset.get_column("no").to_list())
+            self.total_items += dataset.height
+            yield index, dataset
+
+        self._layout_template = _update_templates(self._templates, self._collector)
+        self._end = datetime.now(tz=timezoneUTC)
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        for _, dataset in self.iter_pages():
+            yield from dataset.iter_rows(named=True)
+
+    def close(self) -> None:
+        if getattr(self, "_document", None) is not None:
+            self._document.close()
+            self._document = None
+        self._source.close()
+
+    def __enter__(self) -> "CommericalInvoiceStream":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def stream_commerical_invoice(
+    path: DocumentSource,
+    stop_at_total_amount: bool = False,
+    rule_set: RuleSet | None = None,
+    instrumentation: Instrumentation | None = None,
+    templates: TemplateRegistry | None = None,
+    backend: str | PDFBackend | None = None,
+    signature: bool = False,
+    verify_signature: bool = False,
+) -> CommericalInvoiceStream:
+    """Open commerical invoice for streaming the line items page by page
+
+    Args
+    ----
+    path (DocumentSource): The path into PDF file, or the in-memory document
+    stop_at_total_amount (bool): Stop scanning the next pages once the totals block has been found
+    rule_set (RuleSet | None): The compiled rules of the first page fields
+    instrumentation (Instrumentation | None): The hook called on each stage of the pipeline
+    templates (TemplateRegistry | None): The layout templates of the vendors
+    backend (str | PDFBackend | None): The PDF library reading the page objects. Default to pdfplumber
+    signature (bool): Read the digital signature into `profile.attribute.digital_signature`
+    verify_signature (bool): Read the signature and check its byte range and digest
+
+    Return
+    ------
+    CommericalInvoiceStream: Iterate to get the line items, `profile` and `runtime_metadata` are reported separately
+    """
+    return CommericalInvoiceStream(
+        path,
+        stop_at_total_amount=stop_at_total_amount,
+        rule_set=rule_set,
+        instrumentation=instrumentation,
+        templates=templates,
+        backend=backend,
+        signature=signature,
+        verify_signature=verify_signature,
     )
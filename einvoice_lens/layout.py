@@ -0,0 +1,151 @@
+#!/bin/python3
+
+# Global
+from typing import Any, Callable, TypedDict
+
+# External
+import pdfplumber
+from pdfplumber.table import Table, TableFinder, TableSettings, cells_to_tables, edges_to_intersections, intersections_to_cells
+
+# Internal
+from einvoice_lens.telemetry import StageRecorder
+from einvoice_lens.templates import TABLE_SETTINGS, LayoutTemplate, _EdgeFinder, find_tables_on_template
+
+
+class LayoutMetadata(TypedDict):
+    # The pages whose layout objects are parsed, once each
+    pages_parsed: int
+    # The pages read by more than one view (e.g. the first page: text lines for the profile, then tables)
+    shared_pages: int
+    # The number of times a view got the objects, edges or tables already derived on the page
+    reused_views: int
+
+
+class _TableFinderOnEdges(TableFinder):
+    "The table detection on the merged edges already derived on the page"
+
+    def __init__(self, page: pdfplumber.page.Page, settings: dict[str, Any], edges: list[dict[str, Any]]):
+        self.page = page
+        self.settings = TableSettings.resolve(settings)
+        self.edges = edges
+        self.intersections = edges_to_intersections(self.edges, self.settings.intersection_x_tolerance, self.settings.intersection_y_tolerance)
+        self.cells = intersections_to_cells(self.intersections)
+        self.tables = [Table(self.page, cell_group) for cell_group in cells_to_tables(self.cells)]
+
+
+class PageLayout:
+    """The layout objects of one page, parsed once then shared by the text-line view and the table view
+
+    The objects (chars, lines, rects, curves) are parsed once by `parse()`, timed as the `page_layout` stage.
+    The views derived from them (text, ruling edges, tables) are computed once per page as well,
+    the repeated accesses are counted into `DocumentLayout.metadata`.
+    """
+
+    def __init__(self, page: pdfplumber.page.Page, document: "DocumentLayout"):
+        self.page = page
+        self.index: int = page.page_number - 1
+        self._document = document
+        self._views: dict[str, Any] = {}
+
+    def _view(self, name: str, compute: Callable[[], Any], shared: bool = True) -> Any:
+        "Derive the view once. `shared=False` for the prerequisite of another view, not counted as reused"
+        if name in self._views:
+            if shared:
+                self._document._on_reuse(self)
+            return self._views[name]
+        self._document._on_view(self, name)
+        self._views[name] = compute()
+        return self._views[name]
+
+    def _parse(self) -> dict[str, list[dict[str, Any]]]:
+        with self._document.recorder.stage("page_layout", page=self.index):
+            return self.page.objects
+
+    def parse(self) -> dict[str, list[dict[str, Any]]]:
+        "Parse the layout objects of the page (chars, lines, rects, curves), once"
+        return self._view("objects", self._parse, shared=False)
+
+    @property
+    def has_ruling_objects(self) -> bool:
+        "Cheap check on the page objects, the edges are not derived yet"
+        objects = self._view("objects", self._parse)
+        return any([len(objects.get(kind, [])) > 0 for kind in ("line", "rect", "curve")])
+
+    def text(self) -> str:
+        "The text-line view, as `Page.extract_text()`"
+        self.parse()
+        return self._view("text", self.page.extract_text)
+
+    def edges(self) -> list[dict[str, Any]]:
+        "The merged ruling edges of the `lines` strategy, shared by the detection and the template"
+        self.parse()
+        return self._view("edges", lambda: _EdgeFinder(self.page, TABLE_SETTINGS).edges)
+
+    def find_tables(self) -> list[Table]:
+        "The table view, as `Page.find_tables(TABLE_SETTINGS)`"
+        edges = self.edges()
+        return self._view("tables", lambda: _TableFinderOnEdges(self.page, TABLE_SETTINGS, edges).tables)
+
+    def find_tables_on_template(self, template: LayoutTemplate) -> list[Table] | None:
+        "The table view built on the columns of the template. None when the page doesn't match it"
+        return find_tables_on_template(self.page, template, edges=self.edges())
+
+    def close(self) -> None:
+        "Release the cached layout objects of the page"
+        self._views.clear()
+        self.page.close()
+
+
+class DocumentLayout:
+    """The page layouts of the document, each page is parsed once for all the stages
+
+    Usage
+    -----
+    >>> layouts = DocumentLayout(document, recorder)
+    >>> text = layouts.page(0).text()            # Profile
+    >>> tables = layouts.page(0).find_tables()   # Line items, on the same parsed objects
+    >>> layouts.release(0)
+
+    The `pages` restrict the layouts to the pages of one invoice in a multi-invoice document,
+    `page(0)` is then the first page of the range.
+    """
+
+    def __init__(self, document: pdfplumber.PDF, recorder: StageRecorder | None = None, pages: range | None = None):
+        self.document = document
+        self.recorder = recorder or StageRecorder()
+        self.pages = pages if pages is not None else range(len(document.pages))
+        self._pages: dict[int, PageLayout] = {}
+        self._page_views: dict[int, set[str]] = {}
+        self._reused_views: int = 0
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def page(self, index: int) -> PageLayout:
+        if index not in self._pages:
+            self._pages[index] = PageLayout(self.document.pages[self.pages[index]], self)
+        return self._pages[index]
+
+    def release(self, index: int) -> None:
+        layout = self._pages.pop(index, None)
+        if layout is not None:
+            layout.close()
+
+    def replace(self, index: int, page: Any) -> None:
+        "Swap the page for the one read another way (e.g. the OCR of the scanned page), the views are derived again"
+        self.release(index)
+        self._pages[index] = PageLayout(page, self)
+
+    def _on_view(self, layout: PageLayout, name: str) -> None:
+        self._page_views.setdefault(layout.index, set()).add(name)
+
+    def _on_reuse(self, layout: PageLayout) -> None:
+        self._reused_views += 1
+
+    @property
+    def metadata(self) -> LayoutMetadata:
+        return LayoutMetadata(
+            pages_parsed=sum([1 for views in self._page_views.values() if "objects" in views]),
+            shared_pages=sum([1 for views in self._page_views.values() if "text" in views and "edges" in views]),
+            reused_views=self._reused_views,
+        )
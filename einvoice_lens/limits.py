@@ -0,0 +1,148 @@
+#!/bin/python3
+
+# Global
+import time
+import signal
+import threading
+import contextlib
+from typing import TypedDict, Literal, NamedTuple, Iterator
+
+# Internal
+from einvoice_lens.telemetry import current_memory_mb
+
+
+LimitReason = Literal["max_file_size", "max_pages", "page_timeout", "document_timeout", "max_memory"]
+
+
+class ParseLimits(NamedTuple):
+    """The resource limits of one document, None is unlimited
+
+    - max_file_size_mb: Reject the document over this size before opening it
+    - max_pages: Parse the line items of the first pages only
+    - page_timeout_seconds: The time budget of the profile or the line items of one page
+    - document_timeout_seconds: The time budget of the whole document
+    - max_memory_mb: The growth of the resident memory of the process while parsing the document
+
+    The timeouts interrupt the page in progress when the document is parsed on the main thread of
+    the process (the CLI, the workers of `parse_commerical_invoices` and `AsyncInvoiceParser` process executor).
+    On the other threads, they are checked between the pages as the memory.
+    """
+    max_file_size_mb: float | None = None
+    max_pages: int | None = None
+    page_timeout_seconds: float | None = None
+    document_timeout_seconds: float | None = None
+    max_memory_mb: float | None = None
+
+
+class LimitExceeded(TypedDict):
+    reason: LimitReason
+    message: str
+    # The page interrupted or the first page not parsed, None when the document isn't opened
+    page: int | None
+
+
+class LimitExceededError(Exception):
+    "Raised inside the pipeline on reaching one of the limits, reported as `runtime_metadata.limit_exceeded`"
+
+    def __init__(self, reason: LimitReason, message: str, page: int | None = None):
+        super().__init__(message)
+        self.reason = reason
+        self.page = page
+
+    def to_dict(self) -> LimitExceeded:
+        return LimitExceeded(reason=self.reason, message=str(self), page=self.page)
+
+
+def _can_interrupt() -> bool:
+    "The signal handlers are only run on the main thread"
+    return hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+
+
+class ResourceBudget:
+    """Enforce the limits on one document, started on creation
+
+    Usage
+    -----
+    >>> budget = ResourceBudget(ParseLimits(max_pages=20, page_timeout_seconds=5))
+    >>> budget.check_file_size(size)
+    >>> for index in range(budget.pages(total_pages)):
+    ...     with budget.page(index):
+    ...         ...
+    ...     budget.check(index)
+    """
+
+    def __init__(self, limits: ParseLimits | None = None):
+        self.limits = limits or ParseLimits()
+        for name, value in self.limits._asdict().items():
+            if value is not None and value <= 0:
+                raise ValueError(f"Required {name} > 0. Got {name}={value!r}")
+
+        self._start = time.perf_counter()
+        self._start_memory_mb = current_memory_mb() if self.limits.max_memory_mb is not None else None
+
+    def check_file_size(self, size: int) -> None:
+        if self.limits.max_file_size_mb is not None and size > self.limits.max_file_size_mb * 10**6:
+            raise LimitExceededError("max_file_size", f"The document of {size / 10**6:.2f} MB is over max_file_size_mb={self.limits.max_file_size_mb}")
+
+    def pages(self, total_pages: int) -> int:
+        "The number of pages to parse"
+        if self.limits.max_pages is None:
+            return total_pages
+        return min(total_pages, self.limits.max_pages)
+
+    def remaining_seconds(self) -> float | None:
+        if self.limits.document_timeout_seconds is None:
+            return None
+        return self.limits.document_timeout_seconds - (time.perf_counter() - self._start)
+
+    def check(self, page: int | None = None) -> None:
+        "Check the time of the document and the memory, between the pages"
+        remaining = self.remaining_seconds()
+        if remaining is not None and remaining <= 0:
+            raise LimitExceededError("document_timeout", f"The document is over document_timeout_seconds={self.limits.document_timeout_seconds}", page=page)
+
+        if self._start_memory_mb is not None:
+            growth = current_memory_mb() - self._start_memory_mb
+            if growth > self.limits.max_memory_mb:
+                raise LimitExceededError("max_memory", f"The memory grew {growth:.1f} MB, over max_memory_mb={self.limits.max_memory_mb}", page=page)
+
+    @contextlib.contextmanager
+    def page(self, index: int) -> Iterator[None]:
+        "Interrupt the page on the earliest of the page and the document timeouts"
+        self.check(index)
+
+        remaining = self.remaining_seconds()
+        timeout, reason = self.limits.page_timeout_seconds, "page_timeout"
+        if remaining is not None and (timeout is None or remaining < timeout):
+            timeout, reason = remaining, "document_timeout"
+
+        if timeout is None:
+            yield
+            return
+
+        if not _can_interrupt():
+            _start = time.perf_counter()
+            yield
+            if reason == "page_timeout" and time.perf_counter() - _start > timeout:
+                raise LimitExceededError("page_timeout", f"The page {index} is over page_timeout_seconds={timeout}", page=index)
+            return
+
+        limit = f"{reason}_seconds={getattr(self.limits, reason + '_seconds')}"
+        interrupted: list[LimitExceededError] = []
+
+        def _on_alarm(signum, frame) -> None:
+            interrupted.append(LimitExceededError(reason, f"Interrupted the page {index} on {limit}", page=index))
+            raise interrupted[0]
+
+        previous = signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            yield
+        except Exception as exc:
+            # The PDF library wraps the errors raised while reading the page (e.g. `PdfminerException`)
+            if len(interrupted) > 0 and exc is not interrupted[0]:
+                raise interrupted[0] from exc
+            raise
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
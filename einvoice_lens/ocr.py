@@ -0,0 +1,430 @@
+#!/bin/python3
+
+# Global
+import abc
+import re
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Any, ClassVar, NamedTuple, TypedDict
+from typing import TYPE_CHECKING
+
+# Internal
+from einvoice_lens.backends import _ConvertedPage, _char_object
+from einvoice_lens.layout import DocumentLayout
+from einvoice_lens.limits import LimitExceededError
+from einvoice_lens.telemetry import StageRecorder
+
+if TYPE_CHECKING:
+    from PIL import Image
+    from einvoice_lens.cache import OCRCache
+
+
+class OCRWord(TypedDict):
+    text: str
+    # The box in pixels of the rasterized page, the top and the bottom are the ones of the text line
+    # so that the words of one line are on the same line of the text layer
+    x0: float
+    top: float
+    x1: float
+    bottom: float
+    confidence: float
+
+
+class RecognizedPage(TypedDict):
+    # The words and the ruling lines in PDF points, on the top-left origin of the page
+    words: list[OCRWord]
+    # [x0, top, x1, bottom] of the horizontal (top == bottom) and the vertical (x0 == x1) lines
+    lines: list[list[float]]
+
+
+class OCRMetadata(TypedDict):
+    engine: str
+    dpi: int
+    # The indexes of the pages without text layer, recognized by the engine
+    pages: list[int]
+    # The pages served by the `OCRCache`
+    cached_pages: int
+    # The pages without text layer the engine failed on, parsed as empty pages
+    failed_pages: list[int]
+
+
+class OCREngine(abc.ABC):
+    """The local OCR engine reading the words of the rasterized page, offline
+
+    The words are converted into the `char` dicts of pdfplumber, and the ruling lines are detected on the raster,
+    so that the scanned page goes through the same line rules and table logic as the text layer.
+
+    Usage
+    -----
+    >>> from einvoice_lens import parse_commerical_invoice, OCRSettings
+    >>> result = parse_commerical_invoice("path/to/scanned.pdf", ocr=OCRSettings(engine="tesseract", dpi=300))
+    """
+
+    # The name reported in `runtime_metadata.ocr`
+    name: ClassVar[str]
+
+    @abc.abstractmethod
+    def recognize(self, image: "Image.Image") -> list[OCRWord]:
+        "The words of the page image in reading order, the boxes in pixels"
+
+    def fingerprint(self) -> str:
+        "The key of the OCR cache, changed by any option changing the recognized words (e.g. language)"
+        return self.name
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}()"
+
+
+class TesseractEngine(OCREngine):
+    """The Tesseract engine, run locally by `pytesseract`
+
+    Required the `pytesseract` package and the `tesseract` binary with the language data.
+    Install by: pip install einvoice-lens[ocr]
+
+    Args
+    ----
+    lang (str): The Tesseract languages. Default to Vietnamese then English
+    config (str): The extra arguments of the `tesseract` command (e.g. "--psm 6")
+    """
+
+    name: ClassVar[str] = "tesseract"
+
+    def __init__(self, lang: str = "vie+eng", config: str = ""):
+        self.lang = lang
+        self.config = config
+
+    def fingerprint(self) -> str:
+        return f"{self.name}:{self.lang}:{self.config}"
+
+    def recognize(self, image: "Image.Image") -> list[OCRWord]:
+        try:
+            import pytesseract
+        except ModuleNotFoundError:
+            raise ModuleNotFoundError("Required `pytesseract` for engine='tesseract'. Install by: pip install einvoice-lens[ocr]")
+
+        data = pytesseract.image_to_data(image, lang=self.lang, config=self.config, output_type=pytesseract.Output.DICT)
+
+        # Group the words by the line of Tesseract (block, paragraph, line)
+        lines: dict[tuple[int, int, int], list[OCRWord]] = {}
+        for i, text in enumerate(data["text"]):
+            text = text.strip()
+            confidence = float(data["conf"][i])
+            if text == "" or confidence < 0:
+                continue
+            left, top, width, height = data["left"][i], data["top"][i], data["width"][i], data["height"][i]
+            key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            lines.setdefault(key, []).append(OCRWord(text=text, x0=left, top=top, x1=left + width, bottom=top + height, confidence=confidence))
+
+        words: list[OCRWord] = []
+        for line in lines.values():
+            top, bottom = min([word["top"] for word in line]), max([word["bottom"] for word in line])
+            words.extend([OCRWord(**{**word, "top": top, "bottom": bottom}) for word in line])
+        return words
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(lang={self.lang!r})"
+
+
+OCR_ENGINES: dict[str, type[OCREngine]] = {
+    "tesseract": TesseractEngine,
+}
+
+
+def get_ocr_engine(engine: "str | OCREngine | None" = None) -> OCREngine:
+    "Resolve the OCR engine by name, default to Tesseract"
+    if engine is None:
+        return TesseractEngine()
+    if isinstance(engine, OCREngine):
+        return engine
+    if engine not in OCR_ENGINES:
+        raise ValueError(f"Invalid OCR engine. Required one of {', '.join(OCR_ENGINES)}. Got {engine!r}")
+    return OCR_ENGINES[engine]()
+
+
+class OCRSettings(NamedTuple):
+    """The OCR fallback of the pages without any char (scanned pages), the text layer is never recognized again
+
+    Args
+    ----
+    engine (str | OCREngine): The local OCR engine. Default to Tesseract
+    dpi (int): The resolution of the rasterized page, 300 for the small print of the line items
+    workers (int): The process pool recognizing the pages of one document. With `workers=1` the pages
+        are recognized in the current process, as inside the workers of `parse_commerical_invoices`
+    cache (OCRCache | None): The recognized pages, keyed on (checksum, page, dpi, engine)
+
+    Usage
+    -----
+    >>> from einvoice_lens import parse_commerical_invoice, OCRSettings, OCRCache
+    >>> ocr = OCRSettings(dpi=300, workers=4, cache=OCRCache("cache/ocr.sqlite"))
+    >>> result = parse_commerical_invoice("path/to/scanned.pdf", ocr=ocr)
+    """
+    engine: "str | OCREngine" = "tesseract"
+    dpi: int = 300
+    workers: int = 1
+    cache: "OCRCache | None" = None
+
+
+def _open_pdfium(document: str | bytes) -> Any:
+    try:
+        import pypdfium2
+    except ModuleNotFoundError:
+        raise ModuleNotFoundError("Required `pypdfium2` for the OCR fallback. Install by: pip install einvoice-lens[ocr]")
+    return pypdfium2.PdfDocument(document)
+
+
+def find_scanned_pages(document: str | bytes, pages: list[int]) -> list[int]:
+    "The pages without any char, counted by the text page of PDFium without building the char objects"
+    native = _open_pdfium(document)
+    try:
+        scanned: list[int] = []
+        for index in pages:
+            page = native[index]
+            text_page = page.get_textpage()
+            if text_page.count_chars() == 0:
+                scanned.append(index)
+            text_page.close()
+            page.close()
+        return scanned
+    finally:
+        native.close()
+
+
+def rasterize_page(document: str | bytes, index: int, dpi: int) -> "Image.Image":
+    "Render the page into the grayscale image by PDFium"
+    native = _open_pdfium(document)
+    try:
+        page = native[index]
+        try:
+            return page.render(scale=dpi / 72, grayscale=True).to_pil()
+        finally:
+            page.close()
+    finally:
+        native.close()
+
+
+# The ruling lines on the raster: the runs of dark pixels at least of the table cell height (in points),
+# thinner than the bold strokes of the text
+_RULING_MIN_LENGTH: float = 10.0
+_RULING_MAX_THICKNESS: float = 3.0
+_DARK_THRESHOLD: int = 192
+
+
+def _horizontal_runs(image: "Image.Image", min_length: int) -> list[tuple[int, int, int]]:
+    "The (row, start, end) of the dark runs, matched by the regex engine on the bytes of each row"
+    width, height = image.size
+    data = image.point(lambda value: 0 if value < _DARK_THRESHOLD else 255).tobytes()
+    pattern = re.compile(b"\x00{%d,}" % min_length)
+    runs: list[tuple[int, int, int]] = []
+    for row in range(height):
+        offset = row * width
+        runs.extend([(row, match.start() - offset, match.end() - offset) for match in pattern.finditer(data, offset, offset + width)])
+    return runs
+
+
+def _merge_runs(runs: list[tuple[int, int, int]], tolerance: int, max_thickness: int) -> list[tuple[float, int, int]]:
+    "Merge the runs of the consecutive rows into one line (center row, start, end), the thick blocks are dropped"
+    # [first row, last row, start, end], the groups ended before the previous row are closed
+    groups: list[list[int]] = []
+    active: list[list[int]] = []
+    current_row = -1
+    for row, start, end in runs:
+        if row != current_row:
+            groups.extend([group for group in active if group[1] < row - 1])
+            active = [group for group in active if group[1] >= row - 1]
+            current_row = row
+        for group in active:
+            if group[1] == row - 1 and abs(group[2] - start) <= tolerance and abs(group[3] - end) <= tolerance:
+                group[1], group[2], group[3] = row, min(group[2], start), max(group[3], end)
+                break
+        else:
+            active.append([row, row, start, end])
+    groups.extend(active)
+    return [((first + last) / 2, start, end) for first, last, start, end in groups if last - first + 1 <= max_thickness]
+
+
+def detect_ruling_lines(image: "Image.Image", dpi: int) -> list[list[float]]:
+    "The horizontal and vertical ruling lines of the page image, as [x0, top, x1, bottom] in points"
+    from PIL import Image
+
+    scale = dpi / 72
+    gray = image.convert("L")
+    min_length = max(1, round(_RULING_MIN_LENGTH * scale))
+    max_thickness = max(1, round(_RULING_MAX_THICKNESS * scale))
+    tolerance = max(1, round(scale))
+
+    lines: list[list[float]] = []
+    for row, start, end in _merge_runs(_horizontal_runs(gray, min_length), tolerance, max_thickness):
+        lines.append([start / scale, row / scale, end / scale, row / scale])
+    # The columns are the rows of the transposed image
+    for column, start, end in _merge_runs(_horizontal_runs(gray.transpose(Image.Transpose.TRANSPOSE), min_length), tolerance, max_thickness):
+        lines.append([column / scale, start / scale, column / scale, end / scale])
+    return lines
+
+
+def recognize_page(document: str | bytes, index: int, dpi: int, engine: OCREngine) -> RecognizedPage:
+    "Run inside the worker: rasterize, recognize the words then detect the ruling lines, in points"
+    image = rasterize_page(document, index, dpi)
+    scale = dpi / 72
+    words = [
+        OCRWord(text=word["text"], x0=word["x0"] / scale, top=word["top"] / scale, x1=word["x1"] / scale, bottom=word["bottom"] / scale, confidence=word["confidence"])
+        for word in engine.recognize(image)
+    ]
+    return RecognizedPage(words=words, lines=detect_ruling_lines(image, dpi))
+
+
+def _ocr_chars(words: list[OCRWord], page_number: int, page_height: float) -> list[dict[str, Any]]:
+    """The `char` dicts of the words, the glyphs share the width of the word evenly
+
+    The space between the words of one line is a char itself, as the text layer of the e-invoices,
+    so that the words are split whatever the gap.
+    """
+    chars: list[dict[str, Any]] = []
+    previous: OCRWord | None = None
+    for word in sorted(words, key=lambda word: (word["top"], word["x0"])):
+        size = word["bottom"] - word["top"]
+        if previous is not None and previous["top"] == word["top"] and previous["x1"] <= word["x0"]:
+            chars.append(_char_object(" ", fontname="OCR", size=size, upright=True, x0=previous["x1"], x1=word["x0"], bottom=word["bottom"], page_number=page_number, page_height=page_height))
+        width = (word["x1"] - word["x0"]) / len(word["text"])
+        for i, text in enumerate(word["text"]):
+            chars.append(_char_object(
+                text, fontname="OCR", size=size, upright=True, x0=word["x0"] + i * width, x1=word["x0"] + (i + 1) * width,
+                bottom=word["bottom"], page_number=page_number, page_height=page_height,
+            ))
+        previous = word
+    return chars
+
+
+class _OCRPage(_ConvertedPage):
+    "The scanned page, the objects are the recognized words and the ruling lines detected on the raster"
+
+    def __init__(self, page: Any, recognized: RecognizedPage):
+        super().__init__(None, page.page_number - 1, width=float(page.width), height=float(page.height))
+        self._recognized = recognized
+
+    def _native_page(self) -> Any:
+        return None
+
+    def _read_chars(self, page: Any) -> list[dict[str, Any]]:
+        return _ocr_chars(self._recognized["words"], page_number=self.page_number, page_height=self.height)
+
+    def _read_paths(self, page: Any) -> list[list[tuple[float, float]]]:
+        return [[(x0, top), (x1, bottom)] for x0, top, x1, bottom in self._recognized["lines"]]
+
+
+class PageRecognizer:
+    """Replace the pages without any char by their recognized objects, page by page inside the parse
+
+    The scanned pages are found up front by their char count only, then the pages missed by the cache
+    are submitted to the bounded process pool. Each page is waited for (or recognized, with `workers=1`)
+    by `apply(index)` right before it's parsed, so that the page and the document timeouts of the parse
+    interrupt the slow recognition as any other page. The page the engine failed on is reported
+    into `failed_pages` and parsed as the empty page.
+
+    Args
+    ----
+    layouts (DocumentLayout): The layouts of the document, the scanned pages are replaced in place
+    document (str | bytes): The path into PDF file, or its bytes, read again by the rasterizer
+    checksum (str): The checksum of the document, the key of the OCR cache
+    settings (OCRSettings): The engine, the resolution, the workers and the cache
+    count (int | None): Recognize the first pages only (e.g. on `max_pages`). Default to every page
+    recorder (StageRecorder | None): Time the recognition of each page as the `ocr` stage
+
+    Usage
+    -----
+    >>> with PageRecognizer(layouts, document, checksum, settings) as recognizer:
+    ...     for index in range(len(layouts)):
+    ...         with budget.page(index):
+    ...             recognizer.apply(index)
+    ...             ...
+    >>> recognizer.metadata
+    """
+
+    def __init__(
+        self,
+        layouts: DocumentLayout,
+        document: str | bytes,
+        checksum: str,
+        settings: OCRSettings,
+        count: int | None = None,
+        recorder: StageRecorder | None = None,
+    ):
+        self.engine = get_ocr_engine(settings.engine)
+        if settings.dpi < 1 or settings.workers < 1:
+            raise ValueError(f"Required dpi >= 1 and workers >= 1. Got dpi={settings.dpi!r}, workers={settings.workers!r}")
+
+        self.layouts = layouts
+        self.document = document
+        self.checksum = checksum
+        self.settings = settings
+        self.recorder = recorder or layouts.recorder
+        self._fingerprint = self.engine.fingerprint()
+        self._recognized: dict[int, RecognizedPage] = {}
+        self._futures: dict[int, Future] = {}
+        self._executor: ProcessPoolExecutor | None = None
+        self._pages: list[int] = []
+        self._failed_pages: list[int] = []
+
+        count = len(layouts) if count is None else min(count, len(layouts))
+        with self.recorder.stage("ocr"):
+            # The indexes in the layouts, as the pages of a multi-invoice document are a range of the document
+            scanned = set(find_scanned_pages(document, [layouts.pages[index] for index in range(count)]))
+            self._scanned = [index for index in range(count) if layouts.pages[index] in scanned]
+
+            # The page number in the document, the same page of a multi-invoice document is cached once
+            if settings.cache is not None:
+                for index in self._scanned:
+                    cached = settings.cache.get(checksum, page=layouts.pages[index], dpi=settings.dpi, engine=self._fingerprint)
+                    if cached is not None:
+                        self._recognized[index] = cached
+            self._cached_pages = len(self._recognized)
+
+            missed = [index for index in self._scanned if index not in self._recognized]
+            if settings.workers > 1 and len(missed) > 1:
+                # Note: Use `spawn` as forking a process after polars initialized its thread pool can deadlock
+                self._executor = ProcessPoolExecutor(max_workers=min(settings.workers, len(missed)), mp_context=multiprocessing.get_context("spawn"))
+                for index in missed:
+                    self._futures[index] = self._executor.submit(recognize_page, document, layouts.pages[index], settings.dpi, self.engine)
+
+    def _recognize(self, index: int) -> RecognizedPage:
+        if index in self._futures:
+            return self._futures.pop(index).result()
+        return recognize_page(self.document, self.layouts.pages[index], self.settings.dpi, self.engine)
+
+    def apply(self, index: int) -> None:
+        "Replace the page by its recognized objects when it's scanned, once"
+        if index not in self._scanned or index in self._pages or index in self._failed_pages:
+            return
+
+        with self.recorder.stage("ocr", page=index):
+            if index in self._recognized:
+                recognized = self._recognized.pop(index)
+            else:
+                try:
+                    recognized = self._recognize(index)
+                except LimitExceededError:
+                    raise
+                except Exception:
+                    # The other pages are still recognized, the failed one stays empty
+                    self._failed_pages.append(index)
+                    return
+                if self.settings.cache is not None:
+                    self.settings.cache.set(self.checksum, page=self.layouts.pages[index], dpi=self.settings.dpi, engine=self._fingerprint, recognized=recognized)
+
+            self.layouts.replace(index, _OCRPage(self.layouts.page(index).page, recognized))
+            self._pages.append(index)
+
+    @property
+    def metadata(self) -> OCRMetadata:
+        return OCRMetadata(engine=self.engine.name, dpi=self.settings.dpi, pages=self._pages, cached_pages=self._cached_pages, failed_pages=self._failed_pages)
+
+    def close(self) -> None:
+        "Stop the pool without waiting for the pages left after the interrupted one"
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self) -> "PageRecognizer":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
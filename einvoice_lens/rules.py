@@ -0,0 +1,325 @@
+#!/bin/python3
+
+# Global
+import re
+import hashlib
+import unicodedata
+from datetime import date
+from typing import Any, Literal, NamedTuple
+
+
+class FieldRule(NamedTuple):
+    """Declarative rule of one profile field, detected by keyword on the line of the first page
+
+    Args
+    ----
+    section (str): The profile section, one of attribute, seller, buyer, invoice_partner.
+        The seller/buyer rules are only applied while scrolling over the seller/buyer block
+    field (str): The field name in the section
+    keywords (tuple[str, ...]): The rule is triggered when any of the keywords is found
+    scope (str): Search on the whole `line` or only on the `key` (the text before the first ":")
+    case_sensitive (bool): Match the keywords with case
+    group (str | None): Triggered rules in the same (section, group) are exclusive, the first registered wins.
+        None means the rule is always applied
+    value (str | None): The constant value. Otherwise the value is the text after the first ":" (None if not exist)
+    form (str): The unicode normalization form applied on the value
+    """
+    section: Literal["attribute", "seller", "buyer", "invoice_partner"]
+    field: str
+    keywords: tuple[str, ...]
+    scope: Literal["line", "key"] = "line"
+    case_sensitive: bool = False
+    group: str | None = None
+    value: str | None = None
+    form: Literal["NFC", "NFD", "NFKC", "NFKD"] = "NFC"
+
+
+DEFAULT_FIELD_RULES: tuple[FieldRule, ...] = (
+    # Attribute
+    FieldRule("attribute", "document_type", ("sales invoice", "hóa đơn bán hàng", "đơn bán hàng"), group="document_type", value="SALES_INVOICE"),
+    FieldRule("attribute", "serial_no", ("Serial No",), scope="key", case_sensitive=True, group="mapping", form="NFKD"),
+    FieldRule("attribute", "invoice_number", ("No.",), scope="key", case_sensitive=True, group="mapping", form="NFKD"),
+    FieldRule("attribute", "tax_agent_code", ("mã của cơ quan thuế", "mã cơ quan thuế"), scope="key", group="mapping", form="NFKD"),
+    # Seller
+    FieldRule("seller", "name", ("seller",), group="detail"),
+    FieldRule("seller", "tax_code", ("tax code",), group="detail"),
+    FieldRule("seller", "address", ("address",), group="detail"),
+    FieldRule("seller", "tel", ("tel",), group="detail"),  # TODO: Multiple in 1 line
+    FieldRule("seller", "email", ("email",), group="detail"),  # TODO: Multiple in 1 line
+    FieldRule("seller", "fax", ("fax",), group="detail"),  # TODO: Multiple in 1 line
+    FieldRule("seller", "account_number", ("a/c no",), group="detail"),
+    # Buyer
+    FieldRule("buyer", "name", ("buyer",), group="name"),
+    FieldRule("buyer", "company", ("company's name",), group="detail"),
+    FieldRule("buyer", "tax_code", ("tax code",), group="detail"),
+    FieldRule("buyer", "address", ("address",), group="detail"),
+    FieldRule("buyer", "tel", ("tel",), group="detail"),  # TODO: Multiple in 1 line
+    FieldRule("buyer", "email", ("email",), group="detail"),  # TODO: Multiple in 1 line
+    FieldRule("buyer", "fax", ("fax",), group="detail"),  # TODO: Multiple in 1 line
+    FieldRule("buyer", "account_number", ("a/c no",), group="detail"),
+)
+
+# Built-in triggers, handled by the engine itself
+_SCROLL_KEYWORDS: tuple[tuple[str, str], ...] = (("seller", "seller"), ("buyer", "buyer"))
+_ISSUE_DATE_KEYWORDS: tuple[str, ...] = ("date", "day", "month", "year")
+_INVOICE_PARTNER_KEYWORD: str = "Tra cứu hóa đơn"
+
+# Detect issue date. Example: Ngày (date) 25 tháng (month) 09 năm (year) 2025
+_RE_ISSUE_DAY = (re.compile(r"(?<=date\))\s?\d{1,}+", re.A), re.compile(r"(?<=day\))\s?\d{1,}+", re.A))
+_RE_ISSUE_MONTH = re.compile(r"(?<=month\))\s?\d{1,}+", re.A)
+_RE_ISSUE_YEAR = re.compile(r"(?<=year\))\s?\d{1,}+", re.A)
+_RE_ISSUE_YEAR_ON_LINE = re.compile(r"^2\d{3}$", re.A)
+
+# Invoice partner
+_RE_PARTNER_SEARCH_KEYWORD_ID = re.compile(r"(?<=search_keyword_id\:)\s?(?P<keyword_id>\w+)", re.I)
+_RE_PARTNER_ENDPOINT = re.compile(r"\bhttps?://(?:[\w\-]+\.)+[\w\-]+\b", re.I)
+_RE_PARTNER_TAX_CODE = re.compile(r"(?<=tax_code\:)\s?(?P<tax_code>\b\w+)", re.I)
+
+
+class _Keyword(NamedTuple):
+    text: str
+    case_sensitive: bool
+
+
+class RuleSet:
+    """The compiled set of field rules
+
+    All keywords (of the field rules and the built-in triggers) are compiled into one regex
+    of lookahead alternatives, so that each line is scanned once whatever the number of rules.
+    Only the rules of the found keywords are evaluated afterward.
+
+    Usage
+    -----
+    >>> from einvoice_lens.rules import RuleSet, FieldRule, DEFAULT_FIELD_RULES
+    >>> rule_set = RuleSet(DEFAULT_FIELD_RULES)
+    >>> rule_set.register(FieldRule("invoice_partner", "contact", ("hotline",)))
+    """
+
+    def __init__(self, rules: tuple[FieldRule, ...] | list[FieldRule] = DEFAULT_FIELD_RULES):
+        self.rules: list[FieldRule] = []
+        for rule in rules:
+            self._validate(rule)
+            self.rules.append(rule)
+        self.compile()
+
+    @staticmethod
+    def _validate(rule: FieldRule) -> None:
+        if rule.section not in ("attribute", "seller", "buyer", "invoice_partner"):
+            raise ValueError(f"Invalid section of rule. Got section={rule.section!r}")
+        if rule.scope not in ("line", "key"):
+            raise ValueError(f"Invalid scope of rule. Got scope={rule.scope!r}")
+        if len(rule.keywords) == 0:
+            raise ValueError(f"Required at least one keyword on rule={rule!r}")
+
+    def register(self, rule: FieldRule) -> None:
+        "Register an extra rule (e.g. for other e-invoice vendors). The matcher is re-compiled once here, not per line"
+        self._validate(rule)
+        self.rules.append(rule)
+        self.compile()
+
+    def compile(self) -> None:
+        # The identity of the rules, part of the result cache key
+        self.fingerprint: str = hashlib.sha1(repr(tuple(self.rules)).encode("utf-8")).hexdigest()[:16]
+
+        keywords: dict[_Keyword, int] = {}
+
+        def _index_of(text: str, case_sensitive: bool) -> int:
+            keyword = _Keyword(unicodedata.normalize("NFKC", text), case_sensitive)
+            if keyword not in keywords:
+                keywords[keyword] = len(keywords)
+            return keywords[keyword]
+
+        # Map: keyword -> rules
+        self._keyword_rules: dict[int, list[int]] = {}
+        for rule_index, rule in enumerate(self.rules, start=0):
+            for text in rule.keywords:
+                self._keyword_rules.setdefault(_index_of(text, rule.case_sensitive), []).append(rule_index)
+
+        # Map: keyword -> built-in triggers
+        self._scroll_keywords = [(_index_of(text, False), section) for text, section in _SCROLL_KEYWORDS]
+        self._issue_date_keywords = {text: _index_of(text, True) for text in _ISSUE_DATE_KEYWORDS}
+        self._invoice_partner_keyword = _index_of(_INVOICE_PARTNER_KEYWORD, False)
+
+        # Compile
+        # The lookahead allows overlapped keywords, the longer alternative is tried first at the same position.
+        # The shorter keywords which are prefix of the found one are resolved on the `_prefixes` afterward
+        self._keywords = list(keywords)
+        ordered = sorted(range(len(self._keywords)), key=lambda i: -len(self._keywords[i].text))
+        alternatives = [
+            f"(?P<k{i}>{re.escape(self._keywords[i].text)})" if self._keywords[i].case_sensitive
+            else f"(?P<k{i}>(?i:{re.escape(self._keywords[i].text)}))"
+            for i in ordered
+        ]
+        # The class of first characters is checked before trying every alternative on each position
+        first_characters = [
+            "".join(sorted({re.escape(keyword.text[0]) for keyword in self._keywords if keyword.case_sensitive is flag}))
+            for flag in (True, False)
+        ]
+        prefilter = "|".join(
+            [f"[{first_characters[0]}]"] * (first_characters[0] != "") + [f"(?i:[{first_characters[1]}])"] * (first_characters[1] != "")
+        )
+        self._matcher = re.compile("(?=" + prefilter + ")(?=" + "|".join(alternatives) + ")")
+        self._prefixes: dict[int, list[int]] = {
+            i: [
+                j for j in range(len(self._keywords))
+                if j != i and len(self._keywords[j].text) <= len(self._keywords[i].text)
+                and self._keywords[i].text.lower().startswith(self._keywords[j].text.lower())
+            ]
+            for i in range(len(self._keywords))
+        }
+
+    def scan(self, line: str) -> dict[int, int]:
+        "One pass over the line. Return the first position of each found keyword"
+        found: dict[int, int] = {}
+        for match in self._matcher.finditer(line):
+            index = int(match.lastgroup[1:])
+            position = match.start()
+            if index not in found:
+                found[index] = position
+            for prefix_index in self._prefixes[index]:
+                if prefix_index in found:
+                    continue
+                keyword = self._keywords[prefix_index]
+                candidate = line[position:position + len(keyword.text)]
+                if candidate == keyword.text or (not keyword.case_sensitive and candidate.lower() == keyword.text.lower()):
+                    found[prefix_index] = position
+        return found
+
+    def extract(self, lines: list[str], profile: dict[str, dict[str, Any]]) -> None:
+        """Apply the rules on the lines of the first page, the sections of `profile` are updated in place
+
+        Args
+        ----
+        lines (list[str]): The normalized lines of the first page
+        profile (dict): The sections: attribute, seller, buyer, invoice_partner
+        """
+
+        on_scrool_over_type: str = ""  # One of seller, buyer for search role play
+        for on_ind, on_text in enumerate(lines, start=0):
+
+            found = self.scan(on_text)
+            if len(found) == 0:
+                continue
+
+            # Issue date
+            if all([
+                any([self._issue_date_keywords["date"] in found, self._issue_date_keywords["day"] in found]),
+                self._issue_date_keywords["month"] in found,
+                self._issue_date_keywords["year"] in found,
+            ]):
+                profile["attribute"]["issue_date"] = _extract_issue_date(lines, on_ind)
+
+            # Handle the invoice partner
+            if found.get(self._invoice_partner_keyword) == 0:
+                on_next_text = lines[on_ind + 1] if on_ind + 1 < len(lines) else None
+                _extract_invoice_partner(" ".join([on_text, on_next_text or ""]), profile["invoice_partner"])
+
+            # Define scroll point
+            # Detect block of buyer | seller (related to same attribute like name, address, account_number, ...)
+            # then search words related until change scrolling point
+            for keyword_index, section in self._scroll_keywords:
+                if keyword_index in found:
+                    on_scrool_over_type = section
+                    break
+
+            # Rules
+            colon_index = on_text.find(":")
+            triggered: dict[tuple[str, str | None], int] = {}
+            always: list[int] = []
+            for keyword_index, position in found.items():
+                for rule_index in self._keyword_rules.get(keyword_index, []):
+                    rule = self.rules[rule_index]
+
+                    if rule.section in ("seller", "buyer") and rule.section != on_scrool_over_type:
+                        continue
+
+                    if rule.scope == "key" and (colon_index == -1 or position + len(self._keywords[keyword_index].text) > colon_index):
+                        continue
+
+                    if rule.group is None:
+                        always.append(rule_index)
+                        continue
+
+                    # Exclusive on group, the first registered wins
+                    group_key = (rule.section, rule.group)
+                    if group_key not in triggered or rule_index < triggered[group_key]:
+                        triggered[group_key] = rule_index
+
+            for rule_index in sorted([*always, *triggered.values()]):
+                rule = self.rules[rule_index]
+                if rule.value is not None:
+                    value = rule.value
+                elif colon_index == -1:
+                    value = None
+                else:
+                    value = unicodedata.normalize(rule.form, on_text[colon_index + 1:].strip())
+                profile[rule.section][rule.field] = value
+
+
+def _extract_issue_date(lines: list[str], on_ind: int) -> date | None:
+    "Example: Ngày (date) 25 tháng (month) 09 năm (year) 2025"
+    on_text = lines[on_ind]
+
+    # Extract
+    e_day = _RE_ISSUE_DAY[0].search(on_text) or _RE_ISSUE_DAY[1].search(on_text)
+    e_month = _RE_ISSUE_MONTH.search(on_text)
+    e_year = _RE_ISSUE_YEAR.search(on_text)
+    at_day = int(e_day.group(0)) if e_day is not None else None
+    at_month = int(e_month.group(0)) if e_month is not None else None
+    at_year = int(e_year.group(0)) if e_year is not None else None
+
+    # Note: The value of (year) can be broken into of flow steps.
+    # So if e_day, e_month is not None but e_year is None, required search for next '2xxx' in the next lines
+    if all([e_day is not None, e_month is not None, e_year is None]):
+        for n_ind in range(on_ind + 1, len(lines)):
+            search_result_on_year = _RE_ISSUE_YEAR_ON_LINE.search(lines[n_ind])
+            if search_result_on_year is not None:
+                at_year = int(search_result_on_year.group(0))
+                break
+
+    if all([at_day is not None, at_month is not None, at_year is not None]):
+        return date(year=at_year, month=at_month, day=at_day)
+    return None
+
+
+def _extract_invoice_partner(search_invoice_partner_block: str, invoice_partner: dict[str, Any]) -> None:
+    "Search on the line of 'Tra cứu hóa đơn' and the next line"
+
+    # Then chain by vietnamese before go to search zone
+    search_invoice_partner_block = (
+        search_invoice_partner_block.lower()
+        .replace("mã tra cứu", "search_keyword_id")
+        .replace("mã số thuế", "tax_code")
+        .replace("mst", "tax_code")
+    )
+
+    # Find
+    search_keyword_id_result = _RE_PARTNER_SEARCH_KEYWORD_ID.search(search_invoice_partner_block)
+    if search_keyword_id_result is not None:
+        invoice_partner["search_keyword_id"] = search_keyword_id_result.group("keyword_id").upper()
+
+    # Find
+    endpoint_result = _RE_PARTNER_ENDPOINT.search(search_invoice_partner_block)
+    if endpoint_result is not None:
+        invoice_partner["endpoint_search_invoice"] = endpoint_result.group().strip()
+
+    # Find
+    tax_code_result = _RE_PARTNER_TAX_CODE.search(search_invoice_partner_block)
+    if tax_code_result is not None:
+        invoice_partner["tax_code"] = tax_code_result.group("tax_code").strip()
+
+
+# Default
+# Compiled once at import, shared by every document of the process
+DEFAULT_RULE_SET = RuleSet(DEFAULT_FIELD_RULES)
+
+
+def register_field_rule(rule: FieldRule) -> None:
+    """Register an extra field rule on the default rule set
+
+    Usage
+    -----
+    >>> from einvoice_lens.rules import FieldRule, register_field_rule
+    >>> register_field_rule(FieldRule("invoice_partner", "contact", ("hotline",)))
+    """
+    DEFAULT_RULE_SET.register(rule)
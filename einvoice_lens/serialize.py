@@ -0,0 +1,59 @@
+#!/bin/python3
+
+# Global
+import json
+import dataclasses
+from datetime import date, datetime
+from typing import Any
+
+# External
+# Note: The C encoder is optional, the output is the same with the standard library
+try:
+    import orjson
+except ModuleNotFoundError:
+    orjson = None
+
+
+def json_default(value: Any) -> Any:
+    "Fallback of `json.dumps` for the values out of JSON types in the result (date, datetime, compact records)"
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if dataclasses.is_dataclass(value) and hasattr(value, "to_dict"):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _msgpack_default(value: Any) -> Any:
+    "Fallback of `msgpack.packb` for the date and the compact records, the datetime is a native Timestamp"
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return value.isoformat()
+    if dataclasses.is_dataclass(value) and hasattr(value, "to_dict"):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not msgpack serializable")
+
+
+def dumps_json(value: Any) -> str:
+    """Serialize the result into one line of JSON, keep the unicode as it is. Encoded by `orjson` when installed
+
+    `orjson` writes the date, the datetime (ISO format, as `isoformat()`) and the slotted records natively,
+    without calling back into Python
+    """
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(value, default=json_default, ensure_ascii=False, separators=(",", ":"))
+
+
+def dumps_msgpack(value: Any) -> bytes:
+    """Serialize the result into msgpack, the datetime is the msgpack Timestamp and the date is on ISO format
+
+    Usage
+    -----
+    >>> import msgpack
+    >>> payload = dumps_msgpack(parse_commerical_invoice("path/to/input.pdf"))
+    >>> result = msgpack.unpackb(payload, timestamp=3)  # The Timestamp back into the datetime (UTC)
+    """
+    try:
+        import msgpack
+    except ModuleNotFoundError:
+        raise ModuleNotFoundError("Required `msgpack` for dumps_msgpack. Install by: pip install einvoice-lens[serialize]")
+    return msgpack.packb(value, default=_msgpack_default, use_bin_type=True, datetime=True)
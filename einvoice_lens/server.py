@@ -0,0 +1,263 @@
+#!/bin/python3
+
+# Global
+import os
+import sys
+import json
+import asyncio
+import argparse
+import textwrap
+import threading
+from typing import Any, Awaitable, Callable
+
+# Internal
+from einvoice_lens import __version__
+from einvoice_lens.aio import AsyncInvoiceParser, ParserOverloadedError
+from einvoice_lens.backends import BACKENDS
+from einvoice_lens.serialize import dumps_json
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR: int = -32700
+INVALID_REQUEST: int = -32600
+METHOD_NOT_FOUND: int = -32601
+INVALID_PARAMS: int = -32602
+DOCUMENT_ERROR: int = -32000
+OVERLOADED_ERROR: int = -32001
+TIMEOUT_ERROR: int = -32002
+
+# The per-request options of the `parse` method
+PARSE_OPTIONS: tuple[str, ...] = ("stop_at_total_amount", "cache_refresh")
+
+
+class InvoiceServer:
+    """Long-running worker answering JSON-RPC 2.0 requests, one JSON object per line
+
+    The modules and compiled rules are loaded once in the warm workers, the requests are handled concurrently
+    and each response is written as soon as it's finished (match them by `id`).
+
+    Methods
+    -------
+    - `parse` {"path": str, "timeout": float?, "stop_at_total_amount": bool?, "cache_refresh": bool?}: The result of parsing
+    - `ping`: {"version": str}
+    - `shutdown`: Stop accepting requests, finish the running ones then exit
+
+    Args
+    ----
+    parser (AsyncInvoiceParser): The parser owning the workers
+
+    Usage
+    -----
+    >>> echo '{"jsonrpc": "2.0", "id": 1, "method": "parse", "params": {"path": "input.pdf"}}' | einvoice-lens serve
+    """
+
+    def __init__(self, parser: AsyncInvoiceParser):
+        self.parser = parser
+        self.stopped = asyncio.Event()
+        self._tasks: set[asyncio.Task] = set()
+        self._methods: dict[str, Callable[[dict[str, Any]], Awaitable[Any]]] = {
+            "parse": self._parse,
+            "ping": self._ping,
+            "shutdown": self._shutdown,
+        }
+
+    async def _parse(self, params: dict[str, Any]) -> Any:
+        path = params.get("path")
+        if not isinstance(path, str):
+            raise _RequestError(INVALID_PARAMS, f"Required params.path as string. Got {path!r}")
+        options = {key: bool(params[key]) for key in PARSE_OPTIONS if key in params}
+        return await self.parser.parse(path, timeout=params.get("timeout"), **options)
+
+    async def _ping(self, params: dict[str, Any]) -> Any:
+        return {"version": __version__}
+
+    async def _shutdown(self, params: dict[str, Any]) -> Any:
+        self.stopped.set()
+        return None
+
+    async def handle(self, line: str | bytes) -> str | None:
+        "Answer one request line. Return the response line, or None for a notification (no `id`)"
+        try:
+            request = json.loads(line)
+        except ValueError as exc:
+            return _response_error(None, PARSE_ERROR, f"Invalid JSON: {exc}")
+
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            return _response_error(None, INVALID_REQUEST, "Required a JSON object with string method")
+
+        identifier = request.get("id")
+        method = self._methods.get(request["method"])
+        params = request.get("params") or {}
+
+        try:
+            if method is None:
+                raise _RequestError(METHOD_NOT_FOUND, f"Method not found: {request['method']}")
+            if not isinstance(params, dict):
+                raise _RequestError(INVALID_PARAMS, "Required params as JSON object")
+            result = await method(params)
+        except _RequestError as exc:
+            response = _response_error(identifier, exc.code, exc.message)
+        except ParserOverloadedError as exc:
+            response = _response_error(identifier, OVERLOADED_ERROR, str(exc))
+        except asyncio.TimeoutError:
+            response = _response_error(identifier, TIMEOUT_ERROR, f"Timeout after {params.get('timeout')} seconds")
+        except Exception as exc:
+            response = _response_error(identifier, DOCUMENT_ERROR, str(exc), data={"type": type(exc).__name__})
+        else:
+            response = dumps_json({"jsonrpc": "2.0", "id": identifier, "result": result})
+
+        return response if "id" in request else None
+
+    def _dispatch(self, line: bytes, write: Callable[[str], None]) -> None:
+        "Handle the request on background, the next request is read without waiting"
+
+        async def _run() -> None:
+            response = await self.handle(line)
+            if response is not None:
+                write(response + "\n")
+
+        task = asyncio.ensure_future(_run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _drain(self) -> None:
+        if len(self._tasks) > 0:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def serve_stdio(self) -> None:
+        "Serve on stdin/stdout until EOF or `shutdown`"
+        loop = asyncio.get_running_loop()
+
+        def _write(response: str) -> None:
+            sys.stdout.write(response)
+            sys.stdout.flush()
+
+        # Note: Read on a daemon thread, asyncio pipes don't support the regular files redirected into stdin.
+        # The read is raced against `shutdown`, the blocked thread doesn't hold the exit while stdin stays open.
+        # The raw descriptor is read, the lock of the buffered `sys.stdin` would abort the interpreter shutdown
+        lines: asyncio.Queue[bytes] = asyncio.Queue()
+        descriptor = sys.stdin.fileno()
+
+        def _read() -> None:
+            pending = b""
+            try:
+                while True:
+                    chunk = os.read(descriptor, 2**16)
+                    if chunk == b"":
+                        break
+                    *complete, pending = (pending + chunk).split(b"\n")
+                    for line in complete:
+                        loop.call_soon_threadsafe(lines.put_nowait, line + b"\n")
+                loop.call_soon_threadsafe(lines.put_nowait, pending)
+                if pending != b"":
+                    loop.call_soon_threadsafe(lines.put_nowait, b"")
+            except RuntimeError:  # The loop is closed after shutdown
+                pass
+
+        threading.Thread(target=_read, name="einvoice-lens-stdin", daemon=True).start()
+        stopped = asyncio.ensure_future(self.stopped.wait())
+        try:
+            while not self.stopped.is_set():
+                next_line = asyncio.ensure_future(lines.get())
+                await asyncio.wait({next_line, stopped}, return_when=asyncio.FIRST_COMPLETED)
+                if not next_line.done():
+                    next_line.cancel()
+                    break
+                line = next_line.result()
+                if line == b"":
+                    break
+                if line.strip() != b"":
+                    self._dispatch(line, _write)
+        finally:
+            stopped.cancel()
+
+        await self._drain()
+
+    async def serve_unix(self, path: str) -> None:
+        "Serve on the Unix socket until `shutdown`. Each connection sends any number of request lines"
+
+        async def _on_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            while not self.stopped.is_set():
+                line = await reader.readline()
+                if line == b"":
+                    break
+                if line.strip() != b"":
+                    self._dispatch(line, lambda response: writer.write(response.encode("utf-8")))
+            await self._drain()
+            writer.close()
+
+        server = await asyncio.start_unix_server(_on_connection, path=path, limit=2**20)
+        try:
+            async with server:
+                await self.stopped.wait()
+        finally:
+            await self._drain()
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+class _RequestError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _response_error(identifier: Any, code: int, message: str, data: dict[str, Any] | None = None) -> str:
+    error: dict[str, Any] = {"code": code, "message": message}
+    if data is not None:
+        error["data"] = data
+    return dumps_json({"jsonrpc": "2.0", "id": identifier, "error": error})
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="einvoice-lens serve",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description=textwrap.dedent("""
+        [Einvoice Lens] Persistent worker answering JSON-RPC 2.0 requests, one JSON object per line
+
+        Usage
+        -----
+
+        On stdin/stdout
+        >>> echo '{"jsonrpc": "2.0", "id": 1, "method": "parse", "params": {"path": "input.pdf"}}' | einvoice-lens serve
+
+        On Unix socket
+        >>> einvoice-lens serve --socket /tmp/einvoice-lens.sock --workers 4
+        """),
+    )
+    parser.add_argument("--socket", help="Path to the Unix socket. Default to stdin/stdout", type=str, default=None)
+    parser.add_argument("--workers", help="Number of documents parsed concurrently. Default to the number of CPUs", type=int, default=None)
+    parser.add_argument("--executor", help="Kind of workers. Default to process", choices=["process", "thread"], default="process")
+    parser.add_argument("--max-pending", help="Reject the requests once this number of documents are waiting", type=int, default=None)
+    parser.add_argument("--cache", help="Path to the SQLite result cache. Default to no cache", type=str, default=None)
+    parser.add_argument("--backend", help="PDF library reading the page objects. Default to pdfplumber", choices=list(BACKENDS), default=None)
+    return parser
+
+
+async def serve(parameters: argparse.Namespace) -> None:
+
+    # Options
+    options = {"backend": parameters.backend}
+    if parameters.cache is not None:
+        from einvoice_lens.cache import ResultCache
+        cache = ResultCache(parameters.cache)
+        cache.close()
+        options.update(cache=cache)
+
+    async with AsyncInvoiceParser(max_concurrency=parameters.workers, executor=parameters.executor, max_pending=parameters.max_pending, **options) as parser:
+        await parser.warm_up()
+        server = InvoiceServer(parser)
+        if parameters.socket is not None:
+            await server.serve_unix(parameters.socket)
+        else:
+            await server.serve_stdio()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parameters = build_parser().parse_args(argv)
+    try:
+        asyncio.run(serve(parameters))
+    except KeyboardInterrupt:
+        pass
+    return 0
@@ -0,0 +1,192 @@
+#!/bin/python3
+
+# Global
+import re
+import base64
+import hashlib
+import mmap
+from datetime import datetime, timedelta, timezone
+from typing import TypedDict
+
+# External
+import google_crc32c
+
+
+class SignatureVerification(TypedDict):
+    # The byte range starts at 0, skips exactly the signature value and ends at the end of the document.
+    # False when the document was updated after signing (e.g. appended pages or annotations)
+    covers_whole_document: bool
+    # The CRC32C of the signed bytes
+    signed_checksum_crc32c: str
+    # The digest of the signed bytes is found in the signature (messageDigest), None when the signature can't be read
+    digest_matched: bool | None
+
+
+class DigitalSignature(TypedDict):
+    # "digital_signature": {
+    #   "certificate_serial": "1234567890ABCDEF",
+    #   "issuer": "VNPT-CA",
+    #   "signed_at": "2025-09-28T14:32:00+07:00",
+    #   "signature_value": "MIIBIjANBgkqhkiG9w0BAQEFAAOCAQ8A..."
+    # }
+    certificate_serial: str | None
+    issuer: str | None
+    signed_at: str | None
+    # The PKCS#7 signature in base64
+    signature_value: str
+    # [offset, length, offset, length] of the signed bytes
+    byte_range: list[int]
+    # None when the verification isn't requested
+    verification: SignatureVerification | None
+
+
+# The signature dictionary can't be compressed in an object stream as `/ByteRange` holds the offsets in the file,
+# so that it's found on the raw bytes without parsing the document
+_BYTE_RANGE_PATTERN = re.compile(rb"/ByteRange\s*\[\s*(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s*\]")
+_OBJECT_PATTERN = re.compile(rb"\d+\s+\d+\s+obj\b")
+_END_OBJECT_PATTERN = re.compile(rb"\bendobj\b")
+_SIGNING_TIME_PATTERN = re.compile(rb"/M\s*\(D:(\d{4})(\d{2})?(\d{2})?(\d{2})?(\d{2})?(\d{2})?([Z+\-])?(\d{2})?'?(\d{2})?'?\)")
+
+# The bytes searched before the signature dictionary for its object header
+_OBJECT_WINDOW: int = 4096
+
+# The digests of the signed attributes, the algorithm is not read from the signature
+_DIGEST_ALGORITHMS: tuple[str, ...] = ("sha256", "sha1", "sha384", "sha512")
+
+
+def _parse_signing_time(match: re.Match) -> str:
+    "The PDF date into ISO format. E.g. D:20250928143200+07'00' -> 2025-09-28T14:32:00+07:00"
+    year, month, day, hour, minute, second, sign, tz_hour, tz_minute = [
+        value.decode("ascii") if value is not None else None for value in match.groups()
+    ]
+    tzinfo = None
+    if sign == "Z":
+        tzinfo = timezone.utc
+    elif sign is not None:
+        offset = timedelta(hours=int(tz_hour or 0), minutes=int(tz_minute or 0))
+        tzinfo = timezone(offset if sign == "+" else -offset)
+    return datetime(
+        int(year), int(month or 1), int(day or 1), int(hour or 0), int(minute or 0), int(second or 0), tzinfo=tzinfo
+    ).isoformat()
+
+
+def _trim_padding(contents: bytes) -> bytes:
+    "The signature value is padded with zeros up to the reserved size, cut on the length of the DER sequence"
+    if len(contents) < 2 or contents[0] != 0x30 or contents[1] == 0x80:
+        return contents.rstrip(b"\x00")
+    if contents[1] < 0x80:
+        return contents[:2 + contents[1]]
+    size = contents[1] & 0x7F
+    return contents[:2 + size + int.from_bytes(contents[2:2 + size], "big")]
+
+
+def _read_certificate(contents: bytes) -> tuple[str | None, str | None]:
+    "Return (serial, issuer) of the signer certificate, the one not issuing any other of the chain"
+    from cryptography.hazmat.primitives.serialization import pkcs7
+    from cryptography.x509.oid import NameOID
+
+    try:
+        certificates = pkcs7.load_der_pkcs7_certificates(contents)
+    except ValueError:
+        return None, None
+    if len(certificates) == 0:
+        return None, None
+
+    issuers = {certificate.issuer for certificate in certificates}
+    signer = next((certificate for certificate in certificates if certificate.subject not in issuers), certificates[0])
+    common_names = signer.issuer.get_attributes_for_oid(NameOID.COMMON_NAME)
+    issuer = common_names[0].value if len(common_names) > 0 else signer.issuer.rfc4514_string()
+    return format(signer.serial_number, "X"), issuer
+
+
+def _verify(buffer: bytes | memoryview | mmap.mmap, byte_range: list[int], contents: bytes | None) -> SignatureVerification:
+    "Check the signed bytes on the buffer of the document, nothing is read again from the disk"
+    first_offset, first_length, second_offset, second_length = byte_range
+    view = memoryview(buffer)
+    try:
+        signed = (view[first_offset:first_offset + first_length], view[second_offset:second_offset + second_length])
+
+        crc = google_crc32c.Checksum()
+        for part in signed:
+            crc.update(bytes(part))
+
+        digest_matched = None
+        if contents is not None:
+            digest_matched = False
+            for algorithm in _DIGEST_ALGORITHMS:
+                digest = hashlib.new(algorithm)
+                for part in signed:
+                    digest.update(part)
+                if digest.digest() in contents:
+                    digest_matched = True
+                    break
+
+        gap = bytes(view[first_offset + first_length:second_offset])
+    finally:
+        view.release()
+
+    return SignatureVerification(
+        covers_whole_document=all([
+            first_offset == 0,
+            gap.startswith(b"<") and gap.endswith(b">"),
+            second_offset + second_length == len(buffer),
+        ]),
+        signed_checksum_crc32c=crc.digest().hex(),
+        digest_matched=digest_matched,
+    )
+
+
+def extract_digital_signature(buffer: bytes | memoryview | mmap.mmap, verify: bool = False) -> DigitalSignature | None:
+    """Read the first signature of the document from its `/ByteRange` and `/Contents`
+
+    Args
+    ----
+    buffer (bytes | memoryview | mmap.mmap): The bytes of the PDF document
+    verify (bool): Check that the byte range covers the whole document and the digest of the signed bytes.
+        The certificate chain is not validated
+
+    Return
+    ------
+    DigitalSignature | None: The signature, None when the document isn't signed
+
+    Usage
+    -----
+    >>> with open("path/to/input.pdf", "rb") as f:
+    ...     signature = extract_digital_signature(f.read())
+    >>> signature["certificate_serial"], signature["issuer"], signature["signed_at"]
+    """
+    match = _BYTE_RANGE_PATTERN.search(buffer)
+    if match is None:
+        return None
+    byte_range = [int(value) for value in match.groups()]
+    first_offset, first_length, second_offset, _ = byte_range
+
+    # The signature value is the hex string between both ranges, padded with zeros
+    contents: bytes | None = None
+    gap = bytes(buffer[first_offset + first_length:second_offset]).strip()
+    if gap.startswith(b"<") and gap.endswith(b">"):
+        try:
+            contents = _trim_padding(bytes.fromhex(gap[1:-1].decode("ascii")))
+        except ValueError:
+            contents = None
+
+    # The other keys of the signature dictionary, searched within its object. The signature value may be
+    # written before `/ByteRange`, so that the object header is searched before both
+    header = min(match.start(), first_offset + first_length)
+    objects = list(_OBJECT_PATTERN.finditer(buffer, max(0, header - _OBJECT_WINDOW), header))
+    end = _END_OBJECT_PATTERN.search(buffer, match.end())
+    signing_time = _SIGNING_TIME_PATTERN.search(
+        buffer,
+        objects[-1].end() if len(objects) > 0 else max(0, header - _OBJECT_WINDOW),
+        end.start() if end is not None else len(buffer),
+    )
+
+    certificate_serial, issuer = _read_certificate(contents) if contents is not None else (None, None)
+    return DigitalSignature(
+        certificate_serial=certificate_serial,
+        issuer=issuer,
+        signed_at=_parse_signing_time(signing_time) if signing_time is not None else None,
+        signature_value=base64.b64encode(contents).decode("ascii") if contents is not None else "",
+        byte_range=byte_range,
+        verification=_verify(buffer, byte_range, contents) if verify else None,
+    )
@@ -0,0 +1,253 @@
+#!/bin/python3
+
+# Global
+import os
+import uuid
+import pathlib
+import urllib.parse
+from datetime import date
+from typing import Literal
+from typing import TYPE_CHECKING, Any
+
+# Internal
+from einvoice_lens.batch import BatchRecord, _line_items_frame
+from einvoice_lens.compact import CompactInvoiceResult
+from einvoice_lens.engine import (
+    BuyerInformation,
+    CommericalInvoiceResult,
+    DocumentAttribute,
+    InvoicePartnerInformation,
+    SellerInformation,
+)
+from einvoice_lens.serialize import dumps_json
+
+if TYPE_CHECKING:
+    import polars as pl
+
+
+SinkDataset = Literal["profiles", "line_items"]
+
+# The partition of the missing value (e.g. the issue date not found), read back as null
+_HIVE_NULL: str = "__HIVE_DEFAULT_PARTITION__"
+
+_PROFILE_GROUPS: dict[str, type] = {
+    "attribute": DocumentAttribute,
+    "seller": SellerInformation,
+    "buyer": BuyerInformation,
+    "invoice_partner": InvoicePartnerInformation,
+}
+
+
+def _hive_schema() -> "dict[str, pl.DataType]":
+    "The partition columns are strings, the tax code keeps its leading zeros"
+    import polars as pl
+    return {"issue_month": pl.String, "seller_tax_code": pl.String}
+
+
+def _profile_dtypes() -> "dict[str, pl.DataType]":
+    "The columns of the profiles dataset, the seller tax code is the partition column"
+    import polars as pl
+
+    dtypes: dict[str, pl.DataType] = {"checksum_crc32c": pl.String, "status": pl.String}
+    for group, fields in _PROFILE_GROUPS.items():
+        for key in fields.__annotations__:
+            if (group, key) != ("seller", "tax_code"):
+                dtypes[f"{group}_{key}"] = pl.Date if key == "issue_date" else pl.String
+    dtypes.update({
+        "source_path": pl.String,
+        "total_pages": pl.Int64,
+        "file_size_mb": pl.Float64,
+        "backend": pl.String,
+        "processing_in_seconds": pl.Float64,
+        "line_items": pl.Int64,
+        "confidence": pl.String,
+        "limit_exceeded_reason": pl.String,
+        # The whole runtime metadata in JSON (pipeline timings, validation, ...)
+        "runtime_metadata": pl.String,
+    })
+    return dtypes
+
+
+def _partition(result: CommericalInvoiceResult) -> tuple[str, str]:
+    "The (issue_month, seller_tax_code) directory names, escaped as the hive partitions"
+    issue_date = result["profile"]["attribute"].get("issue_date")
+    if isinstance(issue_date, date):
+        issue_month = issue_date.strftime("%Y-%m")
+    elif isinstance(issue_date, str) and len(issue_date) >= 7:
+        issue_month = issue_date[:7]
+    else:
+        issue_month = _HIVE_NULL
+
+    tax_code = result["profile"]["seller"].get("tax_code")
+    return issue_month, urllib.parse.quote(tax_code, safe="") if tax_code else _HIVE_NULL
+
+
+def _profile_row(result: CommericalInvoiceResult, status: str) -> dict[str, Any]:
+    "Flatten the profile groups on the `<group>_<field>` columns, the nested values are JSON"
+    runtime_metadata = result["runtime_metadata"]
+    row: dict[str, Any] = {"checksum_crc32c": runtime_metadata["checksum_crc32c"], "status": status}
+    for group, fields in _PROFILE_GROUPS.items():
+        for key in fields.__annotations__:
+            if (group, key) == ("seller", "tax_code"):
+                continue
+            value = result["profile"][group].get(key)
+            if isinstance(value, dict):
+                value = dumps_json(value)
+            elif key == "issue_date" and isinstance(value, str):
+                value = date.fromisoformat(value)
+            row[f"{group}_{key}"] = value
+
+    validation = runtime_metadata.get("validation")
+    limit_exceeded = runtime_metadata.get("limit_exceeded")
+    row.update({
+        "source_path": runtime_metadata["source_path"],
+        "total_pages": runtime_metadata["total_pages"],
+        "file_size_mb": runtime_metadata["file_size_mb"],
+        "backend": runtime_metadata.get("backend"),
+        "processing_in_seconds": runtime_metadata["pipeline"]["processing_in_seconds"],
+        "line_items": len(result["dataset"]),
+        "confidence": validation["confidence"] if validation is not None else None,
+        "limit_exceeded_reason": limit_exceeded["reason"] if limit_exceeded is not None else None,
+        "runtime_metadata": dumps_json(runtime_metadata),
+    })
+    return row
+
+
+class ParquetDatasetSink:
+    """Append the results into two Parquet datasets linked by `checksum_crc32c`: profiles and line items
+
+    The rows are buffered per partition (`issue_month=YYYY-MM/seller_tax_code=...`, hive layout) then flushed
+    into a new file once the partition holds `row_group_size` rows, or every partition once the sink holds
+    `max_buffered_rows`, so that the memory stays constant whatever the number of invoices.
+    The files are never rewritten: each flush adds a file named on the run and its sequence, renamed into place
+    once complete, so that the datasets are read by `scan_invoice_dataset` (`pl.scan_parquet`) while writing.
+
+    The profiles hold the fields of attribute, seller, buyer and invoice_partner on `<group>_<field>` columns,
+    the main runtime metadata (status, pages, confidence, ...) and the whole runtime metadata in JSON.
+    The failed records are skipped, the partial ones are written with status="PARTIAL".
+
+    Args
+    ----
+    directory (str): The root of the datasets, `profiles/` and `line_items/` are created under it
+    row_group_size (int): The rows of one partition written together, one row group per file
+    max_buffered_rows (int): The rows held by the sink over every partition before flushing all
+    compression (str): The Parquet compression, as `pl.DataFrame.write_parquet`
+
+    Usage
+    -----
+    >>> from einvoice_lens import parse_commerical_invoices, ParquetDatasetSink, scan_invoice_dataset
+    >>> with ParquetDatasetSink("warehouse/invoices") as sink:
+    ...     for record in parse_commerical_invoices(paths, workers=4, sink=sink):
+    ...         pass
+    >>> scan_invoice_dataset("warehouse/invoices", "line_items").filter(pl.col("issue_month") == "2025-09").collect()
+    """
+
+    def __init__(self, directory: str, row_group_size: int = 100_000, max_buffered_rows: int = 500_000, compression: str = "zstd"):
+        if row_group_size < 1 or max_buffered_rows < 1:
+            raise ValueError(f"Required row_group_size >= 1 and max_buffered_rows >= 1. Got row_group_size={row_group_size!r}, max_buffered_rows={max_buffered_rows!r}")
+        self.directory = pathlib.Path(directory)
+        self.row_group_size = row_group_size
+        self.max_buffered_rows = max_buffered_rows
+        self.compression = compression
+        self.invoices: int = 0
+        self.line_items: int = 0
+        self.files: int = 0
+
+        # The run is part of the file names, the sinks appending into the same directory never collide
+        self._run_id = uuid.uuid4().hex[:12]
+        self._sequence: int = 0
+        self._profiles: dict[tuple[str, str], list[dict[str, Any]]] = {}
+        self._line_items: dict[tuple[str, str], list["pl.DataFrame"]] = {}
+        self._buffered: dict[tuple[SinkDataset, str, str], int] = {}
+        self.buffered_rows: int = 0
+
+    def write(self, record: BatchRecord | CommericalInvoiceResult | CompactInvoiceResult) -> bool:
+        "Buffer the profile and the line items of the record. Return False when skipped (failed record)"
+        status = "SUCCESS"
+        result = record
+        if isinstance(record, dict) and "status" in record:
+            if record["status"] == "FAILED":
+                return False
+            status, result = record["status"], record["result"]
+        if isinstance(result, CompactInvoiceResult):
+            result = result.to_dict()
+        if result["runtime_metadata"].get("limit_exceeded") is not None:
+            status = "PARTIAL"
+
+        partition = _partition(result)
+        line_items = _line_items_frame(result)
+        self._profiles.setdefault(partition, []).append(_profile_row(result, status))
+        self._line_items.setdefault(partition, []).append(line_items)
+        self._buffered[("profiles", *partition)] = self._buffered.get(("profiles", *partition), 0) + 1
+        self._buffered[("line_items", *partition)] = self._buffered.get(("line_items", *partition), 0) + line_items.height
+        self.buffered_rows += 1 + line_items.height
+        self.invoices += 1
+        self.line_items += line_items.height
+
+        # Flush
+        if self.buffered_rows >= self.max_buffered_rows:
+            self.flush()
+        else:
+            for dataset in ("profiles", "line_items"):
+                if self._buffered[(dataset, *partition)] >= self.row_group_size:
+                    self._flush_partition(dataset, partition)
+        return True
+
+    def _flush_partition(self, dataset: SinkDataset, partition: tuple[str, str]) -> None:
+        import polars as pl
+
+        if dataset == "profiles":
+            rows = self._profiles.pop(partition, [])
+            frame = pl.DataFrame(rows, schema=_profile_dtypes(), orient="row") if len(rows) > 0 else None
+        else:
+            frames = self._line_items.pop(partition, [])
+            frame = pl.concat(frames, how="vertical", rechunk=True) if len(frames) > 0 else None
+        self.buffered_rows -= self._buffered.pop((dataset, *partition), 0)
+        if frame is None or frame.height == 0:
+            return
+
+        issue_month, seller_tax_code = partition
+        directory = self.directory / dataset / f"issue_month={issue_month}" / f"seller_tax_code={seller_tax_code}"
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"part-{self._run_id}-{self._sequence:06d}.parquet"
+        self._sequence += 1
+
+        # The reader never sees the incomplete file, the hidden name doesn't match the glob of the dataset
+        temporary = directory / f".{path.name}.tmp"
+        frame.write_parquet(temporary, compression=self.compression, row_group_size=self.row_group_size)
+        os.replace(temporary, path)
+        self.files += 1
+
+    def flush(self) -> None:
+        "Write every buffered row, the datasets are complete up to the written records"
+        for dataset, *partition in list(self._buffered):
+            self._flush_partition(dataset, tuple(partition))
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> "ParquetDatasetSink":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def scan_invoice_dataset(directory: str, dataset: SinkDataset = "line_items") -> "pl.LazyFrame":
+    """Scan the dataset written by `ParquetDatasetSink`, with the partition columns `issue_month` and `seller_tax_code`
+
+    Usage
+    -----
+    >>> profiles = scan_invoice_dataset("warehouse/invoices", "profiles")
+    >>> line_items = scan_invoice_dataset("warehouse/invoices", "line_items")
+    >>> line_items.join(profiles.select("checksum_crc32c", "seller_name"), on="checksum_crc32c").collect()
+    """
+    import polars as pl
+
+    if dataset not in ("profiles", "line_items"):
+        raise ValueError(f"Invalid dataset. Required one of profiles, line_items. Got {dataset!r}")
+    return pl.scan_parquet(
+        pathlib.Path(directory, dataset, "**", "*.parquet").as_posix(),
+        hive_partitioning=True,
+        hive_schema=_hive_schema(),
+    )
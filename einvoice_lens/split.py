@@ -0,0 +1,231 @@
+#!/bin/python3
+
+# Global
+import os
+import multiprocessing
+from datetime import datetime, UTC as timezoneUTC
+from typing import Any, Literal, TypedDict
+from concurrent.futures import ProcessPoolExecutor
+
+# Internal
+from einvoice_lens.backends import PDFBackend, get_backend
+from einvoice_lens.batch import BatchError
+from einvoice_lens.engine import (
+    CommericalInvoiceResult,
+    DocumentSource,
+    _SourceBuffer,
+    _format_dataset,
+    _new_profile,
+    _parse_commerical_invoice_on,
+    _pipeline_metadata,
+    _pipeline_text_transform,
+)
+from einvoice_lens.layout import DocumentLayout
+from einvoice_lens.rules import RuleSet, DEFAULT_RULE_SET
+from einvoice_lens.telemetry import StageRecorder
+
+
+class InvoiceSegment(TypedDict):
+    # The position of the invoice in the document
+    index: int
+    # The page indexes, the last one is included
+    first_page: int
+    last_page: int
+    serial_no: str | None
+    invoice_number: str | None
+
+
+class SegmentMetadata(InvoiceSegment):
+    # FAILED: the invoice failed to parse, its result is empty and the other invoices are kept
+    # PARTIAL: the invoice reached one of the `limits`
+    status: Literal["SUCCESS", "PARTIAL", "FAILED"]
+    error: BatchError | None
+
+
+# The title of the first page of an invoice, as the `document_type` rule
+_TITLE_KEYWORDS: tuple[str, ...] = ("hóa đơn bán hàng", "sales invoice")
+
+
+def _page_identity(lines: list[str], rule_set: RuleSet) -> tuple[str | None, str | None]:
+    "The (serial_no, invoice_number) of the page header, by the rules of the first page"
+    profile = _new_profile()
+    rule_set.extract(lines, profile=profile)
+    return profile["attribute"].get("serial_no"), profile["attribute"].get("invoice_number")
+
+
+def _detect_segments(layouts: DocumentLayout, rule_set: RuleSet) -> list[InvoiceSegment]:
+    """Split the pages on the first page of each invoice
+
+    The page opens a new invoice when it holds the title and the header changes: the serial or the number
+    differs from the invoice in progress, or without both, the line items table starts over (`STT (No.)` header).
+    The continuation pages repeating the whole header of the same invoice are kept in it.
+    """
+    segments: list[InvoiceSegment] = []
+    for index in range(len(layouts)):
+        content = _pipeline_text_transform(string=layouts.page(index).text())
+        lines = [line.strip() for line in content.split("\n")]
+        lowered = content.lower()
+        identity = _page_identity(lines, rule_set)
+        layouts.release(index)
+
+        if len(segments) > 0:
+            current = segments[-1]
+            is_title = any([keyword in lowered for keyword in _TITLE_KEYWORDS])
+            if identity != (None, None):
+                is_new = is_title and identity != (current["serial_no"], current["invoice_number"])
+            else:
+                is_new = is_title and any([line.lower().startswith("stt") for line in lines])
+            if not is_new:
+                current["last_page"] = index
+                continue
+
+        segments.append(InvoiceSegment(index=len(segments), first_page=index, last_page=index, serial_no=identity[0], invoice_number=identity[1]))
+
+    return segments
+
+
+def detect_invoice_segments(
+    path: DocumentSource,
+    backend: str | PDFBackend | None = None,
+    rule_set: RuleSet | None = None,
+) -> list[InvoiceSegment]:
+    """Detect the invoices concatenated in one document, on the text of each page
+
+    Args
+    ----
+    path (DocumentSource): The path into PDF file, or the in-memory document
+    backend (str | PDFBackend | None): The PDF library reading the pages. The text of every page is read,
+        the native libraries (pymupdf, pypdfium2) are several times faster. Default to pdfplumber
+    rule_set (RuleSet | None): The rules reading the serial and the number of the header
+
+    Return
+    ------
+    list[InvoiceSegment]: The pages of each invoice, in order. One segment for the document of one invoice
+    """
+    with _SourceBuffer(path) as source:
+        return _detect_segments_on(source, backend=backend, rule_set=rule_set)[0]
+
+
+def _detect_segments_on(source: _SourceBuffer, backend: str | PDFBackend | None, rule_set: RuleSet | None) -> tuple[list[InvoiceSegment], int]:
+    "The segments and the number of pages of the document"
+    document = get_backend(backend).open(source.stream())
+    try:
+        return _detect_segments(DocumentLayout(document), rule_set or DEFAULT_RULE_SET), len(document.pages)
+    finally:
+        document.close()
+
+
+def _failed_segment_result(segment: InvoiceSegment, exc: BaseException, document: dict[str, Any], dataset_format: str) -> CommericalInvoiceResult:
+    "The empty result of the invoice failed to parse, the error is reported in `runtime_metadata.segment`"
+    now = datetime.now(tz=timezoneUTC)
+    return CommericalInvoiceResult(
+        runtime_metadata={
+            **document,
+            "pipeline": _pipeline_metadata(StageRecorder(), start=now, end=now, line_items=0),
+            "cache_hit": False,
+            "layout_template": None,
+            "limit_exceeded": None,
+            "validation": None,
+            "segment": SegmentMetadata(**segment, status="FAILED", error={"type": type(exc).__name__, "message": str(exc)}),
+            "ocr": None,
+        },
+        profile=_new_profile(),
+        dataset=_format_dataset([], dataset_format),
+    )
+
+
+def _parse_segment(path: DocumentSource, segment: InvoiceSegment, options: dict, document: dict[str, Any]) -> CommericalInvoiceResult:
+    """Run inside the worker, the path is memory-mapped again so that the pages are read from the page cache
+
+    The checksum of the whole document is computed once by the parent, any failure of the invoice
+    is captured as its failed result
+    """
+    try:
+        with _SourceBuffer(path, checksum=document["checksum_crc32c"]) as source:
+            result = _parse_commerical_invoice_on(source, page_range=range(segment["first_page"], segment["last_page"] + 1), **options)
+    except Exception as exc:
+        return _failed_segment_result(segment, exc, document, options.get("dataset_format", "dicts"))
+
+    limit_exceeded = result["runtime_metadata"]["limit_exceeded"]
+    result["runtime_metadata"]["segment"] = SegmentMetadata(
+        **segment,
+        status="PARTIAL" if limit_exceeded is not None else "SUCCESS",
+        error={"type": "LimitExceededError", "message": limit_exceeded["message"]} if limit_exceeded is not None else None,
+    )
+    return result
+
+
+def parse_multi_commerical_invoice(
+    path: DocumentSource,
+    workers: int | None = None,
+    rule_set: RuleSet | None = None,
+    backend: str | PDFBackend | None = None,
+    **options,
+) -> list[CommericalInvoiceResult]:
+    """Parse the document of many concatenated invoices, one result per invoice
+
+    The invoices are detected by `detect_invoice_segments` then parsed independently: the profile is read on
+    the first page of each invoice and the line items are not merged between invoices.
+
+    Args
+    ----
+    path (DocumentSource): The path into PDF file, or the in-memory document
+    workers (int | None): The number of worker processes parsing the invoices. Default to `os.cpu_count()`.
+        With `workers=1` the invoices are parsed in the current process
+    rule_set (RuleSet | None): The compiled rules of the first page fields
+    backend (str | PDFBackend | None): The PDF library reading the page objects. Default to pdfplumber
+    **options: The keyword arguments forwarded into `parse_commerical_invoice` (e.g. `dataset_format`, `cache`)
+
+    Return
+    ------
+    list[CommericalInvoiceResult]: The results in the order of the document, the pages of the invoice
+        are reported in `runtime_metadata.segment`. The invoice failed to parse is returned as the empty result
+        with status="FAILED" and the error detail in `runtime_metadata.segment` instead of aborting the others
+
+    Usage
+    -----
+    >>> from einvoice_lens import parse_multi_commerical_invoice
+    >>> for result in parse_multi_commerical_invoice("path/to/concatenated.pdf", workers=4):
+    ...     print(result["profile"]["attribute"]["invoice_number"], len(result["dataset"]))
+    """
+
+    workers = workers or os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError(f"Required workers >= 1. Got workers={workers!r}")
+
+    dataset_format = options.get("dataset_format", "dicts")
+    if dataset_format not in ("dicts", "polars", "arrow"):
+        raise ValueError(f"Invalid dataset_format. Required one of dicts, polars, arrow. Got {dataset_format!r}")
+
+    # The stream is read once, the workers get the bytes
+    if not isinstance(path, (str, os.PathLike, bytes, bytearray, memoryview)):
+        path = path.read()
+    elif isinstance(path, (bytearray, memoryview)):
+        path = bytes(path)
+
+    # The document is hashed once, the workers get the checksum
+    with _SourceBuffer(path) as source:
+        segments, total_pages = _detect_segments_on(source, backend=backend, rule_set=rule_set)
+        document = {
+            "source_path": source.source_path,
+            "checksum_crc32c": source.checksum(),
+            "total_pages": total_pages,
+            "file_size_mb": round(source.size / 10**6, 2),
+            "backend": get_backend(backend).name,
+        }
+    options = {**options, "rule_set": rule_set, "backend": backend}
+
+    if workers == 1 or len(segments) == 1:
+        return [_parse_segment(path, segment, options, document) for segment in segments]
+
+    # Note: Use `spawn` as forking a process after polars initialized its thread pool can deadlock
+    with ProcessPoolExecutor(max_workers=min(workers, len(segments)), mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [executor.submit(_parse_segment, path, segment, options, document) for segment in segments]
+        results: list[CommericalInvoiceResult] = []
+        for segment, future in zip(segments, futures):
+            try:
+                results.append(future.result())
+            except Exception as exc:
+                # The worker died (`BrokenProcessPool`), the invoices parsed by the others are kept
+                results.append(_failed_segment_result(segment, exc, document, dataset_format))
+        return results
@@ -0,0 +1,145 @@
+#!/bin/python3
+
+# Global
+import os
+import sys
+import time
+import contextlib
+from typing import Any, Callable, ContextManager, Iterator, TypedDict
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class PageMetadata(TypedDict):
+    page: int
+    extract_tables_seconds: float
+    normalization_seconds: float
+    total_records: int
+    line_items: int
+
+
+class Instrumentation:
+    """The hook of the pipeline stages, no-op by default
+
+    Subclass to export the timings into the metrics stack:
+    - `span` wraps the stage, e.g. to open a tracing span
+    - `record` is called at the end of the stage with the elapsed seconds
+
+    The instance is forwarded into the pool workers on batch so that it's required to be picklable.
+    """
+
+    def span(self, name: str, attributes: dict[str, Any]) -> ContextManager:
+        return contextlib.nullcontext()
+
+    def record(self, name: str, seconds: float, attributes: dict[str, Any]) -> None:
+        pass
+
+
+class CallbackInstrumentation(Instrumentation):
+    """Call the function on the end of each stage
+
+    Usage
+    -----
+    >>> from einvoice_lens.telemetry import CallbackInstrumentation
+    >>> instrumentation = CallbackInstrumentation(lambda name, seconds, attributes: print(name, seconds))
+    """
+
+    def __init__(self, callback: Callable[[str, float, dict[str, Any]], None]):
+        self.callback = callback
+
+    def record(self, name: str, seconds: float, attributes: dict[str, Any]) -> None:
+        self.callback(name, seconds, attributes)
+
+
+class OpenTelemetryInstrumentation(Instrumentation):
+    """Open an OpenTelemetry span per stage. Required the `opentelemetry-api` package
+
+    Usage
+    -----
+    >>> from einvoice_lens.telemetry import OpenTelemetryInstrumentation
+    >>> result = parse_commerical_invoice(path, instrumentation=OpenTelemetryInstrumentation())
+    """
+
+    def __init__(self, tracer_name: str = "einvoice_lens"):
+        self.tracer_name = tracer_name
+
+    def span(self, name: str, attributes: dict[str, Any]) -> ContextManager:
+        from opentelemetry import trace
+        return trace.get_tracer(self.tracer_name).start_as_current_span(
+            f"einvoice_lens.{name}",
+            attributes={key: value for key, value in attributes.items() if isinstance(value, (str, bool, int, float))},
+        )
+
+
+def peak_memory_mb() -> float | None:
+    "The peak resident set size over the lifetime of the process. None when not supported by the platform"
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Note: The unit is bytes on macOS, kilobytes on Linux
+    return max_rss / 10**6 if sys.platform == "darwin" else max_rss * 1024 / 10**6
+
+
+def current_memory_mb() -> float | None:
+    "The current resident set size of the process. None when not supported by the platform (Linux only)"
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 10**6
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class StageRecorder:
+    """Measure the stages of the pipeline with the monotonic `time.perf_counter`"""
+
+    def __init__(self, instrumentation: Instrumentation | None = None):
+        self.instrumentation = instrumentation or Instrumentation()
+        self.stages: dict[str, float] = {}
+        self.pages: list[PageMetadata] = []
+        self._start = time.perf_counter()
+        self._start_memory_mb = current_memory_mb()
+        self._sampled_peak_memory_mb = self._start_memory_mb
+
+    @contextlib.contextmanager
+    def stage(self, name: str, **attributes) -> Iterator[None]:
+        "Time the stage, the same stage repeated (e.g. per page) is summed"
+        with self.instrumentation.span(name, attributes):
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                seconds = time.perf_counter() - start
+                self.stages[name] = self.stages.get(name, 0.0) + seconds
+                self._sample_memory()
+                self.instrumentation.record(name, seconds, attributes)
+
+    def _sample_memory(self) -> None:
+        memory_mb = current_memory_mb()
+        if memory_mb is not None and self._sampled_peak_memory_mb is not None:
+            self._sampled_peak_memory_mb = max(self._sampled_peak_memory_mb, memory_mb)
+
+    def add_page(self, page: PageMetadata) -> None:
+        self.pages.append(page)
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return time.perf_counter() - self._start
+
+    @property
+    def memory_growth_mb(self) -> float | None:
+        """The growth of the resident memory during the pipeline, sampled at the end of each stage
+
+        Measured on this document only, unlike the process peak which is reached once in a long-lived worker
+        """
+        if self._start_memory_mb is None or self._sampled_peak_memory_mb is None:
+            return None
+        return round(self._sampled_peak_memory_mb - self._start_memory_mb, 3)
+
+    @property
+    def process_peak_memory_mb(self) -> float | None:
+        "The peak resident memory over the lifetime of the process (every document parsed by the worker)"
+        memory_mb = peak_memory_mb()
+        return None if memory_mb is None else round(memory_mb, 3)
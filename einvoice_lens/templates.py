@@ -0,0 +1,315 @@
+#!/bin/python3
+
+# Global
+import json
+import sqlite3
+import itertools
+from bisect import bisect_left, bisect_right
+from datetime import datetime, UTC as timezoneUTC
+from typing import Any, Iterator, Literal, TypedDict
+
+# External
+import pdfplumber
+from pdfplumber import utils
+from pdfplumber.table import Table, TableFinder, TableSettings
+
+# Internal
+from einvoice_lens.cache import _SQLiteStore
+
+# The settings of table detection on the ruling lines
+TABLE_SETTINGS: dict[str, Any] = {
+    "vertical_strategy": "lines",
+    "horizontal_strategy": "lines",
+}
+
+# The distance (in points) to match the ruling edges on the template, same as the pdfplumber intersection tolerance
+TEMPLATE_TOLERANCE: float = 3.0
+
+
+class LayoutTemplate(TypedDict):
+    fingerprint: str
+    columns: list[float]
+    header_bbox: list[float]
+    page_width: float
+    page_height: float
+    created_at: str
+
+
+class LayoutTemplateMetadata(TypedDict):
+    fingerprint: str | None
+    # - applied: The template of the vendor is used on every page
+    # - learned: The template is recorded from this document
+    # - stale: The template stopped matching, it's replaced (or dropped) by the detection on this document
+    # - unknown: No fingerprint or no template can be learned
+    status: Literal["applied", "learned", "stale", "unknown"]
+    fallback_pages: int
+
+
+def layout_fingerprint(profile: dict[str, Any], page: pdfplumber.page.Page) -> str | None:
+    """The fingerprint of the vendor layout: the e-invoice provider (tax code and search endpoint) on the page size
+
+    The seller tax code is used when the provider block is not on the first page. None when both are missing.
+    """
+    partner = profile["invoice_partner"]
+    if partner.get("tax_code") or partner.get("endpoint_search_invoice"):
+        vendor = f"partner:{partner.get('tax_code') or ''}:{partner.get('endpoint_search_invoice') or ''}"
+    elif profile["seller"].get("tax_code"):
+        vendor = f"seller:{profile['seller']['tax_code']}"
+    else:
+        return None
+    return f"{vendor}:{round(float(page.width))}x{round(float(page.height))}"
+
+
+class TemplateRegistry(_SQLiteStore):
+    """The layout templates of the vendors, persisted into SQLite file
+
+    The column x-boundaries of the line items table are recorded on the first document of a vendor,
+    the next documents build the table cells from them instead of the full detection.
+    The template is dropped, then learned again, when it stops matching.
+
+    Each template is one row of a single SQLite file (as `ResultCache`), so that the batch workers learn
+    the templates of different vendors concurrently without losing any, and read the latest one on each lookup.
+
+    Args
+    ----
+    path (str | None): Path to the SQLite file. The parent directory is created if not exist. Default to in-memory
+
+    Usage
+    -----
+    >>> from einvoice_lens import parse_commerical_invoice, TemplateRegistry
+    >>> templates = TemplateRegistry("templates.sqlite")
+    >>> result = parse_commerical_invoice(path, templates=templates)
+    >>> result["runtime_metadata"]["layout_template"]["status"]
+    'applied'
+    """
+
+    def __init__(self, path: str | None = None):
+        super().__init__(path)
+        # The in-memory templates, when no path
+        self._templates: dict[str, LayoutTemplate] = {}
+
+    def _initialize(self, connection: sqlite3.Connection) -> None:
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS templates (
+                fingerprint TEXT PRIMARY KEY,
+                template TEXT NOT NULL
+            )
+        """)
+
+    def get(self, fingerprint: str) -> LayoutTemplate | None:
+        if self.path is None:
+            return self._templates.get(fingerprint)
+        row = self.connection.execute("SELECT template FROM templates WHERE fingerprint = ?", (fingerprint,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def set(self, template: LayoutTemplate) -> None:
+        if self.path is None:
+            self._templates[template["fingerprint"]] = template
+            return
+        self.connection.execute(
+            "INSERT OR REPLACE INTO templates (fingerprint, template) VALUES (?, ?)",
+            (template["fingerprint"], json.dumps(template, ensure_ascii=False)),
+        )
+
+    def invalidate(self, fingerprint: str | None = None) -> None:
+        "Drop the template of the fingerprint, or all of them"
+        if self.path is None:
+            if fingerprint is None:
+                self._templates.clear()
+            else:
+                self._templates.pop(fingerprint, None)
+            return
+        if fingerprint is None:
+            self.connection.execute("DELETE FROM templates")
+        else:
+            self.connection.execute("DELETE FROM templates WHERE fingerprint = ?", (fingerprint,))
+
+    def __iter__(self) -> Iterator[LayoutTemplate]:
+        if self.path is None:
+            return iter(list(self._templates.values()))
+        rows = self.connection.execute("SELECT template FROM templates ORDER BY fingerprint").fetchall()
+        return iter([json.loads(template) for template, in rows])
+
+    def __len__(self) -> int:
+        if self.path is None:
+            return len(self._templates)
+        return self.connection.execute("SELECT COUNT(*) FROM templates").fetchone()[0]
+
+    def __contains__(self, fingerprint: str) -> bool:
+        return self.get(fingerprint) is not None
+
+
+def learn_template(fingerprint: str, table: Table, header_bbox: tuple[float, float, float, float]) -> LayoutTemplate:
+    "Record the column x-boundaries of the detected line items table"
+    page = table.page
+    return LayoutTemplate(
+        fingerprint=fingerprint,
+        columns=sorted({float(x) for cell in table.cells for x in (cell[0], cell[2])}),
+        header_bbox=[float(x) for x in header_bbox],
+        page_width=float(page.width),
+        page_height=float(page.height),
+        created_at=datetime.now(tz=timezoneUTC).isoformat(timespec="seconds"),
+    )
+
+
+def extract_table_rows(table: Table) -> list[list[str | None]]:
+    """Same output as `Table.extract()`
+
+    The chars of the page are bucketed into the cells by bisection on the cell grid once,
+    instead of testing every char against every row then every cell.
+    """
+    xs = sorted({x for cell in table.cells for x in (cell[0], cell[2])})
+    ys = sorted({y for cell in table.cells for y in (cell[1], cell[3])})
+
+    # The cell covering each slot of the grid
+    slots: dict[tuple[int, int], tuple] = {}
+    for cell in table.cells:
+        for i in range(bisect_left(xs, cell[0]), bisect_left(xs, cell[2])):
+            for j in range(bisect_left(ys, cell[1]), bisect_left(ys, cell[3])):
+                slots[(i, j)] = cell
+
+    # Bucket, the order of the chars is kept
+    buckets: dict[tuple, list[dict[str, Any]]] = {}
+    x_min, x_max, y_min, y_max = xs[0], xs[-1], ys[0], ys[-1]
+    for char in table.page.chars:
+        h_mid = (char["x0"] + char["x1"]) / 2
+        v_mid = (char["top"] + char["bottom"]) / 2
+        if h_mid < x_min or h_mid >= x_max or v_mid < y_min or v_mid >= y_max:
+            continue
+        cell = slots.get((bisect_right(xs, h_mid) - 1, bisect_right(ys, v_mid) - 1))
+        if cell is not None:
+            buckets.setdefault(cell, []).append(char)
+
+    return [
+        [
+            None if cell is None else (utils.extract_text(buckets[cell]) if cell in buckets else "")
+            for cell in row.cells
+        ]
+        for row in table.rows
+    ]
+
+
+class _EdgeFinder(TableFinder):
+    "The merged ruling edges of the table finder only, the cells are built from the template"
+
+    def __init__(self, page: pdfplumber.page.Page, settings: dict[str, Any]):
+        self.page = page
+        self.settings = TableSettings.resolve(settings)
+        self.edges = self.get_edges()
+
+
+class _EdgeSpans:
+    "The spans (start, end) of the edges sorted on the start once, with the running max of the end, searched by bisection"
+
+    def __init__(self, spans: list[tuple[float, float]]):
+        spans = sorted(spans)
+        self.starts = [start for start, _ in spans]
+        self.reach = list(itertools.accumulate([end for _, end in spans], max))
+
+    def furthest(self, start: float, inclusive: bool = True) -> float | None:
+        "The furthest end of the spans starting before `start` (or at it when inclusive), None without any"
+        count = bisect_right(self.starts, start) if inclusive else bisect_left(self.starts, start)
+        return self.reach[count - 1] if count > 0 else None
+
+
+def find_tables_on_template(
+    page: pdfplumber.page.Page,
+    template: LayoutTemplate,
+    tolerance: float = TEMPLATE_TOLERANCE,
+    edges: list[dict[str, Any]] | None = None,
+) -> list[Table] | None:
+    """Build the tables of the page on the template columns, skip the intersection search of the detection
+
+    The rows are cut on the horizontal ruling edges, a column boundary is kept on the row when a vertical edge
+    crosses the row (the merged rows of the totals block have none).
+
+    Args
+    ----
+    edges (list[dict] | None): The merged ruling edges already derived on the page. Default to derive them
+
+    Return
+    ------
+    list[Table] | None: The tables on the template columns. None when the ruling of the page doesn't match
+        the template (a vertical edge out of the columns, a broken grid), so that the caller falls back on the detection
+    """
+    columns = template["columns"]
+    left, right = columns[0] - tolerance, columns[-1] + tolerance
+    edges = _EdgeFinder(page, TABLE_SETTINGS).edges if edges is None else edges
+
+    # Vertical: the edges on the columns, the others (e.g. the signature box) are only allowed out of the table rows
+    verticals: list[list[dict[str, Any]]] = [[] for _ in columns]
+    strays: list[dict[str, Any]] = []
+    for edge in edges:
+        if edge["orientation"] != "v" or edge["x0"] < left or edge["x0"] > right:
+            continue
+        index = min(range(len(columns)), key=lambda i: abs(columns[i] - edge["x0"]))
+        if abs(columns[index] - edge["x0"]) > tolerance:
+            strays.append(edge)
+            continue
+        verticals[index].append(edge)
+
+    # The edges are snapped, one column has one x on the page
+    xs: list[float | None] = []
+    for column_edges in verticals:
+        positions = {edge["x0"] for edge in column_edges}
+        if len(positions) > 1:
+            return None
+        xs.append(positions.pop() if len(positions) == 1 else None)
+
+    horizontals = [edge for edge in edges if edge["orientation"] == "h" and edge["x1"] >= left and edge["x0"] <= right]
+
+    # The edges are indexed once, each row looks up its boundaries instead of scanning every edge
+    vertical_spans = [_EdgeSpans([(edge["top"], edge["bottom"]) for edge in column_edges]) for column_edges in verticals]
+    stray_spans = _EdgeSpans([(edge["top"], edge["bottom"]) for edge in strays])
+    horizontals_on: dict[float, list[dict[str, Any]]] = {}
+    for edge in horizontals:
+        horizontals_on.setdefault(edge["top"], []).append(edge)
+
+    def _vertical_on(index: int, top: float, bottom: float) -> bool:
+        "An edge of the column starts above the top and ends below the bottom"
+        furthest = vertical_spans[index].furthest(top + tolerance)
+        return furthest is not None and furthest >= bottom - tolerance
+
+    def _horizontal_on(y: float, x0: float, x1: float) -> bool:
+        return any([edge["x0"] <= x0 + tolerance and edge["x1"] >= x1 - tolerance for edge in horizontals_on.get(y, [])])
+
+    def _stray_on(top: float, bottom: float) -> bool:
+        "A stray edge overlaps the row"
+        furthest = stray_spans.furthest(bottom - tolerance, inclusive=False)
+        return furthest is not None and furthest > top + tolerance
+
+    # The row boundaries: the horizontal edges crossing a column
+    ys = sorted({
+        edge["top"] for edge in horizontals
+        if any([_vertical_on(index, edge["top"], edge["top"]) and edge["x0"] - tolerance <= x <= edge["x1"] + tolerance for index, x in enumerate(xs) if x is not None])
+    })
+
+    tables: list[list[tuple[float, float, float, float]]] = []
+    current: list[tuple[float, float, float, float]] = []
+    for top, bottom in zip(ys, ys[1:]):
+        boundaries = [x for index, x in enumerate(xs) if x is not None and _vertical_on(index, top, bottom)]
+        is_left, is_right = xs[0] is not None and _vertical_on(0, top, bottom), xs[-1] is not None and _vertical_on(len(xs) - 1, top, bottom)
+
+        # Out of the table
+        if not is_left and not is_right:
+            if len(current) > 0:
+                tables.append(current)
+                current = []
+            continue
+
+        # The grid is broken: one border only, the row is not closed on the top/bottom, or a column out of the template
+        if not (is_left and is_right) or not _horizontal_on(top, boundaries[0], boundaries[-1]) or not _horizontal_on(bottom, boundaries[0], boundaries[-1]):
+            return None
+        if _stray_on(top, bottom):
+            return None
+
+        current.extend([(x0, top, x1, bottom) for x0, x1 in zip(boundaries, boundaries[1:])])
+
+    if len(current) > 0:
+        tables.append(current)
+
+    # Every column of the template is required on the table
+    if len(tables) > 0 and any([x is None for x in xs]):
+        return None
+
+    return [Table(page, cells) for cells in tables if len(cells) > 1]
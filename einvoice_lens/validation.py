@@ -0,0 +1,112 @@
+#!/bin/python3
+
+# Global
+import re
+from typing import TypedDict, Literal
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import polars as pl
+
+
+class DatasetValidation(TypedDict):
+    # The total amount of the totals block ("Tổng tiền thanh toán (Total amount)"), None when not found
+    total_amount: float | None
+    total_amount_in_words: str | None
+    line_items: int
+    sum_amount: float
+    # The total amount equals the sum of `amount`, None when the total amount isn't found
+    total_amount_matched: bool | None
+    # The `no` of the rows where `quantity * unit_price` differs from `amount`
+    mismatched_rows: list[int]
+    # The ranges [first, last] of `no` missing in the sequence from 1 to the last row
+    no_gaps: list[list[int]]
+    # HIGH: every check passed, the document can be accepted without review. LOW: send to review
+    confidence: Literal["HIGH", "LOW"]
+
+
+# The amounts are rounded to the currency unit on the invoice
+AMOUNT_TOLERANCE: float = 1.0
+
+# The number on Vietnamese format: dot as thousands separator, comma as decimal mark. E.g. 20.752.000, 1.234,5
+_AMOUNT_PATTERN = re.compile(r"\d{1,3}(?:\.\d{3})+(?:,\d+)?|\d+(?:,\d+)?")
+
+
+def parse_total_amount(record: list[str | None]) -> float | None:
+    "The last number of the record, the label and the figure are in the same cell or the figure is in the last cell"
+    found = _AMOUNT_PATTERN.findall(" ".join([cell for cell in record if cell is not None]))
+    if len(found) == 0:
+        return None
+    return float(found[-1].replace(".", "").replace(",", "."))
+
+
+def parse_total_amount_in_words(record: list[str | None]) -> str | None:
+    "The text after the label. E.g. 'Số tiền viết bằng chữ(In words): Hai triệu đồng' -> 'Hai triệu đồng'"
+    if len(record) == 0 or record[0] is None:
+        return None
+    _, _, words = record[0].partition(":")
+    return words.strip() or None
+
+
+def validate_dataset(
+    dataset: "pl.DataFrame",
+    total_amount_figure: list[str | None],
+    total_amount_in_words: list[str | None],
+) -> DatasetValidation:
+    """Check the typed line items against the totals block of the invoice
+
+    Args
+    ----
+    dataset (pl.DataFrame): The typed line items, one row per `no`
+    total_amount_figure (list[str | None]): The record of the total amount
+    total_amount_in_words (list[str | None]): The record of the total amount in words
+
+    Return
+    ------
+    DatasetValidation: The checks, `confidence` is HIGH when the total amount is found and matched,
+        every row satisfies `quantity * unit_price = amount` and the `no` sequence has no gap.
+        The checks are a few expressions on the typed frame, the cost is negligible beside the table extraction
+    """
+    import polars as pl
+
+    total_amount = parse_total_amount(total_amount_figure)
+    sum_amount = float(dataset.get_column("amount").sum() or 0.0)
+    total_amount_matched = abs(total_amount - sum_amount) <= AMOUNT_TOLERANCE if total_amount is not None else None
+
+    # The null quantity or unit price (e.g. the discount row) can't be checked
+    mismatched_rows = (
+        dataset
+        .filter(((pl.col("quantity") * pl.col("unit_price")) - pl.col("amount")).abs() > AMOUNT_TOLERANCE)
+        .get_column("no")
+        .to_list()
+    )
+
+    # The gaps between the consecutive `no`, the sequence starts from 1
+    no_gaps = (
+        dataset
+        .select(pl.col("no").drop_nulls().unique().sort())
+        .select(
+            (pl.col("no").shift(1, fill_value=0) + 1).alias("first"),
+            (pl.col("no") - 1).alias("last"),
+        )
+        .filter(pl.col("first") <= pl.col("last"))
+        .rows()
+    )
+
+    confident = all([
+        dataset.height > 0,
+        total_amount_matched is True,
+        len(mismatched_rows) == 0,
+        len(no_gaps) == 0,
+    ])
+
+    return DatasetValidation(
+        total_amount=total_amount,
+        total_amount_in_words=parse_total_amount_in_words(total_amount_in_words),
+        line_items=dataset.height,
+        sum_amount=sum_amount,
+        total_amount_matched=total_amount_matched,
+        mismatched_rows=mismatched_rows,
+        no_gaps=[list(gap) for gap in no_gaps],
+        confidence="HIGH" if confident else "LOW",
+    )
@@ -0,0 +1,406 @@
+#!/bin/python3
+
+# Global
+import os
+import sys
+import time
+import sqlite3
+import pathlib
+import argparse
+import tempfile
+import textwrap
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, UTC as timezoneUTC
+from typing import Any, Iterator, Literal, TypedDict
+
+# Internal
+from einvoice_lens.backends import BACKENDS
+from einvoice_lens.batch import parse_commerical_invoices
+from einvoice_lens.cache import ResultCache
+from einvoice_lens.engine import calculate_checksum_crc32c_on
+from einvoice_lens.serialize import dumps_json
+
+
+class ManifestEntry(TypedDict):
+    path: str
+    size: int
+    mtime_ns: int
+    checksum_crc32c: str | None
+    engine_version: str
+    status: Literal["SUCCESS", "PARTIAL", "FAILED"]
+    output_path: str | None
+    error: str | None
+    processed_at: str
+
+
+class WatchSummary(TypedDict):
+    processed: int
+    failed: int
+    skipped: int
+    # The files still being written (modified within `settle_seconds`), picked up on the next scan
+    deferred: int
+
+
+class Manifest:
+    """The processed files of the watched directory, persisted into SQLite file
+
+    One entry per file, committed right after its output is written, so that a run stopped at any point
+    (crash, kill) resumes on the files without entry and never parses twice the ones recorded.
+
+    Args
+    ----
+    path (str): The path into SQLite file. The parent directory is created if not exist
+
+    Usage
+    -----
+    >>> from einvoice_lens.watch import Manifest
+    >>> manifest = Manifest("output/manifest.sqlite")
+    >>> manifest.get("inbox/a.pdf")["status"]
+    'SUCCESS'
+    """
+
+    def __init__(self, path: str):
+        self.path = pathlib.Path(path).as_posix()
+        self._connection: sqlite3.Connection | None = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            pathlib.Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._connection.row_factory = sqlite3.Row
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    checksum_crc32c TEXT,
+                    engine_version TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    output_path TEXT,
+                    error TEXT,
+                    processed_at TEXT NOT NULL
+                )
+            """)
+        return self._connection
+
+    def get(self, path: str) -> ManifestEntry | None:
+        row = self.connection.execute("SELECT * FROM files WHERE path = ?", (path,)).fetchone()
+        return None if row is None else ManifestEntry(**dict(row))
+
+    def set(self, entry: ManifestEntry) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO files (path, size, mtime_ns, checksum_crc32c, engine_version, status, output_path, error, processed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (entry["path"], entry["size"], entry["mtime_ns"], entry["checksum_crc32c"], entry["engine_version"], entry["status"], entry["output_path"], entry["error"], entry["processed_at"]),
+        )
+
+    def remove(self, path: str) -> int:
+        return self.connection.execute("DELETE FROM files WHERE path = ?", (path,)).rowcount
+
+    def __iter__(self) -> Iterator[ManifestEntry]:
+        for row in self.connection.execute("SELECT * FROM files ORDER BY path"):
+            yield ManifestEntry(**dict(row))
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def _write_atomic(path: str, content: str) -> None:
+    "Write into a temporary file then replace, a crash never leaves a partial output"
+    directory = pathlib.Path(path).parent
+    directory.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, suffix=".tmp", delete=False) as f:
+        f.write(content)
+    os.replace(f.name, path)
+
+
+class DirectoryWatcher:
+    """Incremental parsing of the PDF files dropped into a directory
+
+    Only the new or changed files are parsed, by comparing with the manifest:
+    - The size and modification time are unchanged: skip without reading the file
+    - Changed but the CRC32C checksum is the same (e.g. touched, copied again): update the manifest only
+    - Otherwise, or the engine version is upgraded: parse then write `<output_dir>/<relative path>.json`
+
+    The directory is watched by inotify (and the native observers of the other platforms) when `watchdog`
+    is installed, otherwise polled every `interval` seconds.
+
+    Args
+    ----
+    directory (str): The watched directory, scanned recursively
+    output_dir (str): The directory of the JSON results, mirroring the layout of the watched directory
+    manifest (str | Manifest | None): The manifest or its path. Default to `<output_dir>/manifest.sqlite`
+    workers (int | None): The number of worker processes. Default to `os.cpu_count()`
+    interval (float): The seconds between two scans when polling (and the safety rescan under inotify)
+    settle_seconds (float): The files modified within this period are considered being written, they're deferred
+    **options: The keyword arguments forwarded into `parse_commerical_invoice`
+
+    Usage
+    -----
+    >>> from einvoice_lens.watch import DirectoryWatcher
+    >>> watcher = DirectoryWatcher("inbox", "output", workers=4)
+    >>> watcher.run_once()
+    {'processed': 12, 'failed': 0, 'skipped': 0, 'deferred': 0}
+    >>> watcher.run() # Block until interrupted
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        output_dir: str,
+        manifest: "str | Manifest | None" = None,
+        workers: int | None = None,
+        interval: float = 5.0,
+        settle_seconds: float = 1.0,
+        **options,
+    ):
+        if not os.path.isdir(directory):
+            raise ValueError(f"Required an existing directory. Got directory={directory!r}")
+        if interval <= 0:
+            raise ValueError(f"Required interval > 0. Got interval={interval!r}")
+
+        self.directory = directory
+        self.output_dir = output_dir
+        if manifest is None:
+            manifest = os.path.join(output_dir, "manifest.sqlite")
+        self.manifest = Manifest(manifest) if isinstance(manifest, (str, os.PathLike)) else manifest
+        self.workers = workers
+        self.interval = interval
+        self.settle_seconds = settle_seconds
+        self.options = options
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        # The pool of `run`, kept across the scans so that the workers are spawned once
+        self._executor: ProcessPoolExecutor | None = None
+
+    def _relative_path(self, path: str) -> str:
+        return pathlib.Path(os.path.relpath(path, self.directory)).as_posix()
+
+    def _output_path(self, relative_path: str) -> str:
+        return pathlib.Path(self.output_dir, relative_path + ".json").as_posix()
+
+    def _iter_files(self) -> Iterator[str]:
+        output_dir = os.path.abspath(self.output_dir)
+        for root, dirs, files in os.walk(self.directory):
+            dirs[:] = sorted([x for x in dirs if os.path.abspath(os.path.join(root, x)) != output_dir])
+            for file in sorted(files):
+                if file.lower().endswith(".pdf"):
+                    yield os.path.join(root, file)
+
+    def scan(self) -> tuple[list[tuple[str, os.stat_result]], WatchSummary]:
+        "Compare the files with the manifest. Return the files to parse with their stat, and the summary of the others"
+        engine_version = ResultCache.engine_version()
+        summary = WatchSummary(processed=0, failed=0, skipped=0, deferred=0)
+        changed: list[tuple[str, os.stat_result]] = []
+        now = time.time()
+
+        for path in self._iter_files():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:  # Removed since listed
+                continue
+
+            if now - stat.st_mtime < self.settle_seconds:
+                summary["deferred"] += 1
+                continue
+
+            relative_path = self._relative_path(path)
+            entry = self.manifest.get(relative_path)
+            if entry is None or entry["engine_version"] != engine_version:
+                changed.append((path, stat))
+                continue
+
+            if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                summary["skipped"] += 1
+                continue
+
+            # Same content under new stat
+            if entry["checksum_crc32c"] is not None and calculate_checksum_crc32c_on(path) == entry["checksum_crc32c"]:
+                self.manifest.set(ManifestEntry(**{**entry, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}))
+                summary["skipped"] += 1
+                continue
+
+            changed.append((path, stat))
+
+        return changed, summary
+
+    def run_once(self) -> WatchSummary:
+        """Parse the new or changed files of the directory once
+
+        Return
+        ------
+        WatchSummary: The number of processed, failed, skipped and deferred files
+        """
+        changed, summary = self.scan()
+        if len(changed) == 0:
+            return summary
+
+        engine_version = ResultCache.engine_version()
+        records = parse_commerical_invoices([path for path, _ in changed], workers=self.workers, ordered=False, executor=self._executor, **self.options)
+        broken = False
+
+        for record in records:
+            path, stat = changed[record["index"]]
+            relative_path = self._relative_path(path)
+            entry = ManifestEntry(
+                path=relative_path,
+                size=stat.st_size,
+                mtime_ns=stat.st_mtime_ns,
+                checksum_crc32c=None,
+                engine_version=engine_version,
+                status=record["status"],
+                output_path=None,
+                error=None,
+                processed_at=datetime.now(tz=timezoneUTC).isoformat(timespec="seconds"),
+            )
+
+            if record["status"] == "SUCCESS":
+                # Note: The output is written before the manifest is committed, a crash between both re-parses the file
+                output_path = self._output_path(relative_path)
+                _write_atomic(output_path, dumps_json(record["result"]))
+                entry.update(checksum_crc32c=record["result"]["runtime_metadata"]["checksum_crc32c"], output_path=output_path)
+                summary["processed"] += 1
+            else:
+                # The failed file is retried once it's changed
+                entry.update(error=f"{record['error']['type']}: {record['error']['message']}")
+                summary["failed"] += 1
+                broken = broken or record["error"]["type"] == "BrokenProcessPool"
+
+            self.manifest.set(entry)
+
+        # The crashed worker breaks the pool for good, it's spawned again on the next scan
+        if broken and self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+        return summary
+
+    def _start_observer(self) -> Any:
+        "Wake the loop up on the file events. None when `watchdog` is not installed"
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            return None
+
+        wakeup = self._wakeup
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event) -> None:
+                if not event.is_directory:
+                    wakeup.set()
+
+        observer = Observer()
+        observer.schedule(_Handler(), self.directory, recursive=True)
+        observer.start()
+        return observer
+
+    def run(self, on_summary: Any = None) -> None:
+        """Watch the directory until `stop()` (or interrupted)
+
+        Args
+        ----
+        on_summary (Callable[[WatchSummary], None] | None): Called after each scan which processed or deferred any file
+        """
+        observer = self._start_observer()
+        workers = self.workers or os.cpu_count() or 1
+        try:
+            while not self._stopped.is_set():
+                self._wakeup.clear()
+                # Note: Use `spawn` as forking a process after polars initialized its thread pool can deadlock
+                if workers > 1 and self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+                summary = self.run_once()
+                if on_summary is not None and (summary["processed"] + summary["failed"] + summary["deferred"]) > 0:
+                    on_summary(summary)
+
+                # Rescan sooner for the files being written
+                timeout = min(self.interval, self.settle_seconds) if summary["deferred"] > 0 else self.interval
+                self._wakeup.wait(timeout=timeout)
+                # Note: Debounce, a copy triggers many events
+                if self._wakeup.is_set() and not self._stopped.is_set():
+                    time.sleep(min(self.settle_seconds, self.interval))
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="einvoice-lens watch",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description=textwrap.dedent("""
+        [Einvoice Lens] Parse the new or changed PDF files of a directory, resumable through the manifest
+
+        Usage
+        -----
+
+        Watch (inotify when `watchdog` is installed, otherwise polling)
+        >>> einvoice-lens watch --dir inbox --output output --workers 4
+
+        Process the backlog then exit
+        >>> einvoice-lens watch --dir inbox --output output --once
+        """),
+    )
+    parser.add_argument("--dir", help="Path to the watched directory", type=str, required=True)
+    parser.add_argument("--output", help="Path to the directory of the JSON results", type=str, required=True)
+    parser.add_argument("--manifest", help="Path to the SQLite manifest. Default to <output>/manifest.sqlite", type=str, default=None)
+    parser.add_argument("--workers", help="Number of worker processes. Default to the number of CPUs", type=int, default=None)
+    parser.add_argument("--interval", help="Seconds between two scans. Default to 5", type=float, default=5.0)
+    parser.add_argument("--settle", help="Defer the files modified within this number of seconds. Default to 1", type=float, default=1.0)
+    parser.add_argument("--once", help="Process the new or changed files then exit", action="store_true")
+    parser.add_argument("--stop-at-total-amount", help="Stop scanning pages for line items once the totals block is found", action="store_true")
+    parser.add_argument("--templates", help="Path to the SQLite layout templates of the vendors", type=str, default=None)
+    parser.add_argument("--backend", help="PDF library reading the page objects. Default to pdfplumber", choices=list(BACKENDS), default=None)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    parameters = build_parser().parse_args(argv)
+
+    # Options
+    options: dict[str, Any] = {"stop_at_total_amount": parameters.stop_at_total_amount, "backend": parameters.backend}
+    if parameters.templates is not None:
+        from einvoice_lens.templates import TemplateRegistry
+        options.update(templates=TemplateRegistry(parameters.templates))
+
+    watcher = DirectoryWatcher(
+        parameters.dir,
+        parameters.output,
+        manifest=parameters.manifest,
+        workers=parameters.workers,
+        interval=parameters.interval,
+        settle_seconds=parameters.settle,
+        **options,
+    )
+
+    def _report(summary: WatchSummary) -> None:
+        sys.stdout.write(dumps_json(summary) + "\n")
+        sys.stdout.flush()
+
+    if parameters.once:
+        summary = watcher.run_once()
+        _report(summary)
+        return 1 if summary["failed"] > 0 else 0
+
+    try:
+        watcher.run(on_summary=_report)
+    except KeyboardInterrupt:
+        pass
+    return 0
@@ -0,0 +1,89 @@
+#!/bin/python3
+
+# Global
+import sys
+import os
+import asyncio
+
+# Append
+sys.path.append(os.path.abspath(os.curdir))
+
+# External
+import pytest
+
+# Internal
+from einvoice_lens.aio import AsyncInvoiceParser, ParserOverloadedError, parse_commerical_invoice_async
+from einvoice_lens.cache import ResultCache
+from einvoice_lens.templates import TemplateRegistry
+
+
+@pytest.fixture(scope="module")
+def resource_path() -> str:
+    return os.path.join("tests", "data", "sample-sale-invoice.pdf")
+
+
+async def _chunks(content: bytes, size: int = 4096):
+    for index in range(0, len(content), size):
+        await asyncio.sleep(0)
+        yield content[index:index + size]
+
+
+def test_parse_async_on_path_and_async_stream(resource_path):
+
+    with open(resource_path, "rb") as f:
+        content = f.read()
+
+    async def _main():
+        async with AsyncInvoiceParser(max_concurrency=2, executor="thread") as parser:
+            return await asyncio.gather(parser.parse(resource_path), parser.parse(_chunks(content)))
+
+    from_path, from_stream = asyncio.run(_main())
+
+    # Validate
+    assert from_path["runtime_metadata"]["checksum_crc32c"] == "a6f1bd83"
+    assert from_stream["runtime_metadata"]["checksum_crc32c"] == "a6f1bd83"
+    assert from_stream["runtime_metadata"]["source_path"] is None
+    assert from_stream["dataset"] == from_path["dataset"]
+
+
+def test_parse_async_raise_on_invalid_source():
+
+    with pytest.raises(ValueError):
+        asyncio.run(parse_commerical_invoice_async(b"not a pdf"))
+
+
+def test_parse_async_timeout_and_overload(resource_path):
+
+    async def _main():
+        async with AsyncInvoiceParser(max_concurrency=1, executor="thread", max_pending=1) as parser:
+            running = asyncio.ensure_future(parser.parse(resource_path))
+            waiting = asyncio.ensure_future(parser.parse(resource_path, timeout=0.001))
+            while parser._pending < 1:
+                await asyncio.sleep(0)
+            with pytest.raises(ParserOverloadedError):
+                await parser.parse(resource_path)
+            with pytest.raises(asyncio.TimeoutError):
+                await waiting
+            return await running
+
+    result = asyncio.run(_main())
+    assert len(result["dataset"]) == 3
+
+
+def test_parse_async_thread_executor_shared_cache(resource_path, tmp_path):
+
+    cache = ResultCache(os.path.join(tmp_path, "cache.sqlite"))
+    templates = TemplateRegistry(os.path.join(tmp_path, "templates.sqlite"))
+
+    async def _main():
+        async with AsyncInvoiceParser(max_concurrency=4, executor="thread", cache=cache, templates=templates) as parser:
+            return await asyncio.gather(*[parser.parse(resource_path, cache_refresh=True) for _ in range(8)])
+
+    # Parse: each thread opens its own SQLite connection
+    results = asyncio.run(_main())
+    cache.close()
+    templates.close()
+
+    # Validate
+    assert all([len(result["dataset"]) == 3 for result in results])
+    assert len(cache.connection.execute("SELECT * FROM results").fetchall()) == 1
@@ -0,0 +1,97 @@
+#!/bin/python3
+
+# Global
+import sys
+import os
+
+# Append
+sys.path.append(os.path.abspath(os.curdir))
+
+# External
+import pytest
+
+# Internal
+from einvoice_lens.backends import BACKENDS, PDFBackend, PdfplumberBackend, get_backend
+from einvoice_lens.engine import parse_commerical_invoice, stream_commerical_invoice
+
+
+@pytest.fixture(scope="module")
+def resource_path() -> str:
+    return os.path.join("tests", "data", "sample-sale-invoice.pdf")
+
+
+@pytest.fixture(scope="module")
+def synthetic_path(tmp_path_factory) -> str:
+    pytest.importorskip("reportlab")
+    from benchmarks.generator import generate_invoice
+
+    path = os.path.join(tmp_path_factory.mktemp("backends"), "synthetic.pdf")
+    generate_invoice(path, line_items=60, appendix_pages=1, seed=17)
+    return path
+
+
+def _require(backend: str) -> None:
+    if backend == "pymupdf":
+        pytest.importorskip("pymupdf")
+    if backend == "pypdfium2":
+        pytest.importorskip("pypdfium2")
+
+
+def test_get_backend():
+
+    assert isinstance(get_backend(), PdfplumberBackend)
+    assert get_backend("pdfplumber").name == "pdfplumber"
+    backend = PdfplumberBackend()
+    assert get_backend(backend) is backend
+
+    # Validate
+    with pytest.raises(ValueError):
+        get_backend("poppler")
+    with pytest.raises(TypeError):
+        PDFBackend()
+
+
+@pytest.mark.parametrize("backend", [name for name in BACKENDS if name != "pdfplumber"])
+@pytest.mark.parametrize("fixture", ["resource_path", "synthetic_path"])
+def test_backend_parity_with_pdfplumber(backend, fixture, request):
+
+    _require(backend)
+    path = request.getfixturevalue(fixture)
+    expected = parse_commerical_invoice(path)
+    result = parse_commerical_invoice(path, backend=backend)
+
+    # Validate
+    assert result["runtime_metadata"]["backend"] == backend
+    assert expected["runtime_metadata"]["backend"] == "pdfplumber"
+    assert result["profile"] == expected["profile"]
+    assert result["dataset"] == expected["dataset"]
+
+
+@pytest.mark.parametrize("backend", [name for name in BACKENDS if name != "pdfplumber"])
+def test_backend_page_text_parity(backend, resource_path):
+
+    _require(backend)
+    with open(resource_path, "rb") as f:
+        expected = PdfplumberBackend().open(f)
+        document = get_backend(backend).open(f)
+        try:
+            page = document.pages[0]
+            assert page.extract_text() == expected.pages[0].extract_text()
+            assert len(page.edges) == len(expected.pages[0].edges)
+        finally:
+            document.close()
+            expected.close()
+
+
+@pytest.mark.parametrize("backend", [name for name in BACKENDS if name != "pdfplumber"])
+def test_backend_stream(backend, resource_path):
+
+    _require(backend)
+    expected = parse_commerical_invoice(resource_path)
+    with stream_commerical_invoice(resource_path, backend=backend) as stream:
+        items = list(stream)
+
+    # Validate
+    assert stream.profile == expected["profile"]
+    assert len(items) == len(expected["dataset"])
+    assert stream.runtime_metadata["backend"] == backend
@@ -0,0 +1,77 @@
+#!/bin/python3
+
+# Global
+import sys
+import os
+
+# Append
+sys.path.append(os.path.abspath(os.curdir))
+
+# External
+import pytest
+
+# Internal
+import einvoice_lens
+
+
+@pytest.fixture(scope="module")
+def resource_path() -> str:
+    return os.path.join("tests", "data", "sample-sale-invoice.pdf")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parse_batch_keep_input_order_and_capture_errors(resource_path, workers):
+
+    paths = [resource_path, os.path.join("tests", "data", "not-exist.pdf"), resource_path]
+
+    # Parse
+    records = list(einvoice_lens.parse_commerical_invoices(paths, workers=workers, ordered=True))
+
+    # Validate
+    assert [x["index"] for x in records] == [0, 1, 2]
+    assert [x["status"] for x in records] == ["SUCCESS", "FAILED", "SUCCESS"]
+    assert records[1]["result"] is None
+    assert records[1]["error"]["type"] == "ValueError"
+    assert records[0]["result"]["runtime_metadata"]["checksum_crc32c"] == "a6f1bd83"
+    assert len(records[2]["result"]["dataset"]) == 3
+
+
+def test_parse_batch_on_completion_order(resource_path):
+
+    paths = [resource_path] * 4
+
+    # Parse
+    records = list(einvoice_lens.parse_commerical_invoices(paths, workers=2, ordered=False, max_pending=2))
+
+    # Validate
+    assert sorted([x["index"] for x in records]) == [0, 1, 2, 3]
+    assert all([x["status"] == "SUCCESS" for x in records])
+
+
+def test_parse_batch_in_memory_sources(resource_path):
+
+    with open(resource_path, "rb") as f:
+        content = f.read()
+
+    # Parse
+    records = list(einvoice_lens.parse_commerical_invoices([content, b"Not a PDF"], workers=1))
+
+    # Validate
+    assert [x["status"] for x in records] == ["SUCCESS", "FAILED"]
+    assert [x["source_path"] for x in records] == [None, None]
+    assert records[0]["result"]["runtime_metadata"]["checksum_crc32c"] == "a6f1bd83"
+    assert len(records[0]["result"]["dataset"]) == 3
+
+
+def test_parse_batch_in_memory_sources_pool(resource_path):
+
+    with open(resource_path, "rb") as f:
+        content = f.read()
+
+    # Parse: the memoryview and the stream are not picklable, they are read into bytes before submitting
+    with open(resource_path, "rb") as stream:
+        records = list(einvoice_lens.parse_commerical_invoices([memoryview(content), stream, content, b"Not a PDF"], workers=2))
+
+    # Validate
+    assert [x["status"] for x in records] == ["SUCCESS", "SUCCESS", "SUCCESS", "FAILED"]
+    assert [x["result"]["runtime_metadata"]["checksum_crc32c"] for x in records[:3]] == ["a6f1bd83"] * 3
@@ -0,0 +1,105 @@
+#!/bin/python3
+
+# Global
+import sys
+import os
+import sqlite3
+from datetime import date, datetime
+
+# Append
+sys.path.append(os.path.abspath(os.curdir))
+
+# External
+import pytest
+
+# Internal
+import einvoice_lens
+
+
+@pytest.fixture(scope="module")
+def resource_path() -> str:
+    return os.path.join("tests", "data", "sample-sale-invoice.pdf")
+
+
+def test_cache_hit_on_same_checksum(resource_path, tmp_path):
+
+    cache = einvoice_lens.ResultCache(os.path.join(tmp_path, "cache.sqlite"))
+
+    # Parse
+    first = einvoice_lens.parse_commerical_invoice(resource_path, cache=cache)
+    second = einvoice_lens.parse_commerical_invoice(resource_path, cache=cache)
+    refreshed = einvoice_lens.parse_commerical_invoice(resource_path, cache=cache, cache_refresh=True)
+
+    # Validate
+    assert first["runtime_metadata"]["cache_hit"] is False
+    assert second["runtime_metadata"]["cache_hit"] is True
+    assert refreshed["runtime_metadata"]["cache_hit"] is False
+    assert isinstance(second["runtime_metadata"]["pipeline"]["start"], datetime)
+    assert second["profile"]["attribute"]["issue_date"] == date(2025, 8, 28)
+    assert second["profile"] == first["profile"]
+    assert second["dataset"] == first["dataset"]
+
+    # Invalidate
+    assert cache.invalidate("a6f1bd83") == 1
+    assert cache.get("a6f1bd83") is None
+
+
+def test_cache_eviction_on_entries(tmp_path):
+
+    cache = einvoice_lens.ResultCache(os.path.join(tmp_path, "cache.sqlite"), max_entries=2)
+    result = {"runtime_metadata": {"pipeline": {}}, "profile": {"attribute": {}}, "dataset": []}
+
+    for checksum in ("a", "b", "c"):
+        cache.set(checksum, result)
+
+    # Validate
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert cache.get("c") is not None
+
+
+def test_cache_keyed_on_options(resource_path, tmp_path):
+
+    cache = einvoice_lens.ResultCache(os.path.join(tmp_path, "cache.sqlite"))
+
+    # Parse with an empty rule set then with the defaults
+    custom = einvoice_lens.parse_commerical_invoice(resource_path, cache=cache, rule_set=einvoice_lens.RuleSet([]))
+    default = einvoice_lens.parse_commerical_invoice(resource_path, cache=cache)
+    stopped = einvoice_lens.parse_commerical_invoice(resource_path, cache=cache, stop_at_total_amount=True)
+
+    # Validate
+    assert custom["profile"]["seller"] == {}
+    assert default["runtime_metadata"]["cache_hit"] is False
+    assert default["profile"]["seller"]["tax_code"] == "0301118723-001"
+    assert stopped["runtime_metadata"]["cache_hit"] is False
+    assert einvoice_lens.parse_commerical_invoice(resource_path, cache=cache)["runtime_metadata"]["cache_hit"] is True
+    assert cache.invalidate("a6f1bd83") == 3
+
+
+def test_cache_keyed_on_backend(resource_path, tmp_path):
+    pytest.importorskip("pypdfium2")
+
+    cache = einvoice_lens.ResultCache(os.path.join(tmp_path, "cache.sqlite"))
+    einvoice_lens.parse_commerical_invoice(resource_path, cache=cache)
+
+    # Validate: the result of another backend is never served
+    result = einvoice_lens.parse_commerical_invoice(resource_path, cache=cache, backend="pypdfium2")
+    assert result["runtime_metadata"]["cache_hit"] is False
+    assert result["runtime_metadata"]["backend"] == "pypdfium2"
+    result = einvoice_lens.parse_commerical_invoice(resource_path, cache=cache, backend="pypdfium2")
+    assert result["runtime_metadata"]["cache_hit"] is True
+    assert result["runtime_metadata"]["backend"] == "pypdfium2"
+
+
+def test_cache_drop_entries_without_options(tmp_path):
+
+    path = os.path.join(tmp_path, "cache.sqlite")
+    with sqlite3.connect(path) as connection:
+        connection.execute("CREATE TABLE results (checksum TEXT NOT NULL, engine_version TEXT NOT NULL, payload TEXT NOT NULL, size INTEGER NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL, PRIMARY KEY (checksum, engine_version))")
+        connection.execute("INSERT INTO results VALUES ('a', ?, '{}', 2, 0, 0)", (einvoice_lens.__version__,))
+    connection.close()
+
+    # Validate
+    cache = einvoice_lens.ResultCache(path)
+    assert cache.get("a") is None
+    assert cache.invalidate() == 0
@@ -0,0 +1,27 @@
+#!/bin/python3
+
+# Global
+import sys
+import os
+import json
+
+# Append
+sys.path.append(os.path.abspath(os.curdir))
+
+# Internal
+from einvoice_lens import cli
+
+
+def test_cli_stream_jsonl_from_directory(capsys):
+
+    # Run
+    exit_code = cli.main(["--path", os.path.join("tests", "data"), "--workers", "1"])
+    lines = capsys.readouterr().out.splitlines()
+
+    # Validate
+    assert exit_code == 0
+    assert len(lines) == 1
+    record = json.loads(lines[0])
+    assert record["status"] == "SUCCESS"
+    assert record["result"]["profile"]["attribute"]["issue_date"] == "2025-08-28"
+    assert len(record["result"]["dataset"]) == 3
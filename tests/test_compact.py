@@ -0,0 +1,80 @@
+#!/bin/python3
+
+# Global
+import sys
+import os
+import json
+import pickle
+
+# Append
+sys.path.append(os.path.abspath(os.curdir))
+
+# External
+import pytest
+
+# Internal
+import einvoice_lens
+from einvoice_lens.compact import CompactInvoiceResult, CompactLineItem
+from einvoice_lens.serialize import dumps_json, dumps_msgpack, json_default
+
+
+@pytest.fixture(scope="module")
+def resource_path() -> str:
+    return os.path.join("tests", "data", "sample-sale-invoice.pdf")
+
+
+@pytest.fixture(scope="module")
+def result(resource_path) -> dict:
+    return einvoice_lens.parse_commerical_invoice(resource_path)
+
+
+def test_compact_result_compatibility_view(result):
+
+    compact = CompactInvoiceResult.from_dict(result)
+
+    # Validate
+    assert isinstance(compact.dataset[0], CompactLineItem)
+    assert not hasattr(compact.dataset[0], "__dict__")
+    assert compact.profile.seller.tax_code == result["profile"]["seller"]["tax_code"]
+    assert compact.profile.attribute.issue_date == result["profile"]["attribute"]["issue_date"]
+    assert compact.to_dict()["dataset"] == result["dataset"]
+    assert compact.to_dict()["runtime_metadata"] == result["runtime_metadata"]
+    assert compact.runtime_metadata.validation.confidence == result["runtime_metadata"]["validation"]["confidence"]
+    assert not hasattr(compact.runtime_metadata, "__dict__")
+    assert not hasattr(compact.runtime_metadata.pipeline.pages[0], "__dict__")
+    for section, fields in result["profile"].items():
+        assert {**compact.to_dict()["profile"][section], **fields} == compact.to_dict()["profile"][section]
+    assert pickle.loads(pickle.dumps(compact)) == compact
+
+
+def test_dumps_json_same_as_standard_library(result):
+
+    compact = CompactInvoiceResult.from_dict(result)
+    expected = json.dumps(result, default=json_default, ensure_ascii=False, separators=(",", ":"))
+
+    # Validate
+    assert json.loads(dumps_json(result)) == json.loads(expected)
+    assert dumps_json(result) == expected
+    assert json.loads(dumps_json(compact)) == json.loads(dumps_json(compact.to_dict()))
+    assert "Xe cảnh sát SH" in dumps_json(result)
+
+
+def test_dumps_msgpack(result):
+
+    msgpack = pytest.importorskip("msgpack")
+    expected = json.loads(dumps_json(result))
+    expected["runtime_metadata"]["pipeline"].update(start=result["runtime_metadata"]["pipeline"]["start"], end=result["runtime_metadata"]["pipeline"]["end"])
+
+    # Validate: the datetime is the native Timestamp
+    assert msgpack.unpackb(dumps_msgpack(result), timestamp=3) == expected
+    assert msgpack.unpackb(dumps_msgpack(CompactInvoiceResult.from_dict(result)), timestamp=3) == expected
+
+
+def test_parse_batch_compact(resource_path):
+
+    records = list(einvoice_lens.parse_commerical_invoices([resource_path, resource_path], workers=2, compact=True))
+
+    # Validate
+    assert [record["status"] for record in records] == ["SUCCESS", "SUCCESS"]
+    assert isinstance(records[0]["result"], CompactInvoiceResult)
+    assert einvoice_lens.collect_line_items(records).height == 6
@@ -0,0 +1,61 @@
+#!/bin/python3
+
+# Global
+import sys
+import os
+
+# Append
+sys.path.append(os.path.abspath(os.curdir))
+
+# External
+import pytest
+import polars as pl
+
+# Internal
+import einvoice_lens
+
+
+@pytest.fixture(scope="module")
+def resource_path() -> str:
+    return os.path.join("tests", "data", "sample-sale-invoice.pdf")
+
+
+def test_dataset_format_polars_and_arrow(resource_path):
+
+    output = einvoice_lens.parse_commerical_invoice(resource_path)
+    output_on_polars = einvoice_lens.parse_commerical_invoice(resource_path, dataset_format="polars")
+
+    # Validate
+    assert isinstance(output_on_polars["dataset"], pl.DataFrame)
+    assert output_on_polars["dataset"].to_dicts() == output["dataset"]
+    assert output_on_polars["dataset"].schema["amount"] == pl.Float64
+
+    # Arrow
+    pytest.importorskip("pyarrow")
+    output_on_arrow = einvoice_lens.parse_commerical_invoice(resource_path, dataset_format="arrow")
+    assert output_on_arrow["dataset"].to_pylist() == output["dataset"]
+
+
+def test_dataset_format_invalid(resource_path):
+
+    with pytest.raises(ValueError):
+        einvoice_lens.parse_commerical_invoice(resource_path, dataset_format="csv")
+
+
+def test_collect_line_items_with_invoice_keys(resource_path, tmp_path):
+
+    records = einvoice_lens.parse_commerical_invoices(
+        [resource_path, os.path.join("tests", "data", "not-exist.pdf"), resource_path],
+        workers=1,
+        dataset_format="polars",
+    )
+
+    # Write
+    path = os.path.join(tmp_path, "line_items.parquet")
+    dataset = einvoice_lens.write_line_items_parquet(records, path)
+
+    # Validate
+    assert dataset.height == 6
+    assert dataset.columns[:3] == ["checksum_crc32c", "serial_no", "invoice_number"]
+    assert dataset.get_column("invoice_number").unique().to_list() == ["123"]
+    assert pl.read_parquet(path).equals(dataset)
@@ -1,6 +1,7 @@
 #!/bin/python3
 
 # Global
+import io
 import sys
 import os
 from datetime import datetime, date
@@ -14,6 +15,7 @@ import polars as pl
 
 # Internal
 import einvoice_lens
+from einvoice_lens.backends import PdfplumberBackend
 
 
 @pytest.fixture(scope="module")
@@ -98,3 +100,85 @@ def test_extract_document_base_case(resource_path):
     assert len(dataset) == 3
     assert sum([x["amount"] for x in dataset]) == 2680000.0, f"Expected sum of amount is 2680000.0, got {sum([x['amount'] for x in dataset])}"
     assert pl.DataFrame(data=dataset, infer_schema_length=10).equals(other=expected_dataset), f"Required match dataset. Got:\n{dataset}"
+
+
+@pytest.mark.parametrize("kind", ["bytes", "memoryview", "stream"])
+def test_extract_document_from_in_memory_source(resource_path, kind):
+
+    with open(resource_path, "rb") as f:
+        content = f.read()
+
+    source = {
+        "bytes": content,
+        "memoryview": memoryview(bytearray(content)),
+        "stream": io.BytesIO(content),
+    }[kind]
+
+    # Parse
+    output = einvoice_lens.parse_commerical_invoice(source)
+
+    # Validate
+    assert output["runtime_metadata"]["source_path"] is None
+    assert output["runtime_metadata"]["checksum_crc32c"] == "a6f1bd83"
+    assert output["profile"]["attribute"]["invoice_number"] == "123"
+    assert len(output["dataset"]) == 3
+
+
+def test_extract_document_reject_invalid_source(tmp_path):
+
+    with pytest.raises(ValueError):
+        einvoice_lens.parse_commerical_invoice(os.path.join("tests", "data", "not-exist.pdf"))
+
+    with pytest.raises(ValueError):
+        einvoice_lens.parse_commerical_invoice(b"not a pdf document")
+
+
+def test_extract_document_stop_at_total_amount(resource_path):
+
+    # Parse
+    output = einvoice_lens.parse_commerical_invoice(resource_path)
+    output_on_stop = einvoice_lens.parse_commerical_invoice(resource_path, stop_at_total_amount=True)
+
+    # Validate
+    assert output_on_stop["profile"] == output["profile"]
+    assert output_on_stop["dataset"] == output["dataset"]
+
+
+def test_stream_document_line_items(resource_path):
+
+    output = einvoice_lens.parse_commerical_invoice(resource_path)
+
+    # Stream
+    with einvoice_lens.stream_commerical_invoice(resource_path) as stream:
+        profile = stream.profile
+        items = list(stream)
+        runtime_metadata = stream.runtime_metadata
+
+    # Validate
+    assert profile == output["profile"]
+    assert items == output["dataset"]
+    assert runtime_metadata["checksum_crc32c"] == "a6f1bd83"
+    assert isinstance(runtime_metadata["pipeline"]["end"], datetime)
+
+
+def test_extract_document_close_on_failure(resource_path):
+
+    closed = []
+
+    class _TrackedBackend(PdfplumberBackend):
+        def open(self, stream):
+            document = super().open(stream)
+            close = document.close
+            document.close = lambda: (closed.append(True), close())
+            return document
+
+    def _fail(name, seconds, attributes):
+        if name == "first_page_text":
+            raise RuntimeError("Interrupted")
+
+    # Parse
+    with pytest.raises(RuntimeError):
+        einvoice_lens.parse_commerical_invoice(resource_path, backend=_TrackedBackend(), instrumentation=einvoice_lens.CallbackInstrumentation(_fail))
+
+    # Validate
+    assert closed == [True]
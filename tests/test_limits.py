@@ -0,0 +1,113 @@
+#!/bin/python3
+
+# Global
+import sys
+import os
+import threading
+
+# Append
+sys.path.append(os.path.abspath(os.curdir))
+
+# External
+import pytest
+
+# Internal
+import einvoice_lens
+from einvoice_lens.engine import _cache_options
+from einvoice_lens.limits import ParseLimits, ResourceBudget
+
+
+@pytest.fixture(scope="module")
+def resource_path() -> str:
+    return os.path.join("tests", "data", "sample-sale-invoice.pdf")
+
+
+@pytest.fixture(scope="module")
+def multi_page_path(tmp_path_factory) -> str:
+    pytest.importorskip("reportlab")
+    from benchmarks.generator import generate_invoice
+
+    path = os.path.join(tmp_path_factory.mktemp("limits"), "multi-page.pdf")
+    generate_invoice(path, line_items=120, appendix_pages=2, seed=3)
+    return path
+
+
+def test_limits_validate():
+
+    with pytest.raises(ValueError):
+        ResourceBudget(ParseLimits(max_pages=0))
+    with pytest.raises(ValueError):
+        ResourceBudget(ParseLimits(page_timeout_seconds=-1))
+
+
+def test_limits_max_file_size_reject_before_open(resource_path):
+
+    output = einvoice_lens.parse_commerical_invoice(resource_path, limits=ParseLimits(max_file_size_mb=0.001))
+
+    # Validate
+    assert output["runtime_metadata"]["limit_exceeded"]["reason"] == "max_file_size"
+    assert output["runtime_metadata"]["checksum_crc32c"] is None
+    assert output["runtime_metadata"]["total_pages"] == 0
+    assert output["profile"]["attribute"]["document_type"] == "UNKNOWN"
+    assert output["dataset"] == []
+
+
+def test_limits_max_pages_partial_line_items(multi_page_path):
+
+    expected = einvoice_lens.parse_commerical_invoice(multi_page_path)
+    output = einvoice_lens.parse_commerical_invoice(multi_page_path, limits=ParseLimits(max_pages=1))
+
+    # Validate
+    assert expected["runtime_metadata"]["limit_exceeded"] is None
+    assert output["runtime_metadata"]["limit_exceeded"] == {
+        "reason": "max_pages",
+        "message": output["runtime_metadata"]["limit_exceeded"]["message"],
+        "page": 1,
+    }
+    assert output["profile"] == expected["profile"]
+    assert 0 < len(output["dataset"]) < len(expected["dataset"])
+    assert output["dataset"] == expected["dataset"][:len(output["dataset"])]
+
+
+def test_limits_page_timeout_interrupt_the_page(multi_page_path):
+
+    output = einvoice_lens.parse_commerical_invoice(multi_page_path, limits=ParseLimits(page_timeout_seconds=0.0001))
+
+    # Validate
+    limit_exceeded = output["runtime_metadata"]["limit_exceeded"]
+    assert limit_exceeded["reason"] == "page_timeout"
+    assert limit_exceeded["page"] == 0
+    assert output["runtime_metadata"]["total_pages"] > 1
+    assert output["dataset"] == []
+
+
+def test_limits_document_timeout_off_main_thread(multi_page_path):
+
+    outputs = []
+    thread = threading.Thread(target=lambda: outputs.append(
+        einvoice_lens.parse_commerical_invoice(multi_page_path, limits=ParseLimits(document_timeout_seconds=0.0001))
+    ))
+    thread.start()
+    thread.join()
+
+    # Validate: checked between the pages
+    limit_exceeded = outputs[0]["runtime_metadata"]["limit_exceeded"]
+    assert limit_exceeded["reason"] == "document_timeout"
+    assert limit_exceeded["page"] == 0
+
+
+def test_limits_partial_record_on_batch(resource_path, tmp_path):
+
+    cache = einvoice_lens.ResultCache(os.path.join(tmp_path, "cache.sqlite"))
+    records = list(einvoice_lens.parse_commerical_invoices(
+        [resource_path],
+        workers=1,
+        cache=cache,
+        limits=ParseLimits(document_timeout_seconds=0.0001),
+    ))
+
+    # Validate: the partial result isn't cached
+    assert records[0]["status"] == "PARTIAL"
+    assert records[0]["error"]["type"] == "LimitExceededError"
+    assert records[0]["result"]["runtime_metadata"]["limit_exceeded"]["reason"] in ("page_timeout", "document_timeout")
+    assert cache.get("a6f1bd83", options=_cache_options(None, False)) is None
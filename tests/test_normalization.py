@@ -0,0 +1,120 @@
+#!/bin/python3
+
+# Global
+import sys
+import os
+import random
+
+# Append
+sys.path.append(os.path.abspath(os.curdir))
+
+# External
+import pytest
+import polars as pl
+import strx
+
+# Internal
+import einvoice_lens
+from einvoice_lens import engine
+from einvoice_lens.engine import _TableCollector, _build_dataset, _normalize_text_expr, _pipeline_text_transform
+
+
+class _FakeTable:
+
+    def __init__(self, records: list[list[str | None]]):
+        self.records = records
+
+
+class _FakePageLayout:
+    "The page layout with one ruled table of the records"
+
+    index = 0
+    has_ruling_objects = True
+
+    def __init__(self, records: list[list[str | None]]):
+        self.records = records
+
+    def find_tables(self) -> list[_FakeTable]:
+        return [_FakeTable(self.records)]
+
+
+def test_normalize_text_expr_match_the_text_transform():
+
+    samples = ["  Xe  cảnh sát\nSH  ", "“Bút bi” Thiên Long", "Giấy in::A4,,Double A", "Dầu\xadăn – 1L", "", "é"]
+
+    # Transform
+    output = pl.DataFrame({"text": samples}).select(_normalize_text_expr(pl.col("text"))).to_series().to_list()
+
+    # Validate
+    assert output == [_pipeline_text_transform(string=x).replace("\n", " ") for x in samples]
+
+
+def test_text_transform_by_lines_match_the_whole_text():
+
+    # The whitespace runs, the blank lines and the soft hyphen across the lines
+    alphabet = ["a", "Đ", "ô", "\u0301", "ﬁ", " ", " ", "\t", "\n", "\n", ",", ":", "\xad", "\xa0", "“", "–", "x"]
+    rng = random.Random(7)
+    samples = ["".join(rng.choices(alphabet, k=rng.randint(0, 40))) for _ in range(2000)]
+
+    # Validate
+    for sample in samples:
+        expected = strx.str_normalize(string=sample, form="NFKC", strip=True).replace("\xad", "")
+        assert _pipeline_text_transform(string=sample) == expected, repr(sample)
+
+
+def test_text_normalization_cache_shared_between_documents():
+    path = os.path.join("tests", "data", "sample-sale-invoice.pdf")
+
+    einvoice_lens.parse_commerical_invoice(path)
+    metadata = einvoice_lens.parse_commerical_invoice(path)["runtime_metadata"]["pipeline"]["text_normalization"]
+
+    # Validate: every line of the same vendor is normalized once in the process
+    assert metadata["misses"] == 0
+    assert metadata["hits"] > 0
+    assert metadata["hit_rate"] == 1.0
+    assert 0 < metadata["cache_size"] <= engine.TEXT_NORMALIZATION_CACHE_SIZE
+
+
+def test_collector_classify_records_and_build_dataset(monkeypatch):
+
+    monkeypatch.setattr(engine, "extract_table_rows", lambda table: table.records)
+
+    records = [
+        ["Ghi chú", "trước bảng"],
+        ["STT\n(No.)", "Tên hàng hóa, dịch vụ\n(Description)", "Đơn vị tính\n(Unit)", "Số lượng\n(Quantity)", "Đơn giá\n(Unit price)", "Thành tiền\n(Amount)"],
+        ["(1)", "(2)", "(3)", "(4)", "(5)", "(6) = (4) x (5)"],
+        ["", "", "", "", "", ""],
+        ["1", "Gạo  ST25", "bao", "1.200", "25.000,5", "30.000.600"],
+        ["1", "Gạo  ST25", "bao", "1.200", "25.000,5", "30.000.600"],
+        ["2", "Bánh quy\nCosy", "HỘP", "3", "45.000", "135.000"],
+        ["3", "Thiếu cột"],
+        ["Tổng tiền thanh toán(Total amount): 30.135.600", None, None, None, None, None],
+        ["Số tiền viết bằng chữ(In words): Không xác định", None, None, None, None, None],
+    ]
+
+    # Collect
+    collector = _TableCollector()
+    table_elements = collector.collect(_FakePageLayout(records))
+    dataset = _build_dataset(table_elements)
+
+    # Validate: the headers and totals are held, the records before the header or not matching its length are errors
+    assert collector.on_table_length == 6
+    assert collector.main_header[0] == "STT (No.)"
+    assert collector.sub_header[0] == "(1)"
+    assert collector.total_amount_figure[0] == "Tổng tiền thanh toán(Total amount): 30.135.600"
+    assert collector.total_amount_in_words[0].startswith("Số tiền viết bằng chữ")
+    assert collector.errors == [["Ghi chú", "trước bảng"], ["3", "Thiếu cột"]]
+
+    # Validate: the duplicated records are dropped, the Vietnamese numbers are parsed
+    assert dataset.to_dicts() == [
+        {"no": 1, "product_description": "Gạo ST25", "unit": "Bao", "quantity": 1200, "unit_price": 25000.5, "amount": 30000600.0},
+        {"no": 2, "product_description": "Bánh quy Cosy", "unit": "Hộp", "quantity": 3, "unit_price": 45000.0, "amount": 135000.0},
+    ]
+
+
+def test_build_dataset_raise_on_invalid_number():
+
+    table_elements = pl.DataFrame([["1", "Gạo", "Bao", "nhiều", "1.000", "1.000"]], schema=["no", "product_description", "unit", "quantity", "unit_price", "amount"], orient="row")
+
+    with pytest.raises(pl.exceptions.InvalidOperationError):
+        _build_dataset(table_elements)
@@ -0,0 +1,207 @@
+#!/bin/python3
+
+# Global
+import sys
+import os
+import time
+
+# Append
+sys.path.append(os.path.abspath(os.curdir))
+
+# External
+import pytest
+
+# Internal
+import einvoice_lens
+from einvoice_lens.cache import OCRCache
+from einvoice_lens.limits import ParseLimits
+from einvoice_lens.ocr import OCREngine, OCRSettings
+
+
+class _ReplayEngine(OCREngine):
+    "Read the words of the text layer of the original document, on its page nearest to the image"
+
+    name = "replay"
+
+    def __init__(self, source: str, dpi: int):
+        self.source = source
+        self.dpi = dpi
+
+    def recognize(self, image):
+        import pdfplumber
+        import pypdfium2
+        from PIL import Image
+
+        native = pypdfium2.PdfDocument(self.source)
+        thumbnails = [page.render(scale=self.dpi / 72, grayscale=True).to_pil().resize((32, 32), Image.Resampling.BOX) for page in native]
+        native.close()
+        target = image.convert("L").resize((32, 32), Image.Resampling.BOX)
+        index = min(range(len(thumbnails)), key=lambda i: sum([abs(a - b) for a, b in zip(thumbnails[i].tobytes(), target.tobytes())]))
+
+        with pdfplumber.open(self.source) as pdf:
+            words = pdf.pages[index].extract_words()
+
+        # One box per text line, as Tesseract
+        lines: dict[int, list[dict]] = {}
+        for word in words:
+            lines.setdefault(round(word["bottom"]), []).append(word)
+        scale = self.dpi / 72
+        recognized = []
+        for line in lines.values():
+            top, bottom = min([word["top"] for word in line]), max([word["bottom"] for word in line])
+            recognized.extend([
+                dict(text=word["text"], x0=word["x0"] * scale, top=top * scale, x1=word["x1"] * scale, bottom=bottom * scale, confidence=95.0)
+                for word in line
+            ])
+        return recognized
+
+
+class _FailingEngine(OCREngine):
+    name = "failing"
+
+    def recognize(self, image):
+        raise AssertionError("The page with text layer is recognized")
+
+
+class _FlakyEngine(_ReplayEngine):
+    "Fail on the second recognized page"
+
+    name = "flaky"
+
+    def __init__(self, source: str, dpi: int):
+        super().__init__(source, dpi)
+        self.calls = 0
+
+    def recognize(self, image):
+        self.calls += 1
+        if self.calls == 2:
+            raise RuntimeError("Tesseract crashed")
+        return super().recognize(image)
+
+
+class _HangingEngine(OCREngine):
+    name = "hanging"
+
+    def recognize(self, image):
+        time.sleep(60)
+        return []
+
+
+def _scan(source: str, target: str, dpi: int = 150) -> None:
+    "Print the pages into images, the document has no text layer nor vector lines"
+    import pypdfium2
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.utils import ImageReader
+
+    native = pypdfium2.PdfDocument(source)
+    pdf = None
+    for page in native:
+        width, height = page.get_size()
+        pdf = pdf or canvas.Canvas(target, pagesize=(width, height))
+        pdf.setPageSize((width, height))
+        pdf.drawImage(ImageReader(page.render(scale=dpi / 72, grayscale=True).to_pil()), 0, 0, width=width, height=height)
+        pdf.showPage()
+    pdf.save()
+    native.close()
+
+
+@pytest.fixture(scope="module")
+def resource_path() -> str:
+    return os.path.join("tests", "data", "sample-sale-invoice.pdf")
+
+
+@pytest.fixture(scope="module")
+def scanned_paths(tmp_path_factory) -> tuple[str, str]:
+    pytest.importorskip("reportlab")
+    pytest.importorskip("pypdfium2")
+    from benchmarks.generator import generate_invoice
+
+    directory = tmp_path_factory.mktemp("ocr")
+    generate_invoice(os.path.join(directory, "text.pdf"), line_items=60, appendix_pages=1, seed=3)
+    _scan(os.path.join(directory, "text.pdf"), os.path.join(directory, "scanned.pdf"))
+    return os.path.join(directory, "text.pdf"), os.path.join(directory, "scanned.pdf")
+
+
+def test_ocr_scanned_pages_same_result(scanned_paths, tmp_path):
+    text_path, scanned_path = scanned_paths
+    expected = einvoice_lens.parse_commerical_invoice(text_path)
+
+    # Without OCR, the scanned pages are empty
+    assert len(einvoice_lens.parse_commerical_invoice(scanned_path)["dataset"]) == 0
+
+    cache = OCRCache(os.path.join(tmp_path, "ocr.sqlite"))
+    settings = OCRSettings(engine=_ReplayEngine(text_path, dpi=200), dpi=200, cache=cache)
+    output = einvoice_lens.parse_commerical_invoice(scanned_path, ocr=settings)
+
+    # Validate: the words and the ruling lines go through the same rules and table logic
+    assert output["profile"] == expected["profile"]
+    assert output["dataset"] == expected["dataset"]
+    assert output["runtime_metadata"]["validation"]["confidence"] == "HIGH"
+    assert output["runtime_metadata"]["ocr"] == {"engine": "replay", "dpi": 200, "pages": list(range(expected["runtime_metadata"]["total_pages"])), "cached_pages": 0, "failed_pages": []}
+    assert "ocr" in output["runtime_metadata"]["pipeline"]["stages"]
+
+    # Cached by checksum and page
+    output = einvoice_lens.parse_commerical_invoice(scanned_path, ocr=settings)
+    assert output["runtime_metadata"]["ocr"]["cached_pages"] == expected["runtime_metadata"]["total_pages"]
+    assert output["dataset"] == expected["dataset"]
+
+
+def test_ocr_process_pool(scanned_paths):
+    text_path, scanned_path = scanned_paths
+
+    settings = OCRSettings(engine=_ReplayEngine(text_path, dpi=150), dpi=150, workers=2)
+    with open(scanned_path, "rb") as f:
+        output = einvoice_lens.parse_commerical_invoice(f.read(), ocr=settings)
+
+    # Validate
+    assert output["dataset"] == einvoice_lens.parse_commerical_invoice(text_path)["dataset"]
+
+
+def test_ocr_failed_page(scanned_paths):
+    text_path, scanned_path = scanned_paths
+
+    output = einvoice_lens.parse_commerical_invoice(scanned_path, ocr=OCRSettings(engine=_FlakyEngine(text_path, dpi=150), dpi=150))
+
+    # Validate: the other pages are still recognized
+    assert output["runtime_metadata"]["ocr"]["pages"] == [0, 2]
+    assert output["runtime_metadata"]["ocr"]["failed_pages"] == [1]
+    assert output["runtime_metadata"]["limit_exceeded"] is None
+    assert output["profile"] == einvoice_lens.parse_commerical_invoice(text_path)["profile"]
+
+
+def test_ocr_inside_page_timeout(scanned_paths):
+    _, scanned_path = scanned_paths
+
+    start = time.perf_counter()
+    output = einvoice_lens.parse_commerical_invoice(scanned_path, ocr=OCRSettings(engine=_HangingEngine(), dpi=72), limits=ParseLimits(page_timeout_seconds=1))
+
+    # Validate: the hanging recognition is interrupted as the page
+    assert time.perf_counter() - start < 30
+    assert output["runtime_metadata"]["limit_exceeded"]["reason"] == "page_timeout"
+    assert output["runtime_metadata"]["ocr"]["pages"] == []
+
+
+def test_ocr_skip_text_layer(resource_path):
+
+    output = einvoice_lens.parse_commerical_invoice(resource_path, ocr=OCRSettings(engine=_FailingEngine()))
+
+    # Validate
+    assert output["runtime_metadata"]["ocr"]["pages"] == []
+    assert len(output["dataset"]) == 3
+
+
+def test_ocr_tesseract(scanned_paths):
+    pytest.importorskip("pytesseract")
+    _, scanned_path = scanned_paths
+
+    output = einvoice_lens.parse_commerical_invoice(scanned_path, ocr=OCRSettings(engine="tesseract", dpi=300))
+
+    # Validate
+    assert output["runtime_metadata"]["ocr"]["engine"] == "tesseract"
+    assert output["profile"]["attribute"]["document_type"] == "SALES_INVOICE"
+
+
+def test_ocr_invalid_engine(resource_path):
+
+    with pytest.raises(ValueError):
+        einvoice_lens.parse_commerical_invoice(resource_path, ocr=OCRSettings(engine="unknown"))
@@ -0,0 +1,79 @@
+#!/bin/python3
+
+# Global
+import sys
+import os
+from datetime import date
+
+# Append
+sys.path.append(os.path.abspath(os.curdir))
+
+# Internal
+import einvoice_lens
+from einvoice_lens.rules import RuleSet, FieldRule, DEFAULT_FIELD_RULES
+
+
+def _empty_profile() -> dict[str, dict]:
+    return {"attribute": {}, "seller": {}, "buyer": {}, "invoice_partner": {}}
+
+
+def test_rule_set_extract_on_lines():
+
+    lines = [
+        "HÓA ĐƠN BÁN HÀNG",
+        "Ngày (date) 28 tháng (month) 08 năm (year)",
+        "2025",
+        "(Serial No): 3C35OKP",
+        "Số (No.): 123",
+        "Đơn vị bán hàng (Seller): HỘ KINH DOANH",
+        "Mã số thuế (Tax code): 0301118723-001",
+        "Họ tên người mua hàng (Buyer's fullname): Lê Hoàng Minh Phương",
+        "Mã số thuế (Tax code): 7000999999",
+        "Tra cứu hóa đơn tại trang web: http://tracuu.hoadon.com Mã tra cứu: abc123",
+        "Đơn vị cung cấp dịch vụ, MST: 0401486901",
+    ]
+    profile = _empty_profile()
+
+    # Extract
+    RuleSet(DEFAULT_FIELD_RULES).extract(lines, profile=profile)
+
+    # Validate
+    assert profile["attribute"] == {
+        "document_type": "SALES_INVOICE",
+        "issue_date": date(2025, 8, 28),
+        "serial_no": "3C35OKP",
+        "invoice_number": "123",
+    }
+    assert profile["seller"] == {"name": "HỘ KINH DOANH", "tax_code": "0301118723-001"}
+    assert profile["buyer"] == {"name": "Lê Hoàng Minh Phương", "tax_code": "7000999999"}
+    assert profile["invoice_partner"] == {
+        "search_keyword_id": "ABC123",
+        "endpoint_search_invoice": "http://tracuu.hoadon.com",
+        "tax_code": "0401486901",
+    }
+
+
+def test_rule_set_register_extra_rule():
+
+    rule_set = RuleSet(DEFAULT_FIELD_RULES)
+    rule_set.register(FieldRule("invoice_partner", "contact", ("hotline", "hot")))
+    profile = _empty_profile()
+
+    # Extract
+    rule_set.extract(["Hotline: 1900 0000"], profile=profile)
+
+    # Validate
+    assert profile["invoice_partner"] == {"contact": "1900 0000"}
+    assert len(RuleSet(DEFAULT_FIELD_RULES).rules) == len(DEFAULT_FIELD_RULES)
+
+
+def test_extract_document_with_custom_rule_set():
+
+    rule_set = RuleSet(DEFAULT_FIELD_RULES)
+    rule_set.register(FieldRule("attribute", "payment_method", ("payment method",), scope="key"))
+
+    # Parse
+    output = einvoice_lens.parse_commerical_invoice(os.path.join("tests", "data", "sample-sale-invoice.pdf"), rule_set=rule_set)
+
+    # Validate
+    assert output["profile"]["attribute"]["payment_method"] == "Tiền mặt/Chuyển khoản"
@@ -0,0 +1,96 @@
+#!/bin/python3
+
+# Global
+import sys
+import os
+import json
+import asyncio
+import subprocess
+
+# Append
+sys.path.append(os.path.abspath(os.curdir))
+
+# External
+import pytest
+
+# Internal
+from einvoice_lens.aio import AsyncInvoiceParser
+from einvoice_lens.server import InvoiceServer, METHOD_NOT_FOUND, PARSE_ERROR, DOCUMENT_ERROR, INVALID_PARAMS
+
+
+@pytest.fixture(scope="module")
+def resource_path() -> str:
+    return os.path.join("tests", "data", "sample-sale-invoice.pdf")
+
+
+def test_import_package_without_polars():
+
+    code = "import sys, einvoice_lens; assert 'polars' not in sys.modules and 'pdfplumber' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_server_handle_requests(resource_path):
+
+    async def _main() -> list[dict]:
+        async with AsyncInvoiceParser(max_concurrency=2, executor="thread") as parser:
+            server = InvoiceServer(parser)
+            responses = await asyncio.gather(
+                server.handle(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "parse", "params": {"path": resource_path}})),
+                server.handle(json.dumps({"jsonrpc": "2.0", "id": 2, "method": "parse", "params": {"path": "not-exist.pdf"}})),
+                server.handle(json.dumps({"jsonrpc": "2.0", "id": 3, "method": "parse", "params": {}})),
+                server.handle(json.dumps({"jsonrpc": "2.0", "id": 4, "method": "unknown"})),
+                server.handle("{not json"),
+            )
+            # Notification: no response
+            assert await server.handle(json.dumps({"jsonrpc": "2.0", "method": "ping"})) is None
+            return [json.loads(x) for x in responses]
+
+    responses = asyncio.run(_main())
+
+    # Validate
+    assert responses[0]["id"] == 1
+    assert responses[0]["result"]["runtime_metadata"]["checksum_crc32c"] == "a6f1bd83"
+    assert len(responses[0]["result"]["dataset"]) == 3
+    assert responses[1]["error"]["code"] == DOCUMENT_ERROR
+    assert responses[1]["error"]["data"]["type"] == "ValueError"
+    assert responses[2]["error"]["code"] == INVALID_PARAMS
+    assert responses[3]["error"]["code"] == METHOD_NOT_FOUND
+    assert responses[4]["error"]["code"] == PARSE_ERROR
+
+
+def test_server_on_stdio(resource_path):
+
+    requests = [
+        {"jsonrpc": "2.0", "id": 1, "method": "parse", "params": {"path": resource_path, "stop_at_total_amount": True}},
+        {"jsonrpc": "2.0", "id": 2, "method": "ping"},
+    ]
+    process = subprocess.run(
+        [sys.executable, "-m", "einvoice_lens.cli", "serve", "--executor", "thread", "--workers", "2"],
+        input="\n".join([json.dumps(x) for x in requests]) + "\n",
+        capture_output=True, text=True, encoding="utf-8", timeout=120, check=True,
+    )
+
+    # Validate: responses are written on completion, matched by id
+    responses = {x["id"]: x for x in map(json.loads, process.stdout.splitlines())}
+    assert sorted(responses) == [1, 2]
+    assert len(responses[1]["result"]["dataset"]) == 3
+    assert responses[2]["result"]["version"] == "0.2.3"
+
+
+def test_server_on_stdio_shutdown_while_stdin_open():
+
+    process = subprocess.Popen(
+        [sys.executable, "-m", "einvoice_lens.cli", "serve", "--executor", "thread", "--workers", "1"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding="utf-8",
+    )
+    try:
+        # The stdin is kept open after the request
+        process.stdin.write(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "shutdown"}) + "\n")
+        process.stdin.flush()
+        assert process.wait(timeout=60) == 0
+        assert json.loads(process.stdout.readline()) == {"jsonrpc": "2.0", "id": 1, "result": None}
+    finally:
+        process.kill()
+        process.stdin.close()
+        process.stdout.close()
+        process.stderr.close()
@@ -0,0 +1,162 @@
+#!/bin/python3
+
+# Global
+import sys
+import os
+import re
+import base64
+import datetime
+
+# Append
+sys.path.append(os.path.abspath(os.curdir))
+
+# External
+import pytest
+
+# Internal
+import einvoice_lens
+from einvoice_lens.signature import extract_digital_signature
+
+
+def _sign_pdf(source: str, target: str, issuer: str = "VNPT-CA", serial: int = 0x1234567890ABCDEF) -> None:
+    "Append the signature field on an incremental update, signed by a self-issued certificate (PKCS#7 detached)"
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.hazmat.primitives.serialization import pkcs7
+    from cryptography.x509.oid import NameOID
+
+    with open(source, "rb") as f:
+        document = f.read()
+    size = int(re.search(rb"/Size (\d+)", document[document.rfind(b"trailer"):]).group(1))
+    root = int(re.search(rb"/Root (\d+) 0 R", document[document.rfind(b"trailer"):]).group(1))
+    startxref = int(re.search(rb"startxref\s+(\d+)", document[document.rfind(b"startxref"):]).group(1))
+    catalog = re.search(rb"\n%d 0 obj\s*<<(.*?)>>\s*endobj" % root, document, re.S).group(1)
+
+    # Objects: signature value, field, AcroForm, updated catalog
+    signature_number, field_number, form_number = size, size + 1, size + 2
+    placeholder = b"0" * 16384
+    objects = {
+        signature_number: (
+            b"<< /Type /Sig /Filter /Adobe.PPKLite /SubFilter /adbe.pkcs7.detached "
+            b"/ByteRange [0000000000 0000000000 0000000000 0000000000] /Contents <" + placeholder + b"> "
+            b"/M (D:20250928143200+07'00') /Name (Seller) >>"
+        ),
+        field_number: b"<< /FT /Sig /T (Signature1) /V %d 0 R /Type /Annot /Subtype /Widget /Rect [0 0 0 0] /F 132 >>" % signature_number,
+        form_number: b"<< /Fields [%d 0 R] /SigFlags 3 >>" % field_number,
+        root: b"<<" + catalog + b" /AcroForm %d 0 R >>" % form_number,
+    }
+
+    update = bytearray(b"\n")
+    offsets: dict[int, int] = {}
+    for number, body in objects.items():
+        offsets[number] = len(document) + len(update)
+        update += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(document) + len(update)
+    update += b"xref\n0 1\n0000000000 65535 f \n"
+    for number in sorted(offsets):
+        update += b"%d 1\n%010d 00000 n \n" % (number, offsets[number])
+    update += b"trailer\n<< /Size %d /Root %d 0 R /Prev %d >>\nstartxref\n%d\n%%%%EOF\n" % (size + 3, root, startxref, xref)
+    signed = bytearray(document + update)
+
+    # Byte range around the hex string of `/Contents`
+    contents_start = signed.find(b"/Contents <") + len(b"/Contents ")
+    contents_end = contents_start + len(placeholder) + 2
+    byte_range = b"[%010d %010d %010d %010d]" % (0, contents_start, contents_end, len(signed) - contents_end)
+    range_start = signed.find(b"[0000000000 0000000000")
+    signed[range_start:range_start + len(byte_range)] = byte_range
+
+    # Sign
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, issuer)])
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "Seller")]))
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(serial)
+        .not_valid_before(datetime.datetime(2025, 1, 1))
+        .not_valid_after(datetime.datetime(2030, 1, 1))
+        .sign(key, hashes.SHA256())
+    )
+    signature = (
+        pkcs7.PKCS7SignatureBuilder()
+        .set_data(bytes(signed[:contents_start]) + bytes(signed[contents_end:]))
+        .add_signer(certificate, key, hashes.SHA256())
+        .sign(serialization.Encoding.DER, [pkcs7.PKCS7Options.DetachedSignature, pkcs7.PKCS7Options.Binary])
+    )
+    hex_signature = signature.hex().encode("ascii")
+    signed[contents_start + 1:contents_start + 1 + len(hex_signature)] = hex_signature
+
+    with open(target, "wb") as f:
+        f.write(signed)
+
+
+@pytest.fixture(scope="module")
+def signed_path(tmp_path_factory) -> str:
+    pytest.importorskip("reportlab")
+    pytest.importorskip("cryptography")
+    from benchmarks.generator import generate_invoice
+
+    directory = tmp_path_factory.mktemp("signature")
+    generate_invoice(os.path.join(directory, "unsigned.pdf"), line_items=3, seed=1)
+    _sign_pdf(os.path.join(directory, "unsigned.pdf"), os.path.join(directory, "signed.pdf"))
+    return os.path.join(directory, "signed.pdf")
+
+
+def test_extract_digital_signature(signed_path):
+
+    with open(signed_path, "rb") as f:
+        signature = extract_digital_signature(f.read())
+
+    # Validate
+    assert signature["certificate_serial"] == "1234567890ABCDEF"
+    assert signature["issuer"] == "VNPT-CA"
+    assert signature["signed_at"] == "2025-09-28T14:32:00+07:00"
+    assert base64.b64decode(signature["signature_value"])[:1] == b"\x30"
+    assert signature["byte_range"][0] == 0
+    assert signature["verification"] is None
+
+
+def test_signature_on_demand(signed_path):
+
+    # The default path doesn't read the signature
+    assert einvoice_lens.parse_commerical_invoice(signed_path)["profile"]["attribute"]["digital_signature"] is None
+
+    output = einvoice_lens.parse_commerical_invoice(signed_path, signature=True)
+    signature = output["profile"]["attribute"]["digital_signature"]
+
+    # Validate
+    assert signature["certificate_serial"] == "1234567890ABCDEF"
+    assert signature["verification"] is None
+    assert "signature" in output["runtime_metadata"]["pipeline"]["stages"]
+    assert len(output["dataset"]) == 3
+
+
+def test_signature_verify_coverage(signed_path, tmp_path):
+
+    records = list(einvoice_lens.parse_commerical_invoices([signed_path], workers=1, verify_signature=True))
+    verification = records[0]["result"]["profile"]["attribute"]["digital_signature"]["verification"]
+
+    # Validate
+    assert verification["covers_whole_document"] is True
+    assert verification["digest_matched"] is True
+    assert len(verification["signed_checksum_crc32c"]) == 8
+
+    # Updated after signing
+    with open(signed_path, "rb") as f:
+        appended = f.read() + b"\n% appended after signing\n"
+    verification = extract_digital_signature(appended, verify=True)["verification"]
+    assert verification["covers_whole_document"] is False
+    assert verification["digest_matched"] is True
+
+    # Tampered signed bytes
+    tampered = bytearray(appended[:-len(b"\n% appended after signing\n")])
+    tampered[100:101] = b"X" if tampered[100:101] != b"X" else b"Y"
+    assert extract_digital_signature(bytes(tampered), verify=True)["verification"]["digest_matched"] is False
+
+
+def test_signature_unsigned_document():
+
+    output = einvoice_lens.parse_commerical_invoice(os.path.join("tests", "data", "sample-sale-invoice.pdf"), signature=True)
+    assert output["profile"]["attribute"]["digital_signature"] is None
@@ -0,0 +1,110 @@
+#!/bin/python3
+
+# Global
+import sys
+import os
+import json
+import glob
+
+# Append
+sys.path.append(os.path.abspath(os.curdir))
+
+# External
+import pytest
+import polars as pl
+
+# Internal
+import einvoice_lens
+from einvoice_lens import cli
+from einvoice_lens.sink import ParquetDatasetSink, scan_invoice_dataset
+
+
+@pytest.fixture(scope="module")
+def resource_path() -> str:
+    return os.path.join("tests", "data", "sample-sale-invoice.pdf")
+
+
+@pytest.fixture(scope="module")
+def invoice_paths(tmp_path_factory, resource_path) -> list[str]:
+    pytest.importorskip("reportlab")
+    from benchmarks.generator import generate_invoice
+
+    directory = tmp_path_factory.mktemp("sink")
+    paths = [generate_invoice(os.path.join(directory, f"invoice-{seed}.pdf"), line_items=4 + seed, seed=seed)["path"] for seed in range(4)]
+    return [resource_path, *paths]
+
+
+def test_sink_partitioned_linked_datasets(invoice_paths, tmp_path):
+
+    # Write: the small row groups force several flushes per partition
+    with ParquetDatasetSink(str(tmp_path), row_group_size=5) as sink:
+        records = list(einvoice_lens.parse_commerical_invoices(invoice_paths + ["not-exist.pdf"], workers=1, sink=sink))
+        assert sink.files > 2
+
+    profiles = scan_invoice_dataset(str(tmp_path), "profiles").collect()
+    line_items = scan_invoice_dataset(str(tmp_path), "line_items").collect()
+
+    # Validate: the failed record is skipped
+    results = [record["result"] for record in records if record["status"] == "SUCCESS"]
+    assert profiles.height == len(results) == len(invoice_paths)
+    assert line_items.height == sum([len(result["dataset"]) for result in results])
+
+    # Partitions
+    expected = {
+        (result["profile"]["attribute"]["issue_date"].strftime("%Y-%m"), result["profile"]["seller"]["tax_code"])
+        for result in results
+    }
+    assert set(profiles.select("issue_month", "seller_tax_code").iter_rows()) == expected
+
+    # Linked by checksum
+    joined = line_items.join(profiles.select("checksum_crc32c", "seller_name", "status"), on="checksum_crc32c", how="inner")
+    assert joined.height == line_items.height
+    assert set(joined.get_column("status").to_list()) == {"SUCCESS"}
+    sample = profiles.filter(pl.col("checksum_crc32c") == "a6f1bd83").row(0, named=True)
+    assert sample["line_items"] == 3
+    assert json.loads(sample["runtime_metadata"])["checksum_crc32c"] == "a6f1bd83"
+    assert line_items.filter(pl.col("checksum_crc32c") == "a6f1bd83").get_column("amount").sum() == 2680000
+
+
+def test_sink_append_only(resource_path, tmp_path):
+
+    result = einvoice_lens.parse_commerical_invoice(resource_path)
+    for _ in range(2):
+        with ParquetDatasetSink(str(tmp_path)) as sink:
+            sink.write(result)
+
+    # Validate: each run adds its files, none is rewritten
+    assert len(glob.glob(os.path.join(tmp_path, "line_items", "**", "*.parquet"), recursive=True)) == 2
+    assert scan_invoice_dataset(str(tmp_path), "profiles").collect().height == 2
+    assert len(glob.glob(os.path.join(tmp_path, "**", "*.tmp"), recursive=True)) == 0
+
+
+def test_sink_bounded_buffer(resource_path, tmp_path):
+
+    result = einvoice_lens.parse_commerical_invoice(resource_path, dataset_format="polars")
+    result["profile"]["attribute"]["issue_date"] = None
+
+    sink = ParquetDatasetSink(str(tmp_path), max_buffered_rows=10)
+    for _ in range(5):
+        sink.write(result)
+        assert sink.buffered_rows < 10
+
+    # Validate: flushed on the third invoice (4 rows each), the missing issue date is the null partition
+    profiles = scan_invoice_dataset(str(tmp_path), "profiles").collect()
+    assert profiles.height == 3
+    assert profiles.get_column("issue_month").null_count() == 3
+    sink.close()
+    assert scan_invoice_dataset(str(tmp_path), "profiles").collect().height == 5
+    assert scan_invoice_dataset(str(tmp_path), "line_items").collect().height == 15
+
+
+def test_cli_sink(resource_path, tmp_path, capsys):
+
+    exit_code = cli.main(["--path", resource_path, "--workers", "1", "--sink", str(tmp_path)])
+    record = json.loads(capsys.readouterr().out.splitlines()[0])
+
+    # Validate
+    assert exit_code == 0
+    assert record["status"] == "SUCCESS"
+    assert record["result"] is None
+    assert scan_invoice_dataset(str(tmp_path), "line_items").collect().height == 3
@@ -0,0 +1,102 @@
+#!/bin/python3
+
+# Global
+import sys
+import os
+
+# Append
+sys.path.append(os.path.abspath(os.curdir))
+
+# External
+import pytest
+
+# Internal
+import einvoice_lens
+from einvoice_lens import engine, split
+
+
+@pytest.fixture(scope="module")
+def resource_path() -> str:
+    return os.path.join("tests", "data", "sample-sale-invoice.pdf")
+
+
+@pytest.fixture(scope="module")
+def multi_invoice(tmp_path_factory) -> tuple[str, list[dict]]:
+    pytest.importorskip("reportlab")
+    from benchmarks.generator import generate_multi_invoice
+
+    path = os.path.join(tmp_path_factory.mktemp("split"), "multi-invoice.pdf")
+    return path, generate_multi_invoice(path, [3, 70, 5], seed=2, invoice_number=123)
+
+
+def test_detect_invoice_segments(multi_invoice, resource_path):
+
+    path, _ = multi_invoice
+    segments = einvoice_lens.detect_invoice_segments(path)
+
+    # Validate: the second invoice continues on 3 pages
+    assert [(x["first_page"], x["last_page"]) for x in segments] == [(0, 0), (1, 3), (4, 4)]
+    assert [x["invoice_number"] for x in segments] == ["123", "124", "125"]
+    assert [x["index"] for x in segments] == [0, 1, 2]
+    assert len(einvoice_lens.detect_invoice_segments(resource_path)) == 1
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parse_multi_commerical_invoice(multi_invoice, workers):
+
+    path, truths = multi_invoice
+    results = einvoice_lens.parse_multi_commerical_invoice(path, workers=workers)
+
+    # Validate: one result per invoice, the line items are not merged
+    assert [x["profile"]["attribute"]["invoice_number"] for x in results] == ["123", "124", "125"]
+    assert [len(x["dataset"]) for x in results] == [truth["line_items"] for truth in truths]
+    assert [x["runtime_metadata"]["validation"]["total_amount"] for x in results] == [truth["total_amount"] for truth in truths]
+    assert [x["runtime_metadata"]["segment"]["first_page"] for x in results] == [0, 1, 4]
+    assert [x["runtime_metadata"]["segment"]["status"] for x in results] == ["SUCCESS"] * 3
+    assert all([x["runtime_metadata"]["total_pages"] == 5 for x in results])
+    assert einvoice_lens.parse_commerical_invoice(path)["runtime_metadata"]["segment"] is None
+
+
+def test_parse_multi_commerical_invoice_on_bytes_and_cache(multi_invoice, tmp_path):
+
+    path, _ = multi_invoice
+    cache = einvoice_lens.ResultCache(os.path.join(tmp_path, "cache.sqlite"))
+    with open(path, "rb") as f:
+        content = f.read()
+
+    first = einvoice_lens.parse_multi_commerical_invoice(content, workers=1, cache=cache)
+    second = einvoice_lens.parse_multi_commerical_invoice(content, workers=1, cache=cache)
+
+    # Validate: the invoices of the same checksum are cached apart
+    assert [x["runtime_metadata"]["cache_hit"] for x in second] == [True, True, True]
+    assert [x["dataset"] for x in second] == [x["dataset"] for x in first]
+    assert [x["runtime_metadata"]["segment"] for x in second] == [x["runtime_metadata"]["segment"] for x in first]
+
+
+def test_parse_multi_commerical_invoice_failed_segment(multi_invoice, monkeypatch):
+
+    path, truths = multi_invoice
+    parse_on = split._parse_commerical_invoice_on
+    calculate_checksum = engine.calculate_checksum_crc32c_of
+    checksums: list[int] = []
+
+    def _parse_on(source, page_range, **options):
+        if page_range.start == 1:
+            raise RuntimeError("Broken page")
+        return parse_on(source, page_range=page_range, **options)
+
+    def _calculate_checksum(buffer, *args, **kwargs):
+        checksums.append(len(buffer))
+        return calculate_checksum(buffer, *args, **kwargs)
+
+    monkeypatch.setattr(split, "_parse_commerical_invoice_on", _parse_on)
+    monkeypatch.setattr(engine, "calculate_checksum_crc32c_of", _calculate_checksum)
+    results = einvoice_lens.parse_multi_commerical_invoice(path, workers=1)
+
+    # Validate: the other invoices are kept, the document is hashed once
+    assert [x["runtime_metadata"]["segment"]["status"] for x in results] == ["SUCCESS", "FAILED", "SUCCESS"]
+    assert results[1]["runtime_metadata"]["segment"]["error"] == {"type": "RuntimeError", "message": "Broken page"}
+    assert results[1]["dataset"] == []
+    assert [len(x["dataset"]) for x in results] == [truths[0]["line_items"], 0, truths[2]["line_items"]]
+    assert len({x["runtime_metadata"]["checksum_crc32c"] for x in results}) == 1
+    assert len(checksums) == 1
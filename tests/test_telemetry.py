@@ -0,0 +1,71 @@
+#!/bin/python3
+
+# Global
+import sys
+import os
+
+# Append
+sys.path.append(os.path.abspath(os.curdir))
+
+# External
+import pytest
+
+# Internal
+import einvoice_lens
+from einvoice_lens.telemetry import CallbackInstrumentation, StageRecorder, current_memory_mb
+
+
+def test_pipeline_stage_timings_and_hook():
+
+    events: list[tuple[str, float, dict]] = []
+    instrumentation = CallbackInstrumentation(lambda name, seconds, attributes: events.append((name, seconds, attributes)))
+
+    # Parse
+    output = einvoice_lens.parse_commerical_invoice(os.path.join("tests", "data", "sample-sale-invoice.pdf"), instrumentation=instrumentation)
+    pipeline = output["runtime_metadata"]["pipeline"]
+
+    # Validate
+    for stage in ("checksum", "open", "page_layout", "first_page_text", "profile_rules", "extract_tables", "normalization", "dataset"):
+        assert stage in pipeline["stages"], f"Required stage {stage!r}. Got {pipeline['stages']}"
+        assert pipeline["stages"][stage] >= 0
+
+    assert sum(pipeline["stages"].values()) <= pipeline["processing_in_seconds"]
+    assert pipeline["line_items"] == 3
+    assert pipeline["process_peak_memory_mb"] is None or pipeline["process_peak_memory_mb"] > 0
+    assert pipeline["pages"] == [{
+        "page": 0,
+        "extract_tables_seconds": pipeline["pages"][0]["extract_tables_seconds"],
+        "normalization_seconds": pipeline["pages"][0]["normalization_seconds"],
+        "total_records": 14,
+        "line_items": 3,
+    }]
+
+    # Layout: the first page is parsed once for the profile then the line items
+    assert pipeline["layout"]["pages_parsed"] == 1
+    assert pipeline["layout"]["shared_pages"] == 1
+    assert pipeline["layout"]["reused_views"] >= 1
+    assert pipeline["stages"]["page_layout"] > 0
+    assert [name for name, _, _ in events].count("page_layout") == 1
+
+    # Hook
+    assert ("extract_tables", {"page": 0}) in [(name, attributes) for name, _, attributes in events]
+    assert {name for name, _, _ in events} == set(pipeline["stages"]) - {"normalization"}
+
+
+def test_memory_growth_per_document_in_long_lived_process():
+
+    if current_memory_mb() is None:
+        pytest.skip("Required /proc/self/statm")
+
+    # The process peak is already reached by a previous document
+    previous = bytearray(80 * 10**6)
+    del previous
+
+    recorder = StageRecorder()
+    with recorder.stage("open"):
+        buffer = bytearray(50 * 10**6)
+
+    # Validate
+    assert recorder.memory_growth_mb >= 40
+    assert recorder.process_peak_memory_mb >= 80
+    del buffer
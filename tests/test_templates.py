@@ -0,0 +1,111 @@
+#!/bin/python3
+
+# Global
+import sys
+import os
+import random
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Append
+sys.path.append(os.path.abspath(os.curdir))
+
+# External
+import pytest
+import pdfplumber
+
+# Internal
+import einvoice_lens
+from einvoice_lens.templates import TABLE_SETTINGS, TemplateRegistry, _EdgeSpans, extract_table_rows
+
+
+@pytest.fixture(scope="module")
+def resource_path() -> str:
+    return os.path.join("tests", "data", "sample-sale-invoice.pdf")
+
+
+def test_extract_table_rows_match_pdfplumber(resource_path):
+
+    with pdfplumber.open(resource_path, unicode_norm="NFKC") as document:
+        tables = document.pages[0].find_tables(TABLE_SETTINGS)
+
+        # Validate
+        assert len(tables) > 0
+        assert [extract_table_rows(table) for table in tables] == [table.extract() for table in tables]
+
+
+def test_template_learned_then_applied(resource_path, tmp_path):
+
+    path = os.path.join(tmp_path, "templates.sqlite")
+    expected = einvoice_lens.parse_commerical_invoice(resource_path)
+
+    # Learn
+    learned = einvoice_lens.parse_commerical_invoice(resource_path, templates=TemplateRegistry(path))
+    assert learned["runtime_metadata"]["layout_template"]["status"] == "learned"
+    assert learned["runtime_metadata"]["layout_template"]["fingerprint"].startswith("partner:0401486901:")
+
+    # Apply: the registry is reloaded from the file
+    applied = einvoice_lens.parse_commerical_invoice(resource_path, templates=TemplateRegistry(path))
+    assert applied["runtime_metadata"]["layout_template"] == {**learned["runtime_metadata"]["layout_template"], "status": "applied"}
+    assert applied["dataset"] == expected["dataset"]
+
+
+def test_template_stale_fall_back_and_relearn(resource_path, tmp_path):
+
+    path = os.path.join(tmp_path, "templates.sqlite")
+    templates = TemplateRegistry(path)
+    einvoice_lens.parse_commerical_invoice(resource_path, templates=templates)
+    template = next(iter(templates))
+    fingerprint = template["fingerprint"]
+
+    # The vendor moved the inner columns
+    templates.set({**template, "columns": [x if index in (0, len(template["columns"]) - 1) else x + 12 for index, x in enumerate(template["columns"])]})
+
+    # Parse
+    output = einvoice_lens.parse_commerical_invoice(resource_path, templates=templates)
+
+    # Validate: detected as usual, the template is learned again
+    assert output["runtime_metadata"]["layout_template"]["status"] == "stale"
+    assert output["dataset"] == einvoice_lens.parse_commerical_invoice(resource_path)["dataset"]
+    assert TemplateRegistry(path).get(fingerprint)["columns"] == template["columns"]
+
+
+def _learn_templates(path: str, worker: int) -> None:
+    templates = TemplateRegistry(path)
+    for index in range(25):
+        templates.set({
+            "fingerprint": f"partner:{worker}:{index}", "columns": [0.0, float(index)], "header_bbox": [0.0, 0.0, 1.0, 1.0],
+            "page_width": 595.0, "page_height": 842.0, "created_at": "2025-08-28T00:00:00+00:00",
+        })
+
+
+def test_template_registry_concurrent_writers(tmp_path):
+
+    path = os.path.join(tmp_path, "templates.sqlite")
+
+    # Learn from several processes at the same time
+    with ProcessPoolExecutor(max_workers=4, mp_context=multiprocessing.get_context("spawn")) as executor:
+        list(executor.map(_learn_templates, [path] * 4, range(4)))
+
+    # Validate: no template is lost, a reader opened before sees the latest writes
+    templates = TemplateRegistry(path)
+    assert len(templates) == 100
+    _learn_templates(path, worker=9)
+    assert "partner:9:24" in templates
+    templates.invalidate("partner:9:24")
+    assert len(TemplateRegistry(path)) == 124
+
+
+def test_edge_spans_same_as_scan():
+
+    generator = random.Random(5)
+    for _ in range(200):
+        spans = [(start, start + generator.choice([0, 1, 5, 20])) for start in [generator.randint(0, 50) for _ in range(generator.randint(0, 8))]]
+        index = _EdgeSpans(spans)
+        top, bottom = sorted([generator.randint(-5, 60), generator.randint(-5, 60)])
+
+        # Validate: covering (vertical on the row) and overlapping (stray on the row), as the scan of every edge
+        furthest = index.furthest(top + 3)
+        assert (furthest is not None and furthest >= bottom - 3) == any([start <= top + 3 and end >= bottom - 3 for start, end in spans])
+        furthest = index.furthest(bottom - 3, inclusive=False)
+        assert (furthest is not None and furthest > top + 3) == any([start < bottom - 3 and end > top + 3 for start, end in spans])
@@ -0,0 +1,79 @@
+#!/bin/python3
+
+# Global
+import sys
+import os
+
+# Append
+sys.path.append(os.path.abspath(os.curdir))
+
+# External
+import pytest
+
+# Internal
+import einvoice_lens
+from einvoice_lens.validation import parse_total_amount, parse_total_amount_in_words, validate_dataset
+
+
+@pytest.fixture(scope="module")
+def resource_path() -> str:
+    return os.path.join("tests", "data", "sample-sale-invoice.pdf")
+
+
+def _dataset(rows: list[tuple]):
+    import polars as pl
+    from einvoice_lens.engine import _line_item_dtypes
+    return pl.DataFrame(rows, schema=_line_item_dtypes(), orient="row")
+
+
+def test_parse_total_amount():
+
+    assert parse_total_amount(["Cộng tiền hàng(Total amount):", None, None, None, None, "2.680.000"]) == 2680000.0
+    assert parse_total_amount(["Tổng tiền thanh toán(Total amount): 20.752.000", None]) == 20752000.0
+    assert parse_total_amount(["Tổng tiền thanh toán(Total amount): 1.234,5"]) == 1234.5
+    assert parse_total_amount(["Tổng tiền thanh toán(Total amount):"]) is None
+    assert parse_total_amount([]) is None
+    assert parse_total_amount_in_words(["Số tiền viết bằng chữ(In words): Hai triệu đồng", None]) == "Hai triệu đồng"
+    assert parse_total_amount_in_words([]) is None
+
+
+def test_validation_on_document(resource_path):
+
+    output = einvoice_lens.parse_commerical_invoice(resource_path)
+
+    # Validate
+    assert output["runtime_metadata"]["validation"] == {
+        "total_amount": 2680000.0,
+        "total_amount_in_words": "Hai triệu sáu trăm tám mươi nghìn đồng",
+        "line_items": 3,
+        "sum_amount": 2680000.0,
+        "total_amount_matched": True,
+        "mismatched_rows": [],
+        "no_gaps": [],
+        "confidence": "HIGH",
+    }
+    assert "validation" in output["runtime_metadata"]["pipeline"]["stages"]
+
+
+def test_validation_flag_low_confidence():
+
+    pytest.importorskip("polars")
+    total = ["Tổng tiền thanh toán(Total amount): 46"]
+
+    # Row amount differs from quantity * unit price
+    validation = validate_dataset(_dataset([(1, "a", "Cái", 2, 10.0, 20.0), (2, "b", "Cái", 1, 5.0, 26.0)]), total, [])
+    assert validation["total_amount_matched"] is True
+    assert validation["mismatched_rows"] == [2]
+    assert validation["confidence"] == "LOW"
+
+    # Missing rows, the row without quantity isn't checked
+    validation = validate_dataset(_dataset([(2, "a", "Cái", 2, 10.0, 20.0), (5, "b", None, None, None, 26.0)]), total, [])
+    assert validation["mismatched_rows"] == []
+    assert validation["no_gaps"] == [[1, 1], [3, 4]]
+    assert validation["confidence"] == "LOW"
+
+    # Total amount differs or not found
+    validation = validate_dataset(_dataset([(1, "a", "Cái", 2, 10.0, 20.0)]), total, [])
+    assert validation["total_amount_matched"] is False
+    assert validate_dataset(_dataset([(1, "a", "Cái", 2, 10.0, 20.0)]), [], [])["total_amount_matched"] is None
+    assert validate_dataset(_dataset([]), [], [])["confidence"] == "LOW"
@@ -0,0 +1,137 @@
+#!/bin/python3
+
+# Global
+import sys
+import os
+import json
+import time
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Append
+sys.path.append(os.path.abspath(os.curdir))
+
+# External
+import pytest
+
+# Internal
+from einvoice_lens import watch
+from einvoice_lens.watch import DirectoryWatcher, Manifest
+
+
+@pytest.fixture(scope="module")
+def resource_path() -> str:
+    return os.path.join("tests", "data", "sample-sale-invoice.pdf")
+
+
+def test_watch_run_once_incremental(resource_path, tmp_path):
+
+    inbox, output = os.path.join(tmp_path, "inbox"), os.path.join(tmp_path, "output")
+    os.makedirs(os.path.join(inbox, "2025-08"))
+    shutil.copy(resource_path, os.path.join(inbox, "a.pdf"))
+    shutil.copy(resource_path, os.path.join(inbox, "2025-08", "b.pdf"))
+
+    watcher = DirectoryWatcher(inbox, output, workers=1, settle_seconds=0)
+
+    # New files
+    assert watcher.run_once() == {"processed": 2, "failed": 0, "skipped": 0, "deferred": 0}
+    entry = watcher.manifest.get("2025-08/b.pdf")
+    assert entry["status"] == "SUCCESS"
+    assert entry["checksum_crc32c"] == "a6f1bd83"
+    with open(entry["output_path"], "r", encoding="utf-8") as f:
+        assert len(json.load(f)["dataset"]) == 3
+
+    # Unchanged, then touched with the same content
+    assert watcher.run_once()["skipped"] == 2
+    os.utime(os.path.join(inbox, "a.pdf"), ns=(time.time_ns(), time.time_ns() - 10**9))
+    assert watcher.run_once() == {"processed": 0, "failed": 0, "skipped": 2, "deferred": 0}
+
+    # Changed content
+    with open(os.path.join(inbox, "a.pdf"), "ab") as f:
+        f.write(b"\n% Appended\n")
+    os.utime(os.path.join(inbox, "a.pdf"), ns=(time.time_ns(), time.time_ns() - 10**9))
+    assert watcher.run_once()["processed"] == 1
+    assert watcher.manifest.get("a.pdf")["checksum_crc32c"] != "a6f1bd83"
+
+    # Failed file is recorded, not retried until changed
+    with open(os.path.join(inbox, "broken.pdf"), "wb") as f:
+        f.write(b"Not a PDF")
+    os.utime(os.path.join(inbox, "broken.pdf"), ns=(time.time_ns(), time.time_ns() - 10**9))
+    assert watcher.run_once()["failed"] == 1
+    assert watcher.manifest.get("broken.pdf")["status"] == "FAILED"
+    assert watcher.run_once()["failed"] == 0
+
+
+def test_watch_resume_after_crash(resource_path, tmp_path):
+
+    inbox, output = os.path.join(tmp_path, "inbox"), os.path.join(tmp_path, "output")
+    os.makedirs(inbox)
+    for name in ("a.pdf", "b.pdf", "c.pdf"):
+        shutil.copy(resource_path, os.path.join(inbox, name))
+
+    # Stopped after the first document was recorded
+    first = DirectoryWatcher(inbox, output, workers=1, settle_seconds=0)
+    first.run_once()
+    first.manifest.remove("b.pdf")
+    first.manifest.remove("c.pdf")
+    first.manifest.close()
+
+    # Resume on the manifest: only the documents without entry are parsed
+    resumed = DirectoryWatcher(inbox, output, manifest=Manifest(os.path.join(output, "manifest.sqlite")), workers=1, settle_seconds=0)
+    assert resumed.run_once() == {"processed": 2, "failed": 0, "skipped": 1, "deferred": 0}
+    assert [x["path"] for x in resumed.manifest] == ["a.pdf", "b.pdf", "c.pdf"]
+
+
+def test_watch_run_picks_up_new_file(resource_path, tmp_path):
+
+    inbox, output = os.path.join(tmp_path, "inbox"), os.path.join(tmp_path, "output")
+    os.makedirs(inbox)
+    watcher = DirectoryWatcher(inbox, output, workers=1, interval=0.2, settle_seconds=0.1)
+
+    thread = threading.Thread(target=watcher.run, daemon=True)
+    thread.start()
+    try:
+        shutil.copy(resource_path, os.path.join(inbox, "a.pdf"))
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline and os.path.exists(os.path.join(output, "a.pdf.json")) is False:
+            time.sleep(0.1)
+    finally:
+        watcher.stop()
+        thread.join(timeout=10)
+
+    assert os.path.exists(os.path.join(output, "a.pdf.json"))
+    assert thread.is_alive() is False
+
+
+def test_watch_run_reuse_the_pool(resource_path, tmp_path, monkeypatch):
+
+    inbox, output = os.path.join(tmp_path, "inbox"), os.path.join(tmp_path, "output")
+    os.makedirs(inbox)
+    pools: list[ProcessPoolExecutor] = []
+
+    class _CountedPool(ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            pools.append(self)
+
+    monkeypatch.setattr(watch, "ProcessPoolExecutor", _CountedPool)
+    watcher = DirectoryWatcher(inbox, output, workers=2, interval=0.2, settle_seconds=0.1)
+
+    thread = threading.Thread(target=watcher.run, daemon=True)
+    thread.start()
+    try:
+        # Two files on two scans
+        for name in ("a.pdf", "b.pdf"):
+            shutil.copy(resource_path, os.path.join(inbox, name))
+            deadline = time.monotonic() + 60
+            while time.monotonic() < deadline and os.path.exists(os.path.join(output, name + ".json")) is False:
+                time.sleep(0.1)
+    finally:
+        watcher.stop()
+        thread.join(timeout=30)
+
+    # Validate: the workers are spawned once for every scan
+    assert os.path.exists(os.path.join(output, "b.pdf.json"))
+    assert len(pools) == 1
+    assert watcher._executor is None